@@ -0,0 +1,187 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from typing import List
+from uuid import UUID
+import logging
+import os
+
+from backend.app.core.config import settings
+from backend.app.core.database import get_db
+from backend.app.core.security import get_current_user
+from backend.app.models.user import User
+from backend.app.repositories.exam_repository import ExamRepository
+from backend.app.schemas.analysis import ClassStats, PaperAnalysisResponse, ReportExportJob
+from backend.app.services.batch_grader import BatchGrader
+from backend.app.services.exam_analytics import get_exam_analytics
+from backend.app.services.report_export import STATUS_DONE, get_report_export_service
+
+
+router = APIRouter(prefix="/analysis", tags=["成绩分析"])
+logger = logging.getLogger(__name__)
+exam_analytics = get_exam_analytics()
+report_export_service = get_report_export_service()
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# 重建期间持续有判分累加时最多重新读取的次数
+REBUILD_ATTEMPTS = 3
+
+ROLE_TEACHER = "teacher"
+ROLE_ADMIN = "admin"
+
+
+def _require_teacher(current_user: User) -> None:
+    if current_user.role not in [ROLE_TEACHER, ROLE_ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有教师或管理员可以查看成绩分析"
+        )
+
+
+async def _get_export_job(paper_id: str, class_id: str, job_id: str) -> dict:
+    job = await report_export_service.get_job(job_id)
+    if job is None or job['paper_id'] != paper_id or job['class_id'] != class_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="导出任务不存在或已过期"
+        )
+    return job
+
+
+async def rebuild_analysis(repository: ExamRepository, paper_id: str, class_id: str) -> dict:
+    """
+    从 student_exams 重建一次统计，仅在统计缺失或显式要求时使用。
+    读取期间有判分增量累加时重新读取，避免用旧数据覆盖；替换后迟到的已包含答卷的增量会被跳过
+    """
+    grader = BatchGrader(repository.get_answer_key(paper_id))
+    for _ in range(REBUILD_ATTEMPTS):
+        version = await exam_analytics.get_version(paper_id, class_id)
+        rows = repository.get_graded_answers(paper_id, class_id)
+        answers = [row['answers'] or {} for row in rows]
+        deltas = grader.analytics_deltas(
+            paper_id, [class_id] * len(answers), answers, grader.grade(answers),
+            exam_tokens=[row['exam_token'] for row in rows]
+        )
+        if await exam_analytics.replace(paper_id, class_id, grader.question_ids, deltas[0] if deltas else None, version):
+            logger.info(f"重建试卷 {paper_id} 班级 {class_id} 的统计: {len(answers)} 份答卷")
+            break
+    else:
+        logger.warning(f"试卷 {paper_id} 班级 {class_id} 的统计重建期间持续有判分，本次未替换")
+    return await exam_analytics.get_summary(paper_id, class_id)
+
+
+@router.get("/classes", response_model=List[ClassStats])
+async def get_class_dashboard(
+    response: Response,
+    class_ids: List[UUID] = Query(..., description="班级ID，可重复传入多个"),
+    refresh: bool = Query(False, description="重新统计计数"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    班级看板：学生数、发布的考试数和已交卷数。计数在发布、交卷和学生变动时累加，每个班级只读一行
+    """
+    _require_teacher(current_user)
+
+    repository = ExamRepository(db)
+    class_ids = [str(class_id) for class_id in class_ids]
+    if refresh:
+        repository.refresh_class_stats(class_ids)
+        db.commit()
+        logger.info(f"用户 {current_user.username} 重新统计班级计数: {len(class_ids)} 个班级")
+
+    response.headers["Cache-Control"] = "no-store"
+    return repository.get_class_stats(class_ids)
+
+
+@router.get("/{paper_id}/{class_id}", response_model=PaperAnalysisResponse)
+async def get_paper_analysis(
+    paper_id: str,
+    class_id: str,
+    response: Response,
+    rebuild: bool = Query(False, description="从答卷重新统计"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    班级答题统计。统计随每批判分增量更新，查询只读一条记录，考试进行中可以反复刷新
+    """
+    _require_teacher(current_user)
+
+    summary = None if rebuild else await exam_analytics.get_summary(paper_id, class_id)
+    if summary is None:
+        repository = ExamRepository(db)
+        if not repository.get_paper(paper_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="试卷不存在"
+            )
+        summary = await rebuild_analysis(repository, paper_id, class_id)
+
+    response.headers["Cache-Control"] = "no-store"
+    return summary
+
+
+@router.post("/{paper_id}/{class_id}/export", response_model=ReportExportJob, status_code=status.HTTP_202_ACCEPTED)
+async def export_report(
+    paper_id: str,
+    class_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """创建成绩报表导出任务并立即返回，报表在后台流式写出，通过任务接口查询进度"""
+    _require_teacher(current_user)
+    repository = ExamRepository(db)
+    if not repository.get_paper(paper_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="试卷不存在"
+        )
+
+    total = repository.count_exam_results(paper_id, class_id)
+    analysis = await exam_analytics.get_summary(paper_id, class_id)
+    job = await report_export_service.start(paper_id, class_id, total, analysis)
+    logger.info(f"教师 {current_user.username} 导出试卷 {paper_id} 班级 {class_id} 的成绩报表: {job['filename']}")
+    return job
+
+
+@router.get("/{paper_id}/{class_id}/export/{job_id}", response_model=ReportExportJob)
+async def get_export_job(
+    paper_id: str,
+    class_id: str,
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    _require_teacher(current_user)
+    return await _get_export_job(paper_id, class_id, job_id)
+
+
+@router.get("/{paper_id}/{class_id}/export/{job_id}/download")
+async def download_export(
+    paper_id: str,
+    class_id: str,
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """下载已完成的报表；配置了内部 location 时由 nginx 以 sendfile 发送"""
+    _require_teacher(current_user)
+    job = await _get_export_job(paper_id, class_id, job_id)
+    if job['status'] != STATUS_DONE:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="报表尚未生成完成"
+        )
+
+    headers = {"Content-Disposition": f'attachment; filename="{job["filename"]}"'}
+    if settings.report_x_accel_prefix:
+        headers["X-Accel-Redirect"] = settings.report_x_accel_prefix + job['filename']
+        return Response(media_type=XLSX_MEDIA_TYPE, headers=headers)
+
+    path = report_export_service.report_path(job['filename'])
+    if not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="报表文件不存在"
+        )
+    return FileResponse(path, media_type=XLSX_MEDIA_TYPE, headers=headers)
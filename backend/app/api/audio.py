@@ -0,0 +1,174 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import RedirectResponse, Response
+from starlette.background import BackgroundTask
+from typing import Optional
+import logging
+import os
+import re
+
+from backend.app.core.config import settings
+from backend.app.core.range_response import range_response, request_range
+from backend.app.core.security import get_current_user
+from backend.app.models.user import User
+from backend.app.schemas.audio import AudioPreflightRequest, AudioPreflightResponse
+from backend.app.services.audio_cache import HotAudioCache
+from backend.app.services.audio_service import get_audio_service
+from backend.app.services.audio_transcoder import COMPACT_RENDITION
+
+
+router = APIRouter(prefix="/audio", tags=["音频分发"])
+logger = logging.getLogger(__name__)
+audio_service = get_audio_service()
+
+ROLE_TEACHER = "teacher"
+ROLE_ADMIN = "admin"
+
+# 文件名即内容哈希：64位十六进制 + 扩展名，同时杜绝路径穿越
+AUDIO_NAME_PATTERN = re.compile(r'^([0-9a-f]{64})(\.mp3|\.wav)$')
+# compact 版本尚未生成时回退到原文件，只允许短期缓存，避免同一URL被永久缓存为原文件
+PENDING_RENDITION_MAX_AGE = 60
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+
+@router.post("/preflight", response_model=AudioPreflightResponse)
+async def preflight_audio(
+    preflight_request: AudioPreflightRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """上传前查重：文件已存在时直接返回 file_id，创建题目时传入即可跳过上传"""
+    if current_user.role not in [ROLE_TEACHER, ROLE_ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有教师或管理员可以上传音频"
+        )
+
+    entry = await audio_service.preflight(preflight_request.sha256, preflight_request.size)
+    if entry is None:
+        return {"exists": False}
+
+    return {
+        "exists": True,
+        "file_id": entry['file_id'],
+        "url": f"/api/audio/{entry['file_id']}{entry['extension']}"
+    }
+
+
+@router.get("/cache-stats")
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    """热点音频缓存命中率与分发字节数"""
+    if current_user.role != ROLE_ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有管理员可以查看缓存统计"
+        )
+    if audio_service.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **audio_service.cache.stats()}
+
+
+@router.get("/{file_name}")
+async def stream_audio(
+    file_name: str,
+    request: Request,
+    rendition: str = Query(COMPACT_RENDITION, description="音频版本", regex="^(compact|original)$")
+):
+    match = AUDIO_NAME_PATTERN.match(file_name)
+    if not match:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="音频文件不存在"
+        )
+
+    file_id, extension = match.groups()
+    entry = await audio_service.get_audio_entry(file_id, extension)
+
+    # 默认分发转码后的 compact 版本；未生成时回退原文件
+    served = entry
+    max_age = settings.audio_cache_max_age
+    if rendition == COMPACT_RENDITION:
+        compact = entry.get('renditions', {}).get(COMPACT_RENDITION)
+        if compact is not None:
+            served = compact
+        else:
+            max_age = PENDING_RENDITION_MAX_AGE
+
+    # 内容寻址：文件一经写入永不改变，ETag 由内容哈希和版本构成
+    etag = f'"{file_id}-{rendition}"' if served is not entry else f'"{file_id}"'
+    cache_control = f"public, max-age={max_age}"
+    if max_age == settings.audio_cache_max_age:
+        cache_control += ", immutable"
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if entry['storage'] == 'oss':
+        if audio_service.cache is None:
+            # OSS 原生支持 Range，重定向到签名地址，应用不经手音频字节
+            signed_url = audio_service.sign_oss_url(served['storage_path'], settings.oss_signed_url_expires)
+            return RedirectResponse(
+                signed_url,
+                status_code=status.HTTP_302_FOUND,
+                headers={"Cache-Control": f"private, max-age={settings.oss_signed_url_expires // 2}"}
+            )
+
+        # 热点音频从本地缓存分发，同一场考试的音频只回源一次；
+        # 磁盘文件在发送完成前保持固定，不会被淘汰删除
+        cache = audio_service.cache
+        cached = await audio_service.read_through_cache(served, pin=True)
+        release = BackgroundTask(cache.release, cached.pinned) if cached.pinned else None
+        try:
+            return _serve_local(request, cached.path, cached.data, served, etag, headers, cache, release)
+        except Exception:
+            if cached.pinned:
+                await cache.release(cached.pinned)
+            raise
+
+    if settings.audio_x_accel_prefix:
+        # 交给 nginx 内部 location 用 sendfile 发送，Range 也由 nginx 处理
+        headers["X-Accel-Redirect"] = settings.audio_x_accel_prefix + audio_service.get_local_relative_path(served)
+        # Range 由 nginx 处理，这里按完整文件计数
+        audio_service.record_served(served['size'], 'x_accel')
+        return Response(media_type=served['content_type'], headers=headers)
+
+    storage_path = served['storage_path']
+    if not os.path.exists(storage_path):
+        logger.error(f"音频索引指向的文件不存在: {storage_path}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="音频文件不存在"
+        )
+
+    return _serve_local(request, storage_path, None, served, etag, headers)
+
+
+def _serve_local(
+    request: Request,
+    path: Optional[str],
+    data: Optional[bytes],
+    served: dict,
+    etag: str,
+    headers: dict,
+    cache: Optional[HotAudioCache] = None,
+    background: Optional[BackgroundTask] = None
+) -> Response:
+    """由应用直接发送本地文件或内存中的字节，支持单段 Range；background 在发送完成后执行"""
+    size = served['size']
+    byte_range = request_range(request, size, etag)
+
+    start, end = byte_range if byte_range else (0, size - 1)
+    if cache is not None:
+        cache.record_served(end - start + 1)
+    audio_service.record_served(end - start + 1, 'app' if cache is None else 'cache')
+
+    return range_response(path, data, size, byte_range, served['content_type'], headers, background)
@@ -0,0 +1,211 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+import logging
+
+from backend.app.core.config import settings
+from backend.app.core.database import get_db
+from backend.app.core.exceptions import create_http_exception
+from backend.app.repositories.exam_repository import ExamRepository
+from backend.app.schemas.exam import (
+    ExamPaperResponse,
+    ExamSessionResponse,
+    SaveProgressRequest,
+    SaveProgressResponse,
+    SubmissionStatusResponse,
+    SubmitExamRequest
+)
+from backend.app.services.autosave_buffer import get_autosave_buffer
+from backend.app.services.exam_token_cache import get_exam_token_cache
+from backend.app.services.paper_snapshot_service import get_paper_snapshot_service
+from backend.app.services.submission_queue import get_submission_queue
+
+
+router = APIRouter(prefix="/exam", tags=["在线答题"])
+logger = logging.getLogger(__name__)
+paper_snapshot_service = get_paper_snapshot_service()
+exam_token_cache = get_exam_token_cache()
+autosave_buffer = get_autosave_buffer()
+submission_queue = get_submission_queue()
+
+
+def _accepts_gzip(request: Request) -> bool:
+    accept_encoding = request.headers.get("accept-encoding", "")
+    return any(
+        part.split(";")[0].strip() == "gzip" and not part.replace(" ", "").endswith(";q=0")
+        for part in accept_encoding.split(",")
+    )
+
+
+def _invalid_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="考试链接无效"
+    )
+
+
+async def _get_token_context(exam_token: str, repository: ExamRepository) -> dict:
+    """token 上下文在发布时写入缓存，未命中再查库"""
+    context = await exam_token_cache.get(exam_token, lambda: repository.get_token_context(exam_token))
+    if context is None:
+        raise _invalid_token()
+    return context
+
+
+def _is_open(context: dict) -> bool:
+    return context['status'] in ('pending', 'in_progress')
+
+
+def _ensure_open(context: dict, action: str) -> None:
+    """已交卷、已过期或超过截止时间（含交卷宽限期）的答卷不再接受保存和交卷"""
+    if not _is_open(context):
+        raise create_http_exception(status.HTTP_409_CONFLICT, "该考试已交卷或已截止", "EXAM_CLOSED")
+    if datetime.now() > context['deadline'] + timedelta(seconds=settings.submission_grace_seconds):
+        raise create_http_exception(status.HTTP_400_BAD_REQUEST, f"考试已截止，无法{action}", "EXAM_OVERDUE")
+
+
+@router.get("/{exam_token}", response_model=ExamPaperResponse)
+async def get_exam_paper(
+    exam_token: str,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    返回试卷快照字节。token 上下文在发布时写入缓存，快照在发布时渲染并压缩，
+    开考高峰期的请求既不查询 token 也不查询题目。
+    """
+    repository = ExamRepository(db)
+    paper_id = (await _get_token_context(exam_token, repository))['paper_id']
+
+    snapshot = await paper_snapshot_service.get_snapshot(paper_id)
+    if snapshot is None:
+        # 早于快照功能发布的试卷在首次访问时补建
+        questions = repository.get_paper_questions(paper_id)
+        snapshot = await paper_snapshot_service.build_snapshot(paper_id, questions)
+
+    accepts_gzip = _accepts_gzip(request)
+    etag = snapshot.gzip_etag if accepts_gzip else snapshot.etag
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if accepts_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(snapshot.gzip_body, media_type="application/json", headers=headers)
+    return Response(snapshot.body, media_type="application/json", headers=headers)
+
+
+@router.get("/{exam_token}/session", response_model=ExamSessionResponse)
+async def get_exam_session(
+    exam_token: str,
+    db: Session = Depends(get_db)
+):
+    """
+    学生本人的答题信息（姓名、截止时间、已保存的作答）。上下文来自 token 缓存，
+    答题期间作答来自写缓冲：每个学生首次读取时把数据库中的作答并入缓冲，之后刷新页面不再查库
+    """
+    repository = ExamRepository(db)
+    context = await _get_token_context(exam_token, repository)
+
+    buffered = await autosave_buffer.get_buffered(exam_token)
+    if _is_open(context):
+        if buffered is None or not buffered['loaded']:
+            buffered = await autosave_buffer.load_saved(exam_token, repository.get_saved_answers(exam_token) or {})
+        answers = buffered['answers']
+        current_question = buffered['current_question']
+    else:
+        # 交卷或截止后缓冲已清除，以数据库为准
+        answers = {**(repository.get_saved_answers(exam_token) or {}), **(buffered or {}).get('answers', {})}
+        current_question = None
+
+    return {
+        "paper_id": str(context['paper_id']),
+        "student_name": context['student_name'],
+        "status": context['status'],
+        "deadline": context['deadline'],
+        "duration": context['duration'],
+        "answers": answers,
+        "current_question": current_question
+    }
+
+
+@router.post("/{exam_token}/save-progress", response_model=SaveProgressResponse, status_code=status.HTTP_202_ACCEPTED)
+async def save_progress(
+    exam_token: str,
+    progress: SaveProgressRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    自动保存：只需发送变化的作答和递增的 seq，写入缓冲后立即返回，由后台批量写回数据库。
+    seq 不大于已接受序号的增量返回409，detail.seq 为已接受的最大序号，
+    客户端应把序号推进到该值之后，把这些变化并入下一次保存重新发送。
+    已交卷、已进入交卷队列或已截止的答卷不再接受保存。
+    """
+    context = await _get_token_context(exam_token, ExamRepository(db))
+    _ensure_open(context, "保存")
+    if await submission_queue.get_status(exam_token) is not None:
+        raise create_http_exception(status.HTTP_409_CONFLICT, "该考试已交卷或已截止", "EXAM_CLOSED")
+    accepted, seq = await autosave_buffer.save(
+        exam_token, progress.answers, progress.current_question, progress.seq
+    )
+    if not accepted:
+        raise create_http_exception(
+            status.HTTP_409_CONFLICT,
+            f"保存序号已过期，当前已接受序号为 {seq}",
+            "STALE_PROGRESS_SEQ",
+            seq=seq
+        )
+    return {"saved_at": datetime.now(), "seq": seq}
+
+
+@router.post("/{exam_token}/submit", response_model=SubmissionStatusResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_exam(
+    exam_token: str,
+    submission: SubmitExamRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    交卷：校验 token 后写入交卷队列立即返回回执，判分和写库由后台完成，
+    客户端通过 /submission 轮询结果。重复交卷返回第一次的回执。
+    """
+    existing = await submission_queue.get_status(exam_token)
+    if existing is not None:
+        return existing
+
+    _ensure_open(await _get_token_context(exam_token, ExamRepository(db)), "交卷")
+
+    created, receipt = await submission_queue.enqueue(exam_token, submission.answers, submission.time_spent)
+    if created:
+        logger.info(f"交卷入队: {exam_token}")
+    return receipt
+
+
+@router.get("/{exam_token}/submission", response_model=SubmissionStatusResponse)
+async def get_submission_status(
+    exam_token: str,
+    db: Session = Depends(get_db)
+):
+    """查询交卷状态；队列中的状态过期后以数据库为准"""
+    receipt = await submission_queue.get_status(exam_token)
+    if receipt is not None:
+        return receipt
+
+    context = ExamRepository(db).get_exam_context(exam_token)
+    if not context:
+        raise _invalid_token()
+    if context['status'] != 'submitted':
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="尚未交卷"
+        )
+    return {
+        "exam_token": exam_token,
+        "status": "graded",
+        "submitted_at": context['submitted_at'],
+        "score": float(context['score']) if context['score'] is not None else None
+    }
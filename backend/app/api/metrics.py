@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import Response
+import asyncio
+
+from backend.app.core.config import settings
+from backend.app.core.metrics import CONTENT_TYPE_LATEST, REGISTRY
+from backend.app.core.metrics_multiprocess import get_multiprocess_metrics
+
+
+router = APIRouter(tags=["监控"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus 文本格式的指标，供内网抓取；多 worker 部署时汇总所有 worker"""
+    if not settings.metrics_enabled:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="监控指标未开启"
+        )
+    multiprocess = get_multiprocess_metrics()
+    if multiprocess is not None:
+        return Response(await asyncio.to_thread(multiprocess.render), media_type=CONTENT_TYPE_LATEST)
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,177 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import AsyncIterator, List, Union
+import logging
+
+from backend.app.core.config import settings
+from backend.app.core.database import get_db
+from backend.app.core.json_codec import dumps
+from backend.app.core.security import get_current_user
+from backend.app.models.user import User
+from backend.app.repositories.exam_repository import ExamRepository
+from backend.app.schemas.exam import BulkPublishRequest, PublishRequest, PublishResponse
+from backend.app.services.exam_analytics import get_exam_analytics
+from backend.app.services.exam_audio_service import get_exam_audio_service
+from backend.app.services.exam_publisher import PublishedExams, create_exams, get_qr_code_renderer
+from backend.app.services.exam_token_cache import get_exam_token_cache
+from backend.app.services.paper_snapshot_service import get_paper_snapshot_service
+
+
+router = APIRouter(prefix="/papers", tags=["试卷管理"])
+logger = logging.getLogger(__name__)
+exam_audio_service = get_exam_audio_service()
+paper_snapshot_service = get_paper_snapshot_service()
+exam_token_cache = get_exam_token_cache()
+qr_code_renderer = get_qr_code_renderer()
+exam_analytics = get_exam_analytics()
+
+ROLE_TEACHER = "teacher"
+ROLE_ADMIN = "admin"
+
+
+def _require_teacher(current_user: User) -> None:
+    if current_user.role not in [ROLE_TEACHER, ROLE_ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有教师或管理员可以发布试卷"
+        )
+
+
+def _get_paper(repository: ExamRepository, paper_id: str) -> dict:
+    paper = repository.get_paper(paper_id)
+    if not paper:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="试卷不存在"
+        )
+    return paper
+
+
+def _create_exams(
+    db: Session,
+    repository: ExamRepository,
+    paper: dict,
+    class_ids: List[str],
+    request: Union[PublishRequest, BulkPublishRequest],
+    current_user: User
+) -> PublishedExams:
+    try:
+        published = create_exams(
+            repository,
+            paper,
+            class_ids,
+            deadline=request.deadline,
+            duration=request.duration,
+            name=request.name,
+            created_by=current_user.id,
+            exam_base_url=settings.exam_base_url
+        )
+        if not published.links:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="班级中没有学生"
+            )
+        db.commit()
+        return published
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"发布试卷失败: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="发布试卷失败，请重试"
+        )
+
+
+async def _prepare_exam(repository: ExamRepository, paper_id: str, published: PublishedExams) -> None:
+    """
+    发布时生成一次试卷音频清单（同时预热热点缓存）、试卷快照和 token 上下文，开考时不再查库；
+    同时初始化各班级的逐题统计，之后随判分增量更新。
+    考试此时已提交到数据库，这些都是可重建的缓存（token 上下文和快照未命中时查库补建，
+    统计未初始化时按需重算），任一步失败只记录日志，仍返回发布结果，避免教师重试时重复发布。
+    """
+    try:
+        questions = repository.get_paper_questions(paper_id)
+    except Exception as e:
+        logger.error(f"试卷 {paper_id} 发布后读取题目失败: {e!r}")
+        return
+
+    steps = {
+        "音频清单": lambda: exam_audio_service.build_manifest(paper_id, questions),
+        "试卷快照": lambda: paper_snapshot_service.build_snapshot(paper_id, questions),
+        "token 上下文": lambda: exam_token_cache.put_many(published.token_contexts),
+        "逐题统计": lambda: exam_analytics.initialize(
+            paper_id, published.exam_ids.keys(), [question['id'] for question in questions]
+        ),
+    }
+    for name, step in steps.items():
+        try:
+            await step()
+        except Exception as e:
+            logger.error(f"试卷 {paper_id} 发布后生成{name}失败: {e!r}")
+
+
+@router.post("/{paper_id}/publish", response_model=PublishResponse, status_code=status.HTTP_201_CREATED)
+async def publish_paper(
+    paper_id: str,
+    publish_request: PublishRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    _require_teacher(current_user)
+    repository = ExamRepository(db)
+    paper = _get_paper(repository, paper_id)
+
+    published = _create_exams(db, repository, paper, [publish_request.class_id], publish_request, current_user)
+    await _prepare_exam(repository, paper_id, published)
+    qr_codes = await qr_code_renderer.render([link['exam_url'] for link in published.links])
+
+    logger.info(f"教师 {current_user.username} 将试卷 {paper_id} 发布到班级 {publish_request.class_id}")
+
+    return {
+        "exam_id": published.exam_ids[str(publish_request.class_id)],
+        "exam_links": [
+            {"student_id": link['student_id'], "exam_url": link['exam_url'], "qr_code": qr_code}
+            for link, qr_code in zip(published.links, qr_codes)
+        ]
+    }
+
+
+@router.post("/{paper_id}/publish/bulk", status_code=status.HTTP_201_CREATED)
+async def bulk_publish_paper(
+    paper_id: str,
+    publish_request: BulkPublishRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    年级发布：所有班级的考试和答题记录在一个事务中批量写入，
+    之后二维码在进程池中渲染，答题链接按 NDJSON 逐行流式返回（每行一个 BulkExamLink）。
+    """
+    _require_teacher(current_user)
+    repository = ExamRepository(db)
+    paper = _get_paper(repository, paper_id)
+
+    class_ids = list(dict.fromkeys(publish_request.class_ids))
+    published = _create_exams(db, repository, paper, class_ids, publish_request, current_user)
+    await _prepare_exam(repository, paper_id, published)
+
+    logger.info(
+        f"教师 {current_user.username} 将试卷 {paper_id} 发布到 {len(class_ids)} 个班级，"
+        f"共 {len(published.links)} 名学生"
+    )
+
+    async def stream_links() -> AsyncIterator[bytes]:
+        links = iter(published.links)
+        async for qr_codes in qr_code_renderer.render_chunks([link['exam_url'] for link in published.links]):
+            yield b"".join(dumps({**next(links), "qr_code": qr_code}) + b"\n" for qr_code in qr_codes)
+
+    return StreamingResponse(
+        stream_links(),
+        status_code=status.HTTP_201_CREATED,
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from backend.app.core.profiler import get_profile_store
+from backend.app.core.security import get_current_user
+from backend.app.models.user import User
+
+
+router = APIRouter(prefix="/profiles", tags=["性能分析"])
+
+ROLE_ADMIN = "admin"
+
+
+@router.get("/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("json", description="返回格式", regex="^(json|collapsed)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    按响应头 X-Profile-ID 查询请求的采样结果。collapsed 格式可直接交给 flamegraph.pl 或 speedscope 生成火焰图
+    """
+    if current_user.role != ROLE_ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有管理员可以查看性能分析结果"
+        )
+
+    profile = await get_profile_store().get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="采样结果不存在或已过期"
+        )
+
+    if format == "collapsed":
+        return PlainTextResponse(profile["collapsed"] + "\n")
+    return profile
@@ -3,11 +3,15 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 import logging
 
+from backend.app.core.config import settings
 from backend.app.core.database import get_db
+from backend.app.core.responses import model_response
 from backend.app.core.security import get_current_user
 from backend.app.models.question import Question
 from backend.app.models.user import User
-from backend.app.services.audio_service import AudioService
+from backend.app.repositories.exam_repository import ExamRepository
+from backend.app.services.audio_service import get_audio_service
+from backend.app.services.paper_snapshot_service import SNAPSHOT_QUESTION_FIELDS, get_paper_snapshot_service
 from backend.app.schemas.question import (
     QuestionCreate,
     QuestionUpdate,
@@ -19,7 +23,8 @@ from sqlalchemy import func
 
 router = APIRouter(prefix="/questions", tags=["题库管理"])
 logger = logging.getLogger(__name__)
-audio_service = AudioService()
+audio_service = get_audio_service()
+paper_snapshot_service = get_paper_snapshot_service()
 
 ROLE_TEACHER = "teacher"
 ROLE_ADMIN = "admin"
@@ -35,6 +40,7 @@ async def create_question(
     options: Optional[str] = Form(None, description="选项列表", max_length=2000),
     correct_answer: str = Form(..., description="正确答案", max_length=100),
     audio_file: Optional[UploadFile] = File(None),
+    audio_file_id: Optional[str] = Form(None, description="预检命中时返回的音频ID，提供后无需上传文件", max_length=64),
     reading_material: Optional[str] = Form(None, description="阅读材料", max_length=10000),
     knowledge_points: Optional[str] = Form(None, description="知识点", max_length=500),
     tags: Optional[str] = Form(None, description="标签", max_length=500),
@@ -66,14 +72,22 @@ async def create_question(
         )
 
     # 验证听力题音频要求
-    if type == "listening" and not audio_file:
+    if type == "listening" and not audio_file and not audio_file_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="听力题必须上传音频文件"
         )
 
-    audio_file_id = None
-    if audio_file:
+    if audio_file_id and not audio_file:
+        # 预检已确认文件存在，这里仍核对索引，防止引用不存在的音频
+        try:
+            await audio_service.get_audio_url(audio_file_id)
+        except HTTPException:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="音频文件不存在，请重新上传"
+            )
+    elif audio_file:
         try:
             upload_result = await audio_service.upload_audio(audio_file)
             audio_file_id = upload_result['file_id']
@@ -167,12 +181,16 @@ async def list_questions(
 
     questions = query.offset((page - 1) * page_size).limit(page_size).all()
 
-    return {
+    result = {
         "total": total,
         "page": page,
         "page_size": page_size,
         "questions": questions
     }
+    if settings.fast_json_enabled:
+        # 一页100道题时序列化开销明显，直接由 pydantic-core 输出字节
+        return model_response(QuestionListResponse, result)
+    return result
 
 
 @router.get("/{question_id}", response_model=QuestionResponse)
@@ -192,6 +210,17 @@ async def get_question(
     return question
 
 
+async def _rebuild_paper_snapshots(repository: ExamRepository, question_id: str) -> None:
+    """已发布试卷的快照在发布时渲染，修改其中的题目后重新生成，学生端随之看到修改后的内容"""
+    for paper_id in repository.get_question_paper_ids(question_id):
+        if await paper_snapshot_service.get_snapshot(paper_id) is None:
+            continue
+        try:
+            await paper_snapshot_service.rebuild_snapshot(paper_id, repository.get_paper_questions(paper_id))
+        except Exception as e:
+            logger.error(f"重建试卷 {paper_id} 快照失败: {e!r}")
+
+
 @router.put("/{question_id}", response_model=QuestionResponse)
 async def update_question(
     question_id: str,
@@ -237,6 +266,9 @@ async def update_question(
 
     logger.info(f"教师 {current_user.username} 更新了题目 {question_id}")
 
+    if any(field in update_data for field in SNAPSHOT_QUESTION_FIELDS):
+        await _rebuild_paper_snapshots(ExamRepository(db), question_id)
+
     return question
 
 
@@ -260,9 +292,8 @@ async def delete_question(
             detail="您没有权限删除此题目"
         )
 
-    if question.audio_file_id:
-        await audio_service.delete_audio(question.audio_file_id)
-
+    # 音频按内容去重，可能被其他题目共用，不在这里删除；
+    # 不再被任何题目引用后由孤立音频回收器删除
     try:
         db.delete(question)
         db.commit()
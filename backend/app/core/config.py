@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 
 class Settings(BaseSettings):
@@ -24,12 +24,97 @@ class Settings(BaseSettings):
     aliyun_oss_bucket: str = ""
     
     local_storage_path: str = "./uploads"
+    # 音频分发：设置后本地文件交由nginx内部location发送（X-Accel-Redirect），为空则由应用直接发送
+    audio_x_accel_prefix: str = ""
+    audio_cache_max_age: int = 365 * 24 * 3600  # 文件按内容哈希命名，可长期缓存
+    oss_signed_url_expires: int = 3600
+    # 阻塞存储调用线程池
+    storage_executor_workers: int = 8
+    storage_call_timeout: float = 30.0
+    storage_call_retries: int = 2
+    # 上传后转码：单声道低码率版本，默认分发该版本
+    audio_transcode_enabled: bool = True
+    audio_transcode_workers: int = 2
+    audio_compact_bitrate: str = "48k"
+    audio_compact_sample_rate: int = 22050
+    # OSS 前的热点音频缓存（内存 + 本地磁盘，LRU）
+    audio_cache_enabled: bool = True
+    audio_cache_dir: str = "./cache/audio"
+    audio_cache_memory_limit: int = 64 * 1024 * 1024  # 64MB
+    audio_cache_disk_limit: int = 2 * 1024 * 1024 * 1024  # 2GB
+    audio_cache_warm_concurrency: int = 4  # 发布后后台预热的并发回源数
+    # 孤立音频回收
+    audio_gc_enabled: bool = True
+    audio_gc_interval_seconds: int = 6 * 3600
+    audio_gc_batch_size: int = 200
+    audio_gc_batch_pause: float = 1.0
+    audio_gc_min_age_hours: int = 24
+    audio_gc_max_deletes_per_run: int = 1000
     
     # 应用设置
     environment: str = "development"
     debug: bool = True
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     allowed_audio_types: List[str] = ["audio/mpeg", "audio/wav", "audio/mp3"]
+    exam_base_url: str = "http://localhost:3000"  # 学生答题链接的前端地址
+    # 快速JSON序列化：orjson / msgspec 编码响应，列表接口由 pydantic-core 直接输出
+    fast_json_enabled: bool = True
+    # 试卷快照：发布时预渲染、预压缩，无Redis时写入本地目录
+    paper_snapshot_dir: str = "./cache/papers"
+    paper_snapshot_memory_items: int = 32
+    paper_snapshot_local_ttl_seconds: float = 5.0  # 修改题目重建快照后，其他 worker 最多滞后该秒数
+    # 发布：二维码在进程池中渲染（0 表示在线程中渲染），答题记录多行 INSERT 写入
+    publish_qr_workers: int = 2
+    publish_qr_chunk_size: int = 32
+    # 成绩报表导出：后台写入报表目录；设置前缀后下载交由nginx内部location发送
+    report_export_dir: str = "./exports/reports"
+    report_export_workers: int = 2
+    report_x_accel_prefix: str = ""
+    report_cleanup_interval_seconds: int = 3600  # 任务状态24小时过期后报表由该间隔的清理删除
+    # 答题 token 上下文缓存：进程内条目最多滞后 local_ttl 秒于其他 worker 的状态变化
+    exam_token_cache_items: int = 20000
+    exam_token_local_ttl_seconds: float = 5.0
+    # 自动保存写缓冲：先写Redis立即返回，后台批量写回数据库
+    autosave_flush_interval: float = 3.0
+    autosave_batch_size: int = 500
+    autosave_buffer_ttl_seconds: int = 2 * 24 * 3600
+    # 交卷队列：请求只入队并返回回执，后台 worker 成批判分写回
+    submission_workers: int = 4
+    submission_batch_size: int = 100
+    submission_status_ttl_seconds: int = 2 * 24 * 3600
+    submission_claim_idle_seconds: float = 60.0
+    submission_max_deliveries: int = 10  # 超过后移入死信流 submissions:dead，不再重试
+    submission_grace_seconds: int = 60  # 截止后仍接受交卷的时间，抵消网络延迟
+    # 截止判分：过了交卷宽限期再等待 delay 秒（留给队列中的交卷），按已保存的作答给未交卷的答卷判分
+    deadline_grading_interval_seconds: float = 30.0
+    deadline_grading_delay_seconds: int = 120
+    deadline_grading_batch_exams: int = 50
+    # 监控：/metrics 仅供内网 Prometheus 抓取，nginx 不对外暴露
+    metrics_enabled: bool = True
+    # 多 worker 部署时各 worker 写入指标的共享目录（每次部署前清空，建议 tmpfs），/metrics 汇总所有 worker；
+    # 为空时只输出当前进程的指标，仅适用于单 worker
+    metrics_multiproc_dir: str = ""
+    metrics_flush_interval_seconds: float = 5.0
+    # 按需采样分析：令牌为空且采样率为0时完全关闭
+    profiler_token: str = ""  # 请求头 X-Profile-Token 与之相同时采样该请求
+    profiler_sample_rate: float = 0.0
+    profiler_interval: float = 0.005
+    profiler_ttl_seconds: int = 24 * 3600
+    # 限流（令牌桶）：路由前缀 -> [每秒补充令牌数, 桶容量]，按登录用户计，
+    # 学生答题接口按 exam_token 计，其余匿名请求按 IP + 路由模板计
+    rate_limit_routes: Dict[str, List[float]] = {
+        "/api/questions": [5, 20],
+        "/api/exam": [2, 10],
+        "/api/papers": [2, 10],
+    }
+    # 按IP的总预算，同一学校出口IP下的整班学生共享
+    rate_limit_ip_rate: float = 50.0
+    rate_limit_ip_burst: float = 200.0
+    # 不计入按IP预算的路由前缀：整班同时预取试卷音频（每人几十个文件加 Range 续传）会耗尽整个出口IP的预算
+    rate_limit_ip_exempt: List[str] = ["/api/audio"]
+    # 只信任来自这些地址（nginx 容器所在网段）的 X-Real-IP；为空时按直连地址计
+    rate_limit_trusted_proxies: List[str] = []
+    rate_limit_redis_retry_seconds: float = 5.0
     
     # 组卷算法设置
     paper_generation_tolerance: float = 0.05
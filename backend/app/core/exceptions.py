@@ -49,11 +49,11 @@ class UnauthorizedAction(BaseAppException):
         )
 
 
-def create_http_exception(status_code: int, message: str, error_code: str = None) -> HTTPException:
-    """创建标准化的HTTP异常"""
+def create_http_exception(status_code: int, message: str, error_code: str = None, **fields) -> HTTPException:
+    """创建标准化的HTTP异常，fields 作为结构化字段放入 detail 供客户端读取"""
     headers = {"X-Error-Code": error_code} if error_code else {}
     return HTTPException(
         status_code=status_code,
-        detail={"message": message, "error_code": error_code},
+        detail={"message": message, "error_code": error_code, **fields},
         headers=headers
     )
\ No newline at end of file
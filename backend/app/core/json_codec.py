@@ -0,0 +1,79 @@
+"""
+JSON 编码
+
+按可用性依次选择 orjson、msgspec、标准库 json，输出紧凑的 UTF-8 字节。
+三者对 UUID / datetime / Decimal / Enum 的处理与 FastAPI 的 jsonable_encoder 保持一致，输出逐字节相同：
+Decimal 没有小数位时输出整数，否则输出浮点数（Decimal('80.00') -> 80.0）。
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+from uuid import UUID
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _decimal(value: Decimal) -> Any:
+    # 与 fastapi.encoders.decimal_encoder 相同
+    return int(value) if value.as_tuple().exponent >= 0 else float(value)
+
+
+def _convert_decimals(obj: Any) -> Any:
+    """msgspec 总是自己编码 Decimal（不经过 enc_hook），编码前先转换"""
+    if isinstance(obj, Decimal):
+        return _decimal(obj)
+    if isinstance(obj, dict):
+        return {key: _convert_decimals(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return [_convert_decimals(value) for value in obj]
+    return obj
+
+
+def _default(obj: Any) -> Any:
+    """编码库不认识的类型"""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return _decimal(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+elif msgspec is not None:
+    JSON_BACKEND = "msgspec"
+    _encoder = msgspec.json.Encoder(enc_hook=_default)
+
+    def dumps(content: Any) -> bytes:
+        return _encoder.encode(_convert_decimals(content))
+
+else:
+    JSON_BACKEND = "json"
+
+    def dumps(content: Any) -> bytes:
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+        ).encode("utf-8")
@@ -0,0 +1,73 @@
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, List
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+StopHook = Callable[[], Awaitable[None]]
+
+
+async def start_background_services() -> List[StopHook]:
+    """启动时的一次性迁移和后台任务，返回按启动顺序排列的停止函数"""
+    from backend.app.core.config import settings
+    from backend.app.core.metrics_multiprocess import get_multiprocess_metrics
+    from backend.app.services.audio_gc import create_orphan_audio_collector
+    from backend.app.services.audio_service import get_audio_service
+    from backend.app.services.autosave_buffer import get_autosave_buffer
+    from backend.app.services.deadline_grader import get_deadline_grader
+    from backend.app.services.report_export import get_report_export_service
+    from backend.app.services.submission_queue import get_submission_queue
+
+    stops: List[StopHook] = []
+
+    try:
+        await get_audio_service().ensure_manifest()
+    except Exception as e:
+        # 回填失败不阻止启动，下次启动重试
+        logger.error(f"音频索引回填失败: {e!r}")
+
+    autosave_buffer = get_autosave_buffer()
+    autosave_buffer.start(settings.autosave_flush_interval)
+    stops.append(autosave_buffer.stop)
+
+    submission_queue = get_submission_queue()
+    submission_queue.start(settings.submission_workers)
+    stops.append(submission_queue.stop)
+
+    deadline_grader = get_deadline_grader()
+    deadline_grader.start(settings.deadline_grading_interval_seconds)
+    stops.append(deadline_grader.stop)
+
+    report_export_service = get_report_export_service()
+    report_export_service.start_cleanup(settings.report_cleanup_interval_seconds)
+    stops.append(report_export_service.stop)
+
+    if settings.audio_gc_enabled:
+        collector = create_orphan_audio_collector()
+        collector.start(settings.audio_gc_interval_seconds)
+        stops.append(collector.stop)
+
+    multiprocess_metrics = get_multiprocess_metrics()
+    if multiprocess_metrics is not None:
+        multiprocess_metrics.start(settings.metrics_flush_interval_seconds)
+        stops.append(multiprocess_metrics.stop)
+
+    return stops
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    应用生命周期：启动时运行迁移并启动后台任务，关闭时按相反顺序停止。
+    在应用入口中使用：FastAPI(lifespan=lifespan)
+    """
+    stops = await start_background_services()
+    try:
+        yield
+    finally:
+        for stop in reversed(stops):
+            try:
+                await stop()
+            except Exception as e:
+                logger.error(f"后台任务停止失败: {e!r}")
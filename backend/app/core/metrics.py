@@ -0,0 +1,311 @@
+"""
+进程内监控指标
+
+轻量实现 Prometheus 文本格式的 Counter / Gauge / Histogram，不引入额外依赖。
+热路径上只有字典查找、整数加法和一次二分查找；带标签的子指标可由调用方缓存复用。
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import time
+
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# 延迟分桶（秒），覆盖从缓存命中到大文件导出
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    TYPE = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """按标签值取子指标，不存在时创建"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} 需要标签 {self.labelnames}")
+            child = self._children.setdefault(tuple(str(v) for v in values), self._new_child())
+        return child
+
+    def _samples(self, children: Dict[Tuple[str, ...], object]) -> Iterable[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def _state(self, child) -> object:
+        """子指标的可序列化状态，用于多进程汇总"""
+        raise NotImplementedError
+
+    def _add_state(self, child, state) -> None:
+        raise NotImplementedError
+
+    def dump(self) -> List[list]:
+        return [[list(values), self._state(child)] for values, child in list(self._children.items())]
+
+    def merge(self, dumps: Iterable[List[list]]) -> Dict[Tuple[str, ...], object]:
+        """把多个进程的 dump 按标签值相加"""
+        merged: Dict[Tuple[str, ...], object] = {}
+        for dumped in dumps:
+            for values, state in dumped:
+                child = merged.get(tuple(values))
+                if child is None:
+                    child = merged[tuple(values)] = self._new_child()
+                self._add_state(child, state)
+        return merged
+
+    def render(self, children: Optional[Dict[Tuple[str, ...], object]] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        for suffix, labels, value in self._samples(self._children if children is None else children):
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class _ValueChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._children[()].inc(amount)
+
+    def _samples(self, children):
+        for values, child in list(children.items()):
+            yield "", _format_labels(self.labelnames, values), child.value
+
+    def _state(self, child):
+        return child.value
+
+    def _add_state(self, child, state):
+        child.value += state
+
+
+class Gauge(Counter):
+    TYPE = "gauge"
+
+    def dec(self, amount: float = 1) -> None:
+        self._children[()].dec(amount)
+
+    def set(self, value: float) -> None:
+        self._children[()].set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # 最后一格为 +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+        registry=None
+    ):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def _state(self, child):
+        return [list(child.counts), child.sum]
+
+    def _add_state(self, child, state):
+        counts, total = state
+        for i, count in enumerate(counts):
+            child.counts[i] += count
+        child.sum += total
+
+    def _samples(self, children):
+        for values, child in list(children.items()):
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds + (float("inf"),), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield "_bucket", _format_labels(self.labelnames, values, le), cumulative
+            yield "_sum", _format_labels(self.labelnames, values), child.sum
+            yield "_count", _format_labels(self.labelnames, values), cumulative
+
+
+class MetricsRegistry:
+    """指标注册表，/metrics 端点按注册顺序输出"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"指标重复注册: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def dump(self) -> Dict[str, List[list]]:
+        """各指标的可序列化状态：{指标名: [[标签值, 状态], ...]}"""
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+    def render_merged(self, dumps: Sequence[Dict[str, List[list]]], skip_gauges: Sequence[int] = ()) -> str:
+        """
+        汇总多个进程的 dump 后输出：计数器和直方图相加，仪表盘也相加（如各进程在途请求数之和）。
+        skip_gauges 为 dumps 中只取累计值、不取仪表盘的下标（已退出的进程）
+        """
+        lines: List[str] = []
+        for name, metric in self._metrics.items():
+            dumped = [
+                d.get(name, []) for i, d in enumerate(dumps)
+                if not (metric.TYPE == "gauge" and i in skip_gauges)
+            ]
+            lines.extend(metric.render(metric.merge(dumped)))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# HTTP 请求
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "正在处理的请求数"
+)
+HTTP_REQUESTS_TOTAL = Counter(
+    "http_requests_total", "请求总数", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "请求处理耗时", ("method", "route")
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "单个请求执行的SQL条数", ("route",), buckets=DB_QUERY_COUNT_BUCKETS
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "单个请求的SQL累计耗时", ("route",)
+)
+
+# 数据库
+DB_QUERIES_TOTAL = Counter("db_queries_total", "SQL执行总数")
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "单条SQL耗时")
+
+# 缓存
+CACHE_REQUESTS_TOTAL = Counter(
+    "cache_requests_total", "缓存查询次数", ("cache", "result")
+)
+
+# 音频
+AUDIO_BYTES_TOTAL = Counter(
+    "audio_bytes_total", "音频服务收发字节数", ("direction", "delivery")
+)
+
+# 存储线程池（oss2 同步调用）
+STORAGE_CALLS_TOTAL = Counter(
+    "storage_calls_total", "存储调用次数（含重试后的最终结果）", ("operation", "result")
+)
+STORAGE_RETRIES_TOTAL = Counter("storage_retries_total", "存储调用重试次数", ("operation",))
+STORAGE_TIMEOUTS_TOTAL = Counter("storage_timeouts_total", "存储调用超时次数", ("operation",))
+STORAGE_REJECTED_TOTAL = Counter(
+    "storage_rejected_total", "线程池被未返回的调用占满时拒绝的调用次数", ("operation",)
+)
+STORAGE_CALL_DURATION = Histogram("storage_call_duration_seconds", "单次存储调用耗时", ("operation",))
+STORAGE_THREADS_BUSY = Gauge(
+    "storage_threads_busy", "存储线程池中仍在执行的调用数，包括已超时但线程尚未返回的调用"
+)
+
+
+class RequestStats:
+    """单个请求内累计的数据库开销，由中间件创建、SQL事件钩子累加"""
+    __slots__ = ("db_queries", "db_seconds")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def instrument_engine(engine) -> None:
+    """
+    为 SQLAlchemy engine 挂载计时钩子，在创建 engine 处调用一次。
+    异步 engine 挂载在其 sync_engine 上。
+    """
+    from sqlalchemy import event
+
+    target = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(target, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(target, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_start
+        DB_QUERIES_TOTAL.inc()
+        DB_QUERY_DURATION.observe(elapsed)
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_seconds += elapsed
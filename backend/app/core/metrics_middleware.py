@@ -0,0 +1,60 @@
+from time import perf_counter
+
+from backend.app.core.metrics import (
+    HTTP_REQUEST_DB_QUERIES,
+    HTTP_REQUEST_DB_SECONDS,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_FLIGHT,
+    HTTP_REQUESTS_TOTAL,
+    RequestStats,
+    current_request_stats,
+)
+
+
+# 未匹配到路由的请求合并为一个标签值，避免扫描类请求撑爆标签基数
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    请求指标中间件
+
+    纯ASGI实现：按路由模板（如 /exam/{exam_token}）记录延迟、状态码、
+    在途请求数以及本请求执行的SQL条数和耗时。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            current_request_stats.reset(token)
+
+            # 路由匹配后 FastAPI 会把命中的路由写回 scope
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+            HTTP_REQUESTS_TOTAL.labels(method, route_path, str(status_code)).inc()
+            HTTP_REQUEST_DURATION.labels(method, route_path).observe(elapsed)
+            HTTP_REQUEST_DB_QUERIES.labels(route_path).observe(stats.db_queries)
+            HTTP_REQUEST_DB_SECONDS.labels(route_path).observe(stats.db_seconds)
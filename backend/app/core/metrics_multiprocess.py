@@ -0,0 +1,111 @@
+"""
+多 worker 部署的指标汇总
+
+指标注册表在每个进程内各自累计，多 worker 时 /metrics 只能看到处理该次抓取的那个 worker。
+设置 metrics_multiproc_dir 后，每个 worker 定期把自己的指标写入该目录下的 {pid}.json，
+/metrics 汇总目录中所有文件（当前进程用实时值），其他 worker 的数据最多滞后一个写入间隔。
+已退出进程的计数器和直方图保留，总数不会回退；仪表盘只取仍在运行的进程。
+目录应在每次部署启动前清空（如挂载 tmpfs），否则进程号复用时会覆盖上一次部署的同名文件。
+"""
+from typing import Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+
+from backend.app.core.metrics import REGISTRY, MetricsRegistry
+
+
+logger = logging.getLogger(__name__)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MultiprocessMetrics:
+    def __init__(self, directory: str, registry: MetricsRegistry = REGISTRY, pid: Optional[int] = None):
+        self.directory = directory
+        self.registry = registry
+        self.pid = pid or os.getpid()
+        self._task: Optional[asyncio.Task] = None
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{self.pid}.json")
+
+    def flush(self) -> None:
+        """原子地写入本进程的指标，读取方不会读到写了一半的文件"""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.registry.dump(), f, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+    def _load_others(self) -> List[tuple]:
+        others = []
+        for name in os.listdir(self.directory):
+            pid_str, extension = os.path.splitext(name)
+            if extension != '.json' or not pid_str.isdigit() or int(pid_str) == self.pid:
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    others.append((int(pid_str), json.load(f)))
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取 worker 指标文件失败: {name}, 错误: {e!r}")
+        return others
+
+    def render(self) -> str:
+        others = self._load_others()
+        dumps: List[Dict[str, List[list]]] = [self.registry.dump()] + [dumped for _, dumped in others]
+        exited = [i + 1 for i, (pid, _) in enumerate(others) if not _process_alive(pid)]
+        return self.registry.render_merged(dumps, skip_gauges=exited)
+
+    async def run_forever(self, interval: float) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"写入 worker 指标失败: {e!r}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float) -> asyncio.Task:
+        """在应用启动时调用，按固定间隔写入本进程的指标"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever(interval))
+        return self._task
+
+    async def stop(self) -> None:
+        """在应用关闭时调用，最后写入一次，退出后的累计值仍计入汇总"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"写入 worker 指标失败: {e!r}")
+
+
+_multiprocess_metrics: Optional[MultiprocessMetrics] = None
+
+
+def get_multiprocess_metrics() -> Optional[MultiprocessMetrics]:
+    """未设置 metrics_multiproc_dir（单 worker 部署）时返回 None"""
+    global _multiprocess_metrics
+    if _multiprocess_metrics is None:
+        from backend.app.core.config import settings
+
+        if not settings.metrics_multiproc_dir:
+            return None
+        _multiprocess_metrics = MultiprocessMetrics(settings.metrics_multiproc_dir)
+    return _multiprocess_metrics
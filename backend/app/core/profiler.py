@@ -0,0 +1,158 @@
+"""
+按需采样分析器
+
+一个后台线程按固定间隔采样被标记请求所在的任务：任务正在运行时取事件循环线程的调用栈，
+任务挂起时沿协程的 await 链取等待位置（叶子记为 [await]），得到墙钟时间的分布。
+输出为 flamegraph.pl / speedscope 可直接读取的折叠栈格式（"a;b;c 次数"）。
+没有被标记的请求时采样线程不存在。
+"""
+from collections import Counter
+from typing import Dict, List, Optional
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+
+AWAIT_MARKER = "[await]"
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class ProfileSession:
+    """一次请求的采样结果"""
+
+    def __init__(self, task: asyncio.Task, thread_id: int):
+        self.task = task
+        self.thread_id = thread_id
+        self.root_frame = task.get_coro().cr_frame
+        self.samples: Counter = Counter()
+        self.started_at = time.perf_counter()
+        self.duration = 0.0
+
+    def collapsed(self) -> str:
+        """折叠栈文本，按次数降序"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def _running_stack(self, frame) -> Optional[List[str]]:
+        """从叶子帧向上回溯到请求任务的协程帧为止；找不到说明线程正在执行别的任务"""
+        stack = []
+        while frame is not None:
+            stack.append(_frame_label(frame))
+            if frame is self.root_frame:
+                stack.reverse()
+                return stack
+            frame = frame.f_back
+        return None
+
+    def _suspended_stack(self) -> List[str]:
+        stack = []
+        awaitable = self.task.get_coro()
+        while awaitable is not None:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+            if frame is None:
+                break
+            stack.append(_frame_label(frame))
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        stack.append(AWAIT_MARKER)
+        return stack
+
+    def sample(self, frames: Dict[int, object]) -> None:
+        if self.task.done():
+            return
+        stack = None
+        frame = frames.get(self.thread_id)
+        if frame is not None:
+            stack = self._running_stack(frame)
+        if stack is None:
+            stack = self._suspended_stack()
+        self.samples[";".join(stack)] += 1
+
+
+class SamplingProfiler:
+    """所有被采样请求共用一个采样线程，最后一个会话结束后线程退出"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._sessions: List[ProfileSession] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> ProfileSession:
+        """为当前任务开启采样，须在事件循环线程中调用"""
+        session = ProfileSession(asyncio.current_task(), threading.get_ident())
+        with self._lock:
+            self._sessions.append(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        return session
+
+    def stop(self, session: ProfileSession) -> ProfileSession:
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+        session.duration = time.perf_counter() - session.started_at
+        return session
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                sessions = list(self._sessions)
+                if not sessions:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for session in sessions:
+                session.sample(frames)
+            del frames
+            time.sleep(self.interval)
+
+
+class ProfileStore:
+    """
+    采样结果存储，按请求ID查询
+
+    有Redis时带过期时间写入，多进程共享；否则保存在进程内，只保留最近的若干条。
+    """
+    KEY_PREFIX = "profile:"
+
+    def __init__(self, redis_client=None, ttl: int = 24 * 3600, max_local: int = 100):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.max_local = max_local
+        self._local: Dict[str, str] = {}
+
+    async def save(self, profile_id: str, profile: dict) -> None:
+        raw = json.dumps(profile, ensure_ascii=False)
+        if self.redis:
+            await self.redis.setex(self.KEY_PREFIX + profile_id, self.ttl, raw)
+            return
+        self._local[profile_id] = raw
+        while len(self._local) > self.max_local:
+            self._local.pop(next(iter(self._local)))
+
+    async def get(self, profile_id: str) -> Optional[dict]:
+        if self.redis:
+            raw = await self.redis.get(self.KEY_PREFIX + profile_id)
+        else:
+            raw = self._local.get(profile_id)
+        return json.loads(raw) if raw else None
+
+
+_profile_store: Optional[ProfileStore] = None
+
+
+def get_profile_store() -> ProfileStore:
+    global _profile_store
+    if _profile_store is None:
+        from backend.app.core.config import settings
+        from backend.app.core.redis import get_redis
+
+        _profile_store = ProfileStore(get_redis(), ttl=settings.profiler_ttl_seconds)
+    return _profile_store
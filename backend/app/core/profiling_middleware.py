@@ -0,0 +1,110 @@
+from typing import Optional, Tuple
+import hmac
+import logging
+import random
+import re
+import uuid
+
+from backend.app.core.profiler import ProfileStore, SamplingProfiler, get_profile_store
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+REQUEST_ID_HEADER = b"x-request-id"
+PROFILE_ID_HEADER = b"x-profile-id"
+# 客户端传入的请求ID只作为采样结果中的关联字段，只接受短的安全字符
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class ProfilingMiddleware:
+    """
+    按需采样分析中间件
+
+    两种触发方式：请求带 X-Profile-Token 且与配置的管理员令牌一致，或按采样率随机抽取。
+    采样结果以服务端生成的随机ID为键保存，响应头 X-Profile-ID 返回该ID；
+    客户端的 X-Request-ID 只记录在结果中用于关联日志，不作为存储键（否则可以覆盖或猜出他人的采样结果）。
+    两者都未配置时直接透传，不读请求头也不包装 send。
+
+    注册方式：
+        app.add_middleware(
+            ProfilingMiddleware,
+            sample_rate=settings.profiler_sample_rate,
+            token=settings.profiler_token,
+            interval=settings.profiler_interval,
+        )
+    """
+
+    def __init__(
+        self,
+        app,
+        sample_rate: float = 0.0,
+        token: str = "",
+        interval: float = 0.005,
+        store: Optional[ProfileStore] = None
+    ):
+        self.app = app
+        self.enabled = sample_rate > 0 or bool(token)
+        self.sample_rate = sample_rate
+        self.token = token.encode() if token else b""
+        self.profiler = SamplingProfiler(interval)
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        selected, request_id = self._select(scope)
+        if not selected:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((PROFILE_ID_HEADER, profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        session = self.profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            self.profiler.stop(session)
+            await self._save(profile_id, request_id, scope, session)
+
+    def _select(self, scope) -> Tuple[bool, Optional[str]]:
+        """决定是否采样，同时返回客户端传入的请求ID"""
+        token = None
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == PROFILE_TOKEN_HEADER:
+                token = value
+            elif name == REQUEST_ID_HEADER:
+                candidate = value.decode("latin-1")
+                if REQUEST_ID_PATTERN.match(candidate):
+                    request_id = candidate
+
+        selected = token is not None and self.token and hmac.compare_digest(token, self.token)
+        if not selected:
+            selected = self.sample_rate > 0 and random.random() < self.sample_rate
+        return bool(selected), request_id
+
+    async def _save(self, profile_id: str, request_id: Optional[str], scope, session) -> None:
+        store = self.store or get_profile_store()
+        try:
+            await store.save(profile_id, {
+                "profile_id": profile_id,
+                "request_id": request_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "duration": round(session.duration, 6),
+                "interval": self.profiler.interval,
+                "samples": sum(session.samples.values()),
+                "collapsed": session.collapsed(),
+            })
+        except Exception as e:
+            logger.warning(f"保存采样结果失败: {profile_id}, 错误: {e!r}")
@@ -0,0 +1,106 @@
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Optional, Tuple
+import re
+
+import aiofiles
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单段 Range 头，返回闭区间 (start, end)。
+    头部格式不支持（如多段范围）或语法无效（起点大于终点）时返回None，按完整响应处理；
+    范围无法满足（起点超出文件、后缀长度为0）时抛出416。
+    """
+    match = re.fullmatch(r'\s*bytes=(\d*)-(\d*)\s*', range_header)
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+
+    start_str, end_str = match.groups()
+    if start_str == '':
+        # 后缀范围：bytes=-N 表示最后N个字节
+        length = int(end_str)
+        if length == 0:
+            raise _range_not_satisfiable(file_size)
+        start, end = max(file_size - length, 0), file_size - 1
+    else:
+        start = int(start_str)
+        if end_str and start > int(end_str):
+            # RFC 9110：起点大于终点的范围语法无效，忽略 Range 头
+            return None
+        end = min(int(end_str), file_size - 1) if end_str else file_size - 1
+
+    if start >= file_size:
+        raise _range_not_satisfiable(file_size)
+
+    return start, end
+
+
+def _range_not_satisfiable(file_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        detail="请求的范围无效",
+        headers={"Content-Range": f"bytes */{file_size}"}
+    )
+
+
+def request_range(request: Request, file_size: int, etag: str) -> Optional[Tuple[int, int]]:
+    """请求的字节范围；没有 Range 头、If-Range 与 ETag 不符或 Range 头被忽略时返回None"""
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if not range_header or (if_range is not None and if_range != etag):
+        return None
+    return parse_range(range_header, file_size)
+
+
+async def iter_file_range(path: str, start: int, end: int):
+    remaining = end - start + 1
+    async with aiofiles.open(path, 'rb') as f:
+        await f.seek(start)
+        while remaining > 0:
+            chunk = await f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def range_response(
+    path: Optional[str],
+    data: Optional[bytes],
+    file_size: int,
+    byte_range: Optional[Tuple[int, int]],
+    media_type: str,
+    headers: dict,
+    background: Optional[BackgroundTask] = None
+) -> Response:
+    """
+    发送本地文件（path）或内存中的字节（data）：byte_range 为 None 时返回完整内容的 200，
+    否则返回 206。两种情况都不再交给 FileResponse 解析 Range 头，
+    被 parse_range 忽略的范围（多段、语法无效）一律按完整响应处理。
+    background 在发送完成后执行。
+    """
+    headers = dict(headers)
+    start, end = byte_range if byte_range else (0, file_size - 1)
+    status_code = status.HTTP_200_OK
+    if byte_range is not None:
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+
+    if data is not None:
+        return Response(
+            data[start:end + 1], status_code=status_code, media_type=media_type, headers=headers, background=background
+        )
+
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        iter_file_range(path, start, end),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers,
+        background=background
+    )
@@ -0,0 +1,129 @@
+"""
+令牌桶限流
+
+一次请求可能同时消耗多个桶（按IP的总预算 + 按用户的路由预算），全部有余量才放行并同时扣减。
+Redis 模式用一个 Lua 脚本在服务端原子完成，所有 worker 共享同一份计数，时间取 Redis 的 TIME；
+Redis 不可用时退化为进程内计数，并在一段时间内不再尝试 Redis，避免每个请求都等待超时。
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import math
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# (键, 每秒补充令牌数, 桶容量)
+Bucket = Tuple[str, float, float]
+
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local states = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2 - 1])
+    local burst = tonumber(ARGV[i * 2])
+    local data = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or burst
+    local ts = tonumber(data[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    if tokens < 1 then
+        retry_after = math.max(retry_after, (1 - tokens) / rate)
+    end
+    states[i] = tokens
+end
+if retry_after > 0 then
+    return tostring(retry_after)
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2 - 1])
+    local burst = tonumber(ARGV[i * 2])
+    redis.call('HSET', key, 'tokens', states[i] - 1, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000) + 1000)
+end
+return '0'
+"""
+
+
+class LocalRateLimiter:
+    """进程内令牌桶，单 worker 内有效，作为 Redis 不可用时的兜底"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, List[float]] = {}
+
+    async def acquire(self, buckets: Sequence[Bucket]) -> float:
+        """返回0表示放行，否则为建议的重试等待秒数"""
+        return self.acquire_now(buckets, time.monotonic())
+
+    def acquire_now(self, buckets: Sequence[Bucket], now: float) -> float:
+        states = []
+        retry_after = 0.0
+        for key, rate, burst in buckets:
+            state = self._buckets.get(key)
+            if state is None:
+                tokens = burst
+            else:
+                tokens = min(burst, state[0] + (now - state[1]) * rate)
+            if tokens < 1:
+                retry_after = max(retry_after, (1 - tokens) / rate)
+            states.append(tokens)
+
+        if retry_after > 0:
+            return retry_after
+
+        for (key, rate, burst), tokens in zip(buckets, states):
+            tokens -= 1
+            # 第三项为桶回满的时刻，之后该桶与不存在等价
+            self._buckets[key] = [tokens, now, now + (burst - tokens) / rate]
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+        return 0.0
+
+    def _prune(self, now: float) -> None:
+        """丢弃已经回满的桶，它们与不存在等价"""
+        full = [key for key, state in self._buckets.items() if state[2] <= now]
+        for key in full:
+            del self._buckets[key]
+
+
+class RedisRateLimiter:
+    """Redis 令牌桶，多 worker 共享；Redis 出错时在 retry_interval 秒内改用进程内计数"""
+    KEY_PREFIX = "ratelimit:"
+
+    def __init__(self, redis_client, fallback: Optional[LocalRateLimiter] = None, retry_interval: float = 5.0):
+        self.redis = redis_client
+        self.fallback = fallback or LocalRateLimiter()
+        self.retry_interval = retry_interval
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._redis_down_until = 0.0
+
+    async def acquire(self, buckets: Sequence[Bucket]) -> float:
+        if time.monotonic() >= self._redis_down_until:
+            keys = [self.KEY_PREFIX + key for key, _, _ in buckets]
+            args = [value for _, rate, burst in buckets for value in (rate, burst)]
+            try:
+                result = await self._script(keys=keys, args=args)
+                return float(result)
+            except Exception as e:
+                logger.warning(f"Redis限流不可用，暂时改用进程内限流: {e!r}")
+                self._redis_down_until = time.monotonic() + self.retry_interval
+        return await self.fallback.acquire(buckets)
+
+
+_rate_limiter = None
+
+
+def get_rate_limiter():
+    global _rate_limiter
+    if _rate_limiter is None:
+        from backend.app.core.config import settings
+        from backend.app.core.redis import get_redis
+
+        _rate_limiter = RedisRateLimiter(get_redis(), retry_interval=settings.rate_limit_redis_retry_seconds)
+    return _rate_limiter
+
+
+def retry_after_header(seconds: float) -> bytes:
+    return str(max(1, math.ceil(seconds))).encode("ascii")
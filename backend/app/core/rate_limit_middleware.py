@@ -0,0 +1,172 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import ipaddress
+import json
+
+from starlette.routing import Match
+
+from backend.app.core.rate_limit import get_rate_limiter, retry_after_header
+
+try:
+    import jwt
+except ImportError:
+    jwt = None
+
+
+AUTHORIZATION_HEADER = b"authorization"
+BEARER_PREFIX = b"bearer "
+REAL_IP_HEADER = b"x-real-ip"
+
+RATE_LIMITED_BODY = json.dumps({"detail": "请求过于频繁，请稍后再试"}, ensure_ascii=False).encode("utf-8")
+
+
+class RateLimitMiddleware:
+    """
+    限流中间件
+
+    每个请求至多消耗两个令牌桶：
+    - 按客户端IP的总预算，限制单台机器的总请求量（同一学校NAT下的学生共享，需设得宽松）；
+      ip_exempt 中的路由前缀不计入（试卷音频整班同时预取，请求量远超按IP的预算）；
+    - 命中路由前缀时的路由预算，登录用户按验证过的令牌中的 sub 计；
+      路径参数中带 token_params（学生答题接口的 exam_token）时按该参数计，同一出口IP下的学生互不影响；
+      其余匿名请求和令牌验证失败的请求按 IP + 路由模板计，换一个路径参数不能拿到新桶。
+      不能按未验证的 Authorization 头计，否则每次换一个伪造的令牌就能拿到一个新桶。
+    只有直连地址在 trusted_proxies 中时才采用 X-Real-IP，否则客户端可以伪造该头绕过按IP的限制。
+    超限返回 429 和 Retry-After。
+
+    注册方式：
+        app.add_middleware(
+            RateLimitMiddleware,
+            routes=settings.rate_limit_routes,
+            ip_rate=settings.rate_limit_ip_rate,
+            ip_burst=settings.rate_limit_ip_burst,
+            ip_exempt=settings.rate_limit_ip_exempt,
+            trusted_proxies=settings.rate_limit_trusted_proxies,
+            secret_key=settings.secret_key,
+            algorithm=settings.algorithm,
+        )
+    """
+
+    def __init__(
+        self,
+        app,
+        routes: Optional[Dict[str, Sequence[float]]] = None,
+        ip_rate: float = 50.0,
+        ip_burst: float = 200.0,
+        ip_exempt: Sequence[str] = (),
+        token_params: Sequence[str] = ("exam_token",),
+        trusted_proxies: Sequence[str] = (),
+        secret_key: Optional[str] = None,
+        algorithm: str = "HS256",
+        limiter=None
+    ):
+        self.app = app
+        # 最长前缀优先
+        self.routes: List[tuple] = sorted(
+            ((prefix, float(rate), float(burst)) for prefix, (rate, burst) in (routes or {}).items()),
+            key=lambda item: len(item[0]),
+            reverse=True
+        )
+        self.ip_rate = ip_rate
+        self.ip_burst = ip_burst
+        self.ip_exempt = tuple(ip_exempt)
+        self.token_params = tuple(token_params)
+        # 反向代理的地址或网段
+        self.trusted_proxies = [ipaddress.ip_network(p, strict=False) for p in trusted_proxies]
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.limiter = limiter
+
+    def _is_trusted_proxy(self, address: str) -> bool:
+        if not self.trusted_proxies:
+            return False
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def _token_subject(self, authorization: bytes) -> Optional[str]:
+        """验证 Bearer 令牌并返回 sub，验证失败返回 None"""
+        if jwt is None or not self.secret_key or authorization[:7].lower() != BEARER_PREFIX:
+            return None
+        try:
+            payload = jwt.decode(authorization[7:].strip(), self.secret_key, algorithms=[self.algorithm])
+        except jwt.InvalidTokenError:
+            return None
+        subject = payload.get("sub")
+        return str(subject) if subject is not None else None
+
+    def _route_identity(self, scope, prefix: str, client_ip: str) -> str:
+        """
+        按应用的路由表取得路由模板和路径参数（中间件在路由之前执行，scope 中还没有匹配结果）。
+        只在需要按路由预算计的匿名请求上查找；未匹配任何路由时按路由前缀计。
+        """
+        template, path_params = self._match_route(scope)
+        for name in self.token_params:
+            if name in path_params:
+                return f"token:{path_params[name]}"
+        return f"anon:{client_ip}:{template or prefix}"
+
+    @staticmethod
+    def _match_route(scope) -> Tuple[Optional[str], dict]:
+        router = getattr(scope.get("app"), "router", None)
+        partial = None
+        for route in getattr(router, "routes", ()):
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                return route.path, child_scope.get("path_params", {})
+            if match == Match.PARTIAL and partial is None:
+                partial = (route.path, child_scope.get("path_params", {}))
+        return partial or (None, {})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        authorization = None
+        real_ip = None
+        for name, value in scope["headers"]:
+            if name == AUTHORIZATION_HEADER:
+                authorization = value
+            elif name == REAL_IP_HEADER:
+                real_ip = value
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        if real_ip is not None and self._is_trusted_proxy(client_ip):
+            client_ip = real_ip.decode("latin-1").strip()
+
+        path = scope["path"]
+        buckets = []
+        if not path.startswith(self.ip_exempt):
+            buckets.append(("ip:" + client_ip, self.ip_rate, self.ip_burst))
+        for prefix, rate, burst in self.routes:
+            if path.startswith(prefix):
+                subject = self._token_subject(authorization) if authorization else None
+                if subject is not None:
+                    identity = "user:" + subject
+                else:
+                    identity = self._route_identity(scope, prefix, client_ip)
+                buckets.append((f"route:{prefix}:{identity}", rate, burst))
+                break
+
+        if not buckets:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiter or get_rate_limiter()
+        retry_after = await limiter.acquire(buckets)
+        if retry_after > 0:
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(RATE_LIMITED_BODY)).encode("ascii")),
+                    (b"retry-after", retry_after_header(retry_after)),
+                ],
+            })
+            await send({"type": "http.response.body", "body": RATE_LIMITED_BODY})
+            return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,18 @@
+from typing import Optional
+import redis.asyncio as redis
+
+from backend.app.core.config import settings
+
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """获取共享的异步Redis客户端（首次调用时创建连接池）"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.from_url(
+            settings.redis_url,
+            max_connections=settings.redis_pool_size
+        )
+    return _redis_client
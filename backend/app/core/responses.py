@@ -0,0 +1,35 @@
+from typing import Any, Type
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from backend.app.core.config import settings
+from backend.app.core.json_codec import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """用 orjson / msgspec 编码的 JSON 响应，未安装时退回标准库"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def default_response_class() -> Type[JSONResponse]:
+    """
+    应用级默认响应类，创建应用时传入：
+        FastAPI(default_response_class=default_response_class())
+    """
+    return FastJSONResponse if settings.fast_json_enabled else JSONResponse
+
+
+def model_response(model_cls: Type[BaseModel], data: Any, status_code: int = 200) -> Response:
+    """
+    由 pydantic-core 直接完成校验和序列化（支持 ORM 对象），
+    跳过 FastAPI 对 response_model 的二次校验和 jsonable_encoder。
+    """
+    model = model_cls.model_validate(data, from_attributes=True)
+    return Response(
+        model_cls.__pydantic_serializer__.to_json(model),
+        status_code=status_code,
+        media_type="application/json"
+    )
@@ -1,30 +1,53 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-from fastapi import HTTPException, status
+from urllib.parse import unquote_to_bytes
+import json
 import re
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeadersMiddleware:
     """
     安全头中间件 - 为所有响应添加安全头部
+
+    纯ASGI实现：只包装 send，在 http.response.start 上追加预先编码好的头部，
+    响应体原样透传，不影响流式响应（音频、导出文件）。
     """
-    async def dispatch(self, request, call_next):
-        response = await call_next(request)
-        
-        # 设置安全头
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"  # 防止点击劫持
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=63072000; includeSubDomains; preload"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-        
-        return response
-
-
-class InputValidationMiddleware(BaseHTTPMiddleware):
+    SECURITY_HEADERS = [
+        (b"x-content-type-options", b"nosniff"),
+        (b"x-frame-options", b"DENY"),  # 防止点击劫持
+        (b"x-xss-protection", b"1; mode=block"),
+        (b"strict-transport-security", b"max-age=63072000; includeSubDomains; preload"),
+        (b"referrer-policy", b"strict-origin-when-cross-origin"),
+        (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+    ]
+    HEADER_NAMES = frozenset(name for name, _ in SECURITY_HEADERS)
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                # 与旧实现一致：同名头部以安全头为准
+                headers = [
+                    header for header in message.get("headers", ())
+                    if header[0].lower() not in self.HEADER_NAMES
+                ]
+                headers.extend(self.SECURITY_HEADERS)
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class InputValidationMiddleware:
     """
     输入验证中间件 - 防止常见的恶意输入
+
+    纯ASGI实现：黑名单合并为一个正则，直接匹配 scope 中的 path 和原始查询字节，
+    未命中时不解码、不重建字符串，也不包装响应。
     """
     # 黑名单正则表达式模式
     BLACKLIST_PATTERNS = [
@@ -37,40 +60,58 @@ class InputValidationMiddleware(BaseHTTPMiddleware):
         r'eval\s*\(',  # eval函数
         r'expression\s*\(',  # expression属性
     ]
-    
+    COMBINED_PATTERN = '|'.join(f'(?:{pattern})' for pattern in BLACKLIST_PATTERNS)
+
+    # 路径在 ASGI scope 中已是解码后的字符串，查询串是原始字节
+    PATH_PATTERN = re.compile(COMBINED_PATTERN, re.IGNORECASE)
+    QUERY_PATTERN = re.compile(COMBINED_PATTERN.encode(), re.IGNORECASE)
+    # 查询串中出现编码后的触发字符（< : = ( ）时才需要解码后复查
+    ENCODED_TRIGGER = re.compile(rb'%(?:3c|3a|3d|28)', re.IGNORECASE)
+
     def __init__(self, app):
-        super().__init__(app)
-        # 编译正则表达式以提高性能
-        self.compiled_patterns = [re.compile(patt, re.IGNORECASE) for patt in self.BLACKLIST_PATTERNS]
-
-    async def dispatch(self, request, call_next):
-        # 检查路径参数
-        path = request.url.path
-        if self._contains_malicious_content(path):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="请求路径包含恶意内容"
-            )
-        
-        # 检查查询参数
-        query_string = str(request.query_params)
-        if self._contains_malicious_content(query_string):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="查询参数包含恶意内容"
-            )
-        
-        response = await call_next(request)
-        return response
-    
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.PATH_PATTERN.search(scope["path"]):
+            await self._reject(send, "请求路径包含恶意内容")
+            return
+
+        query_string = scope.get("query_string", b"")
+        if query_string and self._query_contains_malicious(query_string):
+            await self._reject(send, "查询参数包含恶意内容")
+            return
+
+        await self.app(scope, receive, send)
+
+    def _query_contains_malicious(self, query_string: bytes) -> bool:
+        if self.QUERY_PATTERN.search(query_string):
+            return True
+        if self.ENCODED_TRIGGER.search(query_string):
+            decoded = unquote_to_bytes(query_string.replace(b"+", b" "))
+            return self.QUERY_PATTERN.search(decoded) is not None
+        return False
+
     def _contains_malicious_content(self, content: str) -> bool:
         """
         检查内容是否包含恶意模式
         """
         if not content:
             return False
-        
-        for pattern in self.compiled_patterns:
-            if pattern.search(content):
-                return True
-        return False
\ No newline at end of file
+        return self.PATH_PATTERN.search(content) is not None
+
+    @staticmethod
+    async def _reject(send, message: str) -> None:
+        body = json.dumps({"detail": message}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 400,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,392 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from typing import Dict, Iterator, List, Optional
+from datetime import datetime
+import json
+
+
+class ExamRepository:
+    """试卷发布与答题相关的数据访问"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_exam_context(self, exam_token: str) -> Optional[dict]:
+        """根据答题token获取学生、考试、试卷信息"""
+        row = self.db.execute(text("""
+            SELECT se.id AS student_exam_id, se.exam_id, se.student_id, se.status, se.answers,
+                   se.score, se.submitted_at,
+                   s.name AS student_name, e.paper_id, e.class_id, e.deadline, e.duration
+            FROM student_exams se
+            JOIN students s ON s.id = se.student_id
+            JOIN exams e ON e.id = se.exam_id
+            WHERE se.exam_token = :exam_token AND e.deleted_at IS NULL
+        """), {"exam_token": exam_token}).mappings().first()
+        return dict(row) if row else None
+
+    def get_token_context(self, exam_token: str) -> Optional[dict]:
+        """token 上下文缓存未命中时使用，只查发布后不变的字段和状态"""
+        row = self.db.execute(text("""
+            SELECT se.id AS student_exam_id, se.exam_id, se.student_id, se.status,
+                   s.name AS student_name, e.paper_id, e.class_id, e.deadline, e.duration
+            FROM student_exams se
+            JOIN students s ON s.id = se.student_id
+            JOIN exams e ON e.id = se.exam_id
+            WHERE se.exam_token = :exam_token AND e.deleted_at IS NULL
+        """), {"exam_token": exam_token}).mappings().first()
+        return dict(row) if row else None
+
+    def get_saved_answers(self, exam_token: str) -> Optional[dict]:
+        """已写回数据库的作答，答题期间每个学生只在首次读取进度时查询一次"""
+        return self.db.execute(text("""
+            SELECT answers FROM student_exams WHERE exam_token = :exam_token
+        """), {"exam_token": exam_token}).scalar_one_or_none()
+
+    def get_paper(self, paper_id: str) -> Optional[dict]:
+        row = self.db.execute(text("""
+            SELECT id, name, grade, total_score, question_count, is_published
+            FROM papers
+            WHERE id = :paper_id AND deleted_at IS NULL
+        """), {"paper_id": paper_id}).mappings().first()
+        return dict(row) if row else None
+
+    def get_paper_questions(self, paper_id: str) -> List[dict]:
+        """按题号顺序获取试卷题目（不含正确答案）"""
+        rows = self.db.execute(text("""
+            SELECT q.id, q.type, q.content, q.options, q.audio_file_id, q.reading_material, q.score
+            FROM paper_questions pq
+            JOIN questions q ON q.id = pq.question_id
+            WHERE pq.paper_id = :paper_id
+            ORDER BY pq.question_order
+        """), {"paper_id": paper_id}).mappings().all()
+        return [dict(row) for row in rows]
+
+    def get_question_paper_ids(self, question_id: str) -> List[str]:
+        """包含该题目的试卷"""
+        rows = self.db.execute(text("""
+            SELECT DISTINCT paper_id FROM paper_questions WHERE question_id = :question_id
+        """), {"question_id": question_id}).scalars().all()
+        return [str(paper_id) for paper_id in rows]
+
+    def get_audio_paper_ids(self, file_id: str) -> List[str]:
+        """题目引用了该音频的试卷"""
+        rows = self.db.execute(text("""
+            SELECT DISTINCT pq.paper_id
+            FROM paper_questions pq
+            JOIN questions q ON q.id = pq.question_id
+            WHERE q.audio_file_id = :file_id
+        """), {"file_id": file_id}).scalars().all()
+        return [str(paper_id) for paper_id in rows]
+
+    def get_students_by_classes(self, class_ids: List[str]) -> List[dict]:
+        rows = self.db.execute(text("""
+            SELECT id, name, class_id FROM students
+            WHERE class_id = ANY(CAST(:class_ids AS UUID[]))
+            ORDER BY class_id, student_number
+        """), {"class_ids": list(class_ids)}).mappings().all()
+        return [dict(row) for row in rows]
+
+    def create_exams(
+        self,
+        paper_id: str,
+        class_ids: List[str],
+        name: str,
+        deadline: datetime,
+        duration: Optional[int],
+        created_by: str
+    ) -> Dict[str, str]:
+        """每个班级一场考试，一条多行 INSERT 写入，同一语句累加班级统计，返回 {班级ID: 考试ID}"""
+        values = []
+        params = {
+            "paper_id": paper_id,
+            "name": name,
+            "deadline": deadline,
+            "duration": duration,
+            "created_by": created_by
+        }
+        for i, class_id in enumerate(class_ids):
+            values.append(f"(:paper_id, CAST(:class_id_{i} AS UUID), :name, :deadline, :duration, :created_by)")
+            params[f"class_id_{i}"] = class_id
+
+        rows = self.db.execute(text(f"""
+            WITH created AS (
+                INSERT INTO exams (paper_id, class_id, name, deadline, duration, created_by)
+                VALUES {", ".join(values)}
+                RETURNING id, class_id
+            ), stats AS (
+                INSERT INTO class_stats (class_id, exam_count)
+                SELECT class_id, COUNT(*) FROM created
+                WHERE class_id IS NOT NULL
+                GROUP BY class_id
+                ORDER BY class_id
+                ON CONFLICT (class_id) DO UPDATE
+                SET exam_count = class_stats.exam_count + EXCLUDED.exam_count,
+                    updated_at = CURRENT_TIMESTAMP
+            )
+            SELECT id, class_id FROM created
+        """), params).all()
+        return {str(class_id): str(exam_id) for exam_id, class_id in rows}
+
+    def bulk_create_student_exams(self, rows: List[dict], chunk_size: int = 1000) -> Dict[str, str]:
+        """多行 INSERT 写入答题记录，每条语句最多 chunk_size 行，返回 {exam_token: 答题记录ID}"""
+        created = {}
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            values = []
+            params = {}
+            for i, row in enumerate(chunk):
+                values.append(f"(CAST(:exam_id_{i} AS UUID), CAST(:student_id_{i} AS UUID), :exam_token_{i})")
+                params[f"exam_id_{i}"] = str(row['exam_id'])
+                params[f"student_id_{i}"] = str(row['student_id'])
+                params[f"exam_token_{i}"] = row['exam_token']
+
+            result = self.db.execute(text(f"""
+                INSERT INTO student_exams (exam_id, student_id, exam_token)
+                VALUES {", ".join(values)}
+                RETURNING id, exam_token
+            """), params)
+            created.update({exam_token: str(student_exam_id) for student_exam_id, exam_token in result})
+        return created
+
+    def mark_paper_published(self, paper_id: str) -> None:
+        self.db.execute(text("""
+            UPDATE papers SET is_published = TRUE WHERE id = :paper_id
+        """), {"paper_id": paper_id})
+
+    def bulk_update_progress(self, rows: List[dict], saved_at: datetime) -> int:
+        """
+        一条多行 UPDATE 写回一批自动保存：作答与已有 answers 合并，累加保存次数。
+        已交卷或已过期的记录不再改动。
+        """
+        if not rows:
+            return 0
+
+        values = []
+        params = {"saved_at": saved_at}
+        for i, row in enumerate(rows):
+            values.append(f"(CAST(:token_{i} AS VARCHAR), CAST(:answers_{i} AS JSONB), CAST(:saves_{i} AS INTEGER))")
+            params[f"token_{i}"] = row['exam_token']
+            params[f"answers_{i}"] = json.dumps(row['answers'], ensure_ascii=False)
+            params[f"saves_{i}"] = row['saves']
+
+        result = self.db.execute(text(f"""
+            UPDATE student_exams AS se
+            SET answers = COALESCE(se.answers, '{{}}'::jsonb) || v.answers,
+                auto_save_count = COALESCE(se.auto_save_count, 0) + v.saves,
+                status = CASE WHEN se.status = 'pending' THEN 'in_progress'::exam_status ELSE se.status END,
+                updated_at = :saved_at
+            FROM (VALUES {", ".join(values)}) AS v(exam_token, answers, saves)
+            WHERE se.exam_token = v.exam_token
+              AND se.status IN ('pending', 'in_progress')
+        """), params)
+        return result.rowcount
+
+    def get_answer_key(self, paper_id: str) -> List[dict]:
+        """按题号顺序获取试卷的正确答案和分值，仅供判分使用"""
+        rows = self.db.execute(text("""
+            SELECT q.id, q.correct_answer, q.score
+            FROM paper_questions pq
+            JOIN questions q ON q.id = pq.question_id
+            WHERE pq.paper_id = :paper_id
+            ORDER BY pq.question_order
+        """), {"paper_id": paper_id}).mappings().all()
+        return [dict(row) for row in rows]
+
+    def get_due_exams(self, cutoff: datetime, limit: int = 50) -> List[dict]:
+        """截止时间早于 cutoff 且仍有待判分答卷的考试"""
+        rows = self.db.execute(text("""
+            SELECT e.id AS exam_id, e.paper_id
+            FROM exams e
+            WHERE e.deadline <= :cutoff
+              AND e.deleted_at IS NULL
+              AND EXISTS (
+                  SELECT 1 FROM student_exams se
+                  WHERE se.exam_id = e.id
+                    AND se.score IS NULL
+                    AND se.status IN ('pending', 'in_progress', 'submitted')
+              )
+            ORDER BY e.deadline
+            LIMIT :limit
+        """), {"cutoff": cutoff, "limit": limit}).mappings().all()
+        return [{'exam_id': str(row['exam_id']), 'paper_id': str(row['paper_id'])} for row in rows]
+
+    def get_unsubmitted_tokens(self, exam_id: str) -> List[str]:
+        """仍在答题中（未交卷）的 exam_token，其作答可能还在自动保存缓冲中"""
+        return list(self.db.execute(text("""
+            SELECT exam_token FROM student_exams
+            WHERE exam_id = :exam_id AND status IN ('pending', 'in_progress')
+        """), {"exam_id": exam_id}).scalars().all())
+
+    def get_ungraded_submissions(self, exam_id: str, now: datetime) -> List[dict]:
+        """待判分的答卷：已交卷未判分的，以及截止时间已过仍未交卷的"""
+        rows = self.db.execute(text("""
+            SELECT se.id, se.exam_token, se.status, se.answers, e.class_id
+            FROM student_exams se
+            JOIN exams e ON e.id = se.exam_id
+            WHERE se.exam_id = :exam_id
+              AND se.score IS NULL
+              AND (se.status = 'submitted'
+                   OR (se.status IN ('pending', 'in_progress') AND e.deadline <= :now))
+        """), {"exam_id": exam_id, "now": now}).mappings().all()
+        return [dict(row) for row in rows]
+
+    def bulk_update_scores(self, rows: List[dict], graded_at: datetime) -> List[str]:
+        """
+        一条多行 UPDATE 写回一批判分结果，返回实际写入的记录ID。
+        未交卷的记录同时标记为已过期；已判分的记录（如期间经交卷队列判分）不会被覆盖。
+        """
+        if not rows:
+            return []
+
+        values = []
+        params = {"graded_at": graded_at}
+        for i, row in enumerate(rows):
+            values.append(f"(CAST(:id_{i} AS UUID), CAST(:score_{i} AS DECIMAL(5,2)), CAST(:status_{i} AS exam_status))")
+            params[f"id_{i}"] = str(row['id'])
+            params[f"score_{i}"] = row['score']
+            params[f"status_{i}"] = row['status']
+
+        result = self.db.execute(text(f"""
+            UPDATE student_exams AS se
+            SET score = v.score,
+                status = v.status,
+                updated_at = :graded_at
+            FROM (VALUES {", ".join(values)}) AS v(id, score, status)
+            WHERE se.id = v.id
+              AND se.score IS NULL
+            RETURNING se.id
+        """), params).scalars().all()
+        return [str(row_id) for row_id in result]
+
+    def get_submission_contexts(self, exam_tokens: List[str]) -> List[dict]:
+        """交卷判分所需的信息：一次查询一批 token"""
+        if not exam_tokens:
+            return []
+        rows = self.db.execute(text("""
+            SELECT se.id, se.exam_token, se.status, se.answers, se.score, e.paper_id, e.class_id
+            FROM student_exams se
+            JOIN exams e ON e.id = se.exam_id
+            WHERE se.exam_token = ANY(:exam_tokens) AND e.deleted_at IS NULL
+        """), {"exam_tokens": list(exam_tokens)}).mappings().all()
+        return [dict(row) for row in rows]
+
+    def bulk_submit(self, rows: List[dict], graded_at: datetime) -> List[str]:
+        """
+        一条多行 UPDATE 写回一批交卷：合并作答、写入得分并标记为已交卷。
+        只改动仍在答题中的记录，返回实际交卷成功的 exam_token。
+        同一语句按班级累加已交卷人数，每批每个班级只更新一次统计行。
+        """
+        if not rows:
+            return []
+
+        values = []
+        params = {"graded_at": graded_at}
+        for i, row in enumerate(rows):
+            values.append(
+                f"(CAST(:id_{i} AS UUID), CAST(:answers_{i} AS JSONB), CAST(:score_{i} AS DECIMAL(5,2)), "
+                f"CAST(:submitted_at_{i} AS TIMESTAMP), CAST(:time_spent_{i} AS INTEGER))"
+            )
+            params[f"id_{i}"] = str(row['id'])
+            params[f"answers_{i}"] = json.dumps(row['answers'], ensure_ascii=False)
+            params[f"score_{i}"] = row['score']
+            params[f"submitted_at_{i}"] = row['submitted_at']
+            params[f"time_spent_{i}"] = row['time_spent']
+
+        result = self.db.execute(text(f"""
+            WITH submitted AS (
+                UPDATE student_exams AS se
+                SET answers = COALESCE(se.answers, '{{}}'::jsonb) || v.answers,
+                    score = v.score,
+                    status = 'submitted',
+                    submitted_at = v.submitted_at,
+                    time_spent = COALESCE(v.time_spent, se.time_spent),
+                    updated_at = :graded_at
+                FROM (VALUES {", ".join(values)}) AS v(id, answers, score, submitted_at, time_spent)
+                WHERE se.id = v.id
+                  AND se.status IN ('pending', 'in_progress')
+                RETURNING se.exam_token, se.exam_id
+            ), stats AS (
+                -- 按班级ID顺序加锁，多个交卷 worker 并发时不会互相死锁
+                INSERT INTO class_stats (class_id, submitted_count)
+                SELECT e.class_id, COUNT(*)
+                FROM submitted
+                JOIN exams e ON e.id = submitted.exam_id
+                WHERE e.class_id IS NOT NULL
+                GROUP BY e.class_id
+                ORDER BY e.class_id
+                ON CONFLICT (class_id) DO UPDATE
+                SET submitted_count = class_stats.submitted_count + EXCLUDED.submitted_count,
+                    updated_at = CURRENT_TIMESTAMP
+            )
+            SELECT exam_token FROM submitted
+        """), params)
+        return [row[0] for row in result]
+
+    def get_graded_answers(self, paper_id: str, class_id: str) -> List[dict]:
+        """某班级某试卷所有已判分答卷的 token 和作答，仅在重建统计时使用"""
+        rows = self.db.execute(text("""
+            SELECT se.exam_token, se.answers
+            FROM student_exams se
+            JOIN exams e ON e.id = se.exam_id
+            WHERE e.paper_id = :paper_id AND e.class_id = :class_id
+              AND e.deleted_at IS NULL AND se.score IS NOT NULL
+        """), {"paper_id": paper_id, "class_id": class_id}).mappings().all()
+        return [dict(row) for row in rows]
+
+    def count_exam_results(self, paper_id: str, class_id: str) -> int:
+        return self.db.execute(text("""
+            SELECT COUNT(*)
+            FROM student_exams se
+            JOIN exams e ON e.id = se.exam_id
+            WHERE e.paper_id = :paper_id AND e.class_id = :class_id AND e.deleted_at IS NULL
+        """), {"paper_id": paper_id, "class_id": class_id}).scalar_one()
+
+    def iter_exam_results(self, paper_id: str, class_id: str, chunk_size: int = 500) -> Iterator[dict]:
+        """按学号顺序逐批读取答卷，服务端游标分批取数，供报表流式导出"""
+        result = self.db.execute(text("""
+            SELECT s.student_number, s.name, se.status, se.score, se.time_spent, se.submitted_at, se.answers
+            FROM student_exams se
+            JOIN students s ON s.id = se.student_id
+            JOIN exams e ON e.id = se.exam_id
+            WHERE e.paper_id = :paper_id AND e.class_id = :class_id AND e.deleted_at IS NULL
+            ORDER BY s.student_number, se.submitted_at
+        """).execution_options(yield_per=chunk_size), {"paper_id": paper_id, "class_id": class_id})
+        for row in result.mappings():
+            yield dict(row)
+
+    def get_class_stats(self, class_ids: List[str]) -> List[dict]:
+        """班级看板统计，每个班级读一行"""
+        rows = self.db.execute(text("""
+            SELECT CAST(c.id AS TEXT) AS class_id, c.name AS class_name, c.grade,
+                   COALESCE(cs.student_count, 0) AS student_count,
+                   COALESCE(cs.exam_count, 0) AS exam_count,
+                   COALESCE(cs.submitted_count, 0) AS submitted_count,
+                   cs.updated_at
+            FROM classes c
+            LEFT JOIN class_stats cs ON cs.class_id = c.id
+            WHERE c.id = ANY(CAST(:class_ids AS UUID[]))
+            ORDER BY c.grade, c.name
+        """), {"class_ids": list(class_ids)}).mappings().all()
+        return [dict(row) for row in rows]
+
+    def refresh_class_stats(self, class_ids: List[str]) -> int:
+        """按班级重算统计，用于修复计数偏差；每项计数单独按索引统计，不做连接扇出"""
+        result = self.db.execute(text("""
+            INSERT INTO class_stats (class_id, student_count, exam_count, submitted_count, updated_at)
+            SELECT
+                c.id,
+                (SELECT COUNT(*) FROM students s WHERE s.class_id = c.id),
+                (SELECT COUNT(*) FROM exams e WHERE e.class_id = c.id),
+                (SELECT COUNT(*) FROM student_exams se JOIN exams e ON e.id = se.exam_id
+                 WHERE e.class_id = c.id AND se.status = 'submitted'),
+                CURRENT_TIMESTAMP
+            FROM classes c
+            WHERE c.id = ANY(CAST(:class_ids AS UUID[]))
+            ORDER BY c.id
+            ON CONFLICT (class_id) DO UPDATE
+            SET student_count = EXCLUDED.student_count,
+                exam_count = EXCLUDED.exam_count,
+                submitted_count = EXCLUDED.submitted_count,
+                updated_at = EXCLUDED.updated_at
+        """), {"class_ids": list(class_ids)})
+        return result.rowcount
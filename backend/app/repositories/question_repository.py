@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional, Tuple
+from typing import List, Optional, Set, Tuple
 from sqlalchemy import func
 from backend.app.models.question import Question
 from backend.app.schemas.question import QuestionCreate
@@ -76,4 +76,13 @@ class QuestionRepository:
 
         self.db.delete(question)
         self.db.commit()
-        return True
\ No newline at end of file
+        return True
+
+    def get_referenced_audio_ids(self, audio_file_ids: List[str]) -> Set[str]:
+        """返回给定音频ID中仍被题目引用的部分（含已软删除的题目）"""
+        if not audio_file_ids:
+            return set()
+        rows = self.db.query(Question.audio_file_id).filter(
+            Question.audio_file_id.in_(audio_file_ids)
+        ).distinct().all()
+        return {row[0] for row in rows}
@@ -0,0 +1,58 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class WrongAnswerCount(BaseModel):
+    answer: str
+    count: int
+
+
+class QuestionAnalysis(BaseModel):
+    question_id: str
+    correct_count: int
+    wrong_count: int
+    unanswered_count: int
+    correct_rate: float
+    common_wrong_answers: List[WrongAnswerCount]
+
+
+class ScoreRange(BaseModel):
+    range: str
+    count: int
+
+
+class PaperAnalysisResponse(BaseModel):
+    """班级答题统计：已判分答卷的分数分布和逐题正确率"""
+    paper_id: str
+    class_id: str
+    graded_count: int
+    average_score: Optional[float] = None
+    max_score: Optional[float] = None
+    min_score: Optional[float] = None
+    score_distribution: List[ScoreRange]
+    questions: List[QuestionAnalysis]
+
+
+class ReportExportJob(BaseModel):
+    """报表导出任务：status 为 pending / running / done / failed，progress 为百分比"""
+    job_id: str
+    paper_id: str
+    class_id: str
+    status: str
+    total: int
+    written: int
+    progress: int
+    filename: str
+    error: Optional[str] = None
+
+
+class ClassStats(BaseModel):
+    """班级看板统计：submitted_count 为已交卷的答题记录数"""
+    class_id: str
+    class_name: str
+    grade: int
+    student_count: int
+    exam_count: int
+    submitted_count: int
+    updated_at: Optional[datetime] = None
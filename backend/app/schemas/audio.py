@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class AudioPreflightRequest(BaseModel):
+    sha256: str = Field(..., pattern="^[0-9a-f]{64}$", description="客户端计算的文件SHA-256")
+    size: int = Field(..., gt=0, description="文件大小（字节）")
+
+
+class AudioPreflightResponse(BaseModel):
+    exists: bool
+    file_id: Optional[str] = None
+    url: Optional[str] = None
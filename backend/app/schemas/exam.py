@@ -0,0 +1,104 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from datetime import datetime
+
+
+class PublishRequest(BaseModel):
+    class_id: str
+    deadline: datetime
+    name: Optional[str] = Field(None, max_length=100)
+    duration: Optional[int] = Field(None, gt=0, description="考试时长（秒）")
+
+
+class BulkPublishRequest(BaseModel):
+    """年级发布：同一试卷一次发布到多个班级"""
+    class_ids: List[str] = Field(..., min_length=1, max_length=100)
+    deadline: datetime
+    name: Optional[str] = Field(None, max_length=100)
+    duration: Optional[int] = Field(None, gt=0, description="考试时长（秒）")
+
+
+class ExamLink(BaseModel):
+    student_id: str
+    exam_url: str
+    qr_code: str
+
+
+class PublishResponse(BaseModel):
+    exam_id: str
+    exam_links: List[ExamLink]
+
+
+class BulkExamLink(ExamLink):
+    """年级发布的流式响应中每行一个（NDJSON）"""
+    class_id: str
+    exam_id: str
+
+
+class AudioManifestItem(BaseModel):
+    file_id: str
+    question_id: str
+    url: str
+    size: int
+    sha256: str
+    duration: Optional[float] = None
+
+
+class PaperAudioManifest(BaseModel):
+    paper_id: str
+    total_bytes: int
+    files: List[AudioManifestItem]
+
+
+class ExamQuestion(BaseModel):
+    id: str
+    type: str
+    content: str
+    options: Optional[List[str]] = None
+    audio_file_id: Optional[str] = None
+    reading_material: Optional[str] = None
+    score: int
+
+
+class ExamPaperResponse(BaseModel):
+    """试卷快照：同一试卷的所有学生共享，发布后不再改变"""
+    paper_id: str
+    questions: List[ExamQuestion]
+    audio_manifest: PaperAudioManifest
+
+
+class ExamSessionResponse(BaseModel):
+    """学生本人的答题信息"""
+    paper_id: str
+    student_name: str
+    status: str
+    deadline: datetime
+    duration: Optional[int] = None
+    answers: Dict[str, str] = {}
+    current_question: Optional[int] = None
+
+
+class SaveProgressRequest(BaseModel):
+    answers: Dict[str, str] = Field(default_factory=dict, max_length=500, description="变化的作答，也可以是完整作答")
+    current_question: Optional[int] = Field(None, ge=0)
+    seq: Optional[int] = Field(None, ge=1, description="客户端递增的保存序号，用于拒绝乱序到达的增量")
+
+
+class SaveProgressResponse(BaseModel):
+    saved_at: datetime
+    seq: int = 0
+
+
+class SubmitExamRequest(BaseModel):
+    answers: Dict[str, str] = Field(default_factory=dict, max_length=500, description="交卷时的作答，覆盖自动保存的同题作答")
+    time_spent: Optional[int] = Field(None, ge=0, description="答题用时（秒）")
+
+
+class SubmissionStatusResponse(BaseModel):
+    """交卷回执，也用于轮询判分状态：queued 排队中，graded 已判分，rejected 未被接受，failed 多次处理失败"""
+    exam_token: str
+    status: str
+    submitted_at: datetime
+    score: Optional[float] = None
+    correct_count: Optional[int] = None
+    total_count: Optional[int] = None
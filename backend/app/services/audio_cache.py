@@ -0,0 +1,189 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedAudio:
+    """缓存命中结果：小文件直接给出字节，其余给出本地磁盘路径"""
+    size: int
+    data: Optional[bytes] = None
+    path: Optional[str] = None
+    # 以 pin=True 取得磁盘路径时设置，发送完成后须调用 release(pinned)
+    pinned: Optional[str] = None
+
+
+class HotAudioCache:
+    """
+    热点音频两级LRU缓存（内存 + 本地磁盘）
+
+    放在OSS存储之前，考试开始时同一批听力音频只回源一次。
+    同一文件的并发未命中会合并为一次加载。
+    正在从磁盘发送的文件被固定，淘汰时跳过，发送完成释放后再参与淘汰。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        memory_limit: int = 64 * 1024 * 1024,
+        disk_limit: int = 2 * 1024 * 1024 * 1024,
+        memory_item_limit: int = 1024 * 1024
+    ):
+        self.cache_dir = cache_dir
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.memory_item_limit = memory_item_limit
+
+        self._memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: 'OrderedDict[str, int]' = OrderedDict()
+        self._disk_bytes = 0
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._pins: Dict[str, int] = {}
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_disk_index()
+
+    def _load_disk_index(self) -> None:
+        """启动时按修改时间恢复磁盘层的LRU顺序"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.part') or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, name, stat.st_size))
+
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    async def get(self, key: str, loader: Callable[[str], Awaitable[None]], pin: bool = False) -> CachedAudio:
+        """
+        取得 key 对应的音频；未命中时调用 loader(目标路径) 回源写入磁盘。
+        key 必须是可作为文件名的内容寻址名称（如 {hash}.compact.mp3）。
+        pin 为 True 且结果为磁盘路径时固定该文件，直到调用 release。
+        """
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self.memory_hits += 1
+            return CachedAudio(size=len(data), data=data)
+
+        if key in self._disk:
+            self._disk.move_to_end(key)
+            self.disk_hits += 1
+            return await self._from_disk(key, pin)
+
+        # 合并同一文件的并发回源
+        pending = self._loading.get(key)
+        if pending is not None:
+            await pending
+            return await self.get(key, loader, pin)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            temp_path = self._disk_path(key) + '.part'
+            await loader(temp_path)
+            os.replace(temp_path, self._disk_path(key))
+            size = os.path.getsize(self._disk_path(key))
+            self._disk[key] = size
+            self._disk_bytes += size
+            self._evict_disk()
+            future.set_result(None)
+        except BaseException as e:
+            future.set_exception(e)
+            # 等待方会收到异常，这里避免“未获取异常”的告警
+            future.exception()
+            raise
+        finally:
+            del self._loading[key]
+
+        return await self._from_disk(key, pin)
+
+    async def _from_disk(self, key: str, pin: bool = False) -> CachedAudio:
+        path = self._disk_path(key)
+        size = self._disk[key]
+        if size <= self.memory_item_limit:
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(None, self._read_file, path)
+            self._put_memory(key, data)
+            return CachedAudio(size=size, data=data)
+        if not pin:
+            return CachedAudio(size=size, path=path)
+        self._pins[key] = self._pins.get(key, 0) + 1
+        return CachedAudio(size=size, path=path, pinned=key)
+
+    async def release(self, key: str) -> None:
+        """磁盘文件发送完成后调用，解除固定并补做期间被跳过的淘汰"""
+        count = self._pins.get(key, 0) - 1
+        if count > 0:
+            self._pins[key] = count
+            return
+        self._pins.pop(key, None)
+        self._evict_disk()
+
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if key in self._memory:
+            return
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_limit and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self) -> None:
+        # 按LRU顺序淘汰，跳过正在发送的文件
+        for key in list(self._disk):
+            if self._disk_bytes <= self.disk_limit or len(self._disk) <= 1:
+                break
+            if key in self._pins:
+                continue
+            size = self._disk.pop(key)
+            self._disk_bytes -= size
+            self._memory_bytes -= len(self._memory.pop(key, b''))
+            try:
+                os.remove(self._disk_path(key))
+            except OSError as e:
+                logger.warning(f"清理音频缓存失败: {key}, 错误: {str(e)}")
+
+    def record_served(self, nbytes: int) -> None:
+        self.bytes_served += nbytes
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_ratio': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            'bytes_served': self.bytes_served,
+            'memory_bytes': self._memory_bytes,
+            'memory_items': len(self._memory),
+            'disk_bytes': self._disk_bytes,
+            'disk_items': len(self._disk)
+        }
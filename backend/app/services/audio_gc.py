@@ -0,0 +1,243 @@
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import os
+import re
+
+
+logger = logging.getLogger(__name__)
+
+# 只处理内容寻址的音频文件名：{file_id}.mp3 / .wav 或 {file_id}.{rendition}.mp3
+AUDIO_FILE_PATTERN = re.compile(r'^[0-9a-f]{64}(\.[a-z]+)?\.(mp3|wav)$')
+
+
+class OrphanAudioCollector:
+    """
+    孤立音频回收器
+
+    分批增量遍历音频索引，与 questions.audio_file_id 的引用做差集，
+    删除不再被任何题目引用的文件（放弃的上传、创建题目失败留下的音频等）。
+    索引遍历完一遍后再遍历一次存储，删除没有索引条目且不被引用的文件，以及上传中断残留的临时文件。
+    删除前重新读取索引并再查一次引用，期间被查重复用（last_used_at 更新）或被题目引用的文件不删除。
+    每批之间暂停、每轮删除数量有上限，避免与考试流量争抢存储和数据库。
+    """
+    CURSOR_KEY = "audio:gc:cursor"
+
+    def __init__(
+        self,
+        audio_service,
+        find_referenced: Callable[[List[str]], Set[str]],
+        redis_client=None,
+        batch_size: int = 200,
+        min_age: timedelta = timedelta(hours=24),
+        batch_pause: float = 1.0,
+        max_deletes_per_run: int = 1000
+    ):
+        self.audio_service = audio_service
+        self.find_referenced = find_referenced
+        self.redis = redis_client
+        self.batch_size = batch_size
+        self.min_age = min_age
+        self.batch_pause = batch_pause
+        self.max_deletes_per_run = max_deletes_per_run
+        self._cursor = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _load_cursor(self) -> int:
+        if self.redis:
+            raw = await self.redis.get(self.CURSOR_KEY)
+            return int(raw) if raw else 0
+        return self._cursor
+
+    async def _save_cursor(self, cursor: int) -> None:
+        if self.redis:
+            await self.redis.set(self.CURSOR_KEY, cursor)
+        else:
+            self._cursor = cursor
+
+    def _is_old_enough(self, entry: dict, now: datetime) -> bool:
+        # 新上传或刚被查重复用的文件可能尚未写入题目（create_question 还没提交），留出宽限期
+        times = [entry.get('created_at'), entry.get('last_used_at')]
+        times = [datetime.fromisoformat(t) for t in times if t]
+        if not times:
+            return True
+        return now - max(times) >= self.min_age
+
+    async def _recheck(self, orphans: List[dict]) -> List[dict]:
+        """删除前重新读取索引条目并再查一次引用，排除期间被复用或引用的文件"""
+        now = datetime.now()
+        current = []
+        for orphan in orphans:
+            entry = await self.audio_service.manifest.get(orphan['file_id'])
+            if entry is not None and self._is_old_enough(entry, now):
+                current.append(entry)
+        if not current:
+            return []
+        referenced = await asyncio.to_thread(self.find_referenced, [e['file_id'] for e in current])
+        return [e for e in current if e['file_id'] not in referenced]
+
+    async def run_once(self) -> dict:
+        """
+        从上次的游标继续执行一轮回收，直到遍历完一遍或达到本轮删除上限。
+        返回本轮统计。
+        """
+        stats = {'scanned': 0, 'orphaned': 0, 'deleted': 0, 'completed': False}
+        cursor = await self._load_cursor()
+
+        while True:
+            cursor, entries = await self.audio_service.manifest.scan(cursor, self.batch_size)
+            stats['scanned'] += len(entries)
+
+            now = datetime.now()
+            candidates = [e for e in entries if self._is_old_enough(e, now)]
+            if candidates:
+                referenced = await asyncio.to_thread(
+                    self.find_referenced, [e['file_id'] for e in candidates]
+                )
+                orphans = [e for e in candidates if e['file_id'] not in referenced]
+                orphans = orphans[:self.max_deletes_per_run - stats['deleted']]
+                if orphans:
+                    orphans = await self._recheck(orphans)
+                stats['orphaned'] += len(orphans)
+                if orphans:
+                    deleted = await self.audio_service.delete_audio_batch(orphans)
+                    stats['deleted'] += len(deleted)
+
+            await self._save_cursor(cursor)
+
+            if cursor == 0:
+                stats['completed'] = True
+                await self.sweep_storage(stats)
+                break
+            if stats['deleted'] >= self.max_deletes_per_run:
+                break
+
+            await asyncio.sleep(self.batch_pause)
+
+        logger.info(f"孤立音频回收: {stats}")
+        return stats
+
+    @staticmethod
+    def _indexed_paths(entry: dict) -> Set[str]:
+        paths = {entry['storage_path']}
+        paths.update(r['storage_path'] for r in entry.get('renditions', {}).values())
+        return paths
+
+    async def sweep_storage(self, stats: dict) -> None:
+        """
+        遍历存储中的文件，删除超过宽限期的两类文件：上传中断残留的临时文件；
+        不属于任何索引条目的文件（索引之外的重复副本、未记录的转码版本、没有条目且不被题目引用的文件）。
+        没有索引条目却被题目引用的文件只记录日志，不删除。
+        """
+        stats.setdefault('unindexed', 0)
+        stats.setdefault('temp_deleted', 0)
+        # 按页遍历，每页处理完再取下一页，不把整个存储的文件列表读入内存
+        async for page in self.audio_service.list_storage():
+            if stats['deleted'] >= self.max_deletes_per_run:
+                break
+            await self._sweep_page(page, stats)
+
+    async def _sweep_page(self, page: List[dict], stats: dict) -> None:
+        now = datetime.now()
+        stale = [item for item in page if now - item['modified'] >= self.min_age]
+
+        temp_paths = [item['storage_path'] for item in stale if item['temp']]
+        if temp_paths:
+            stats['temp_deleted'] += len(await self.audio_service.delete_stored_files(temp_paths))
+
+        files = [
+            item['storage_path'] for item in stale
+            if not item['temp'] and AUDIO_FILE_PATTERN.match(os.path.basename(item['storage_path']))
+        ]
+        for start in range(0, len(files), self.batch_size):
+            if stats['deleted'] >= self.max_deletes_per_run:
+                break
+            candidates = await self._unreferenced(await self._find_unindexed(files[start:start + self.batch_size]), warn=True)
+            # 删除前再确认一次：期间可能已写入索引（回填或重新上传）或被题目引用
+            candidates = await self._unreferenced(await self._find_unindexed(candidates))
+            paths = candidates[:self.max_deletes_per_run - stats['deleted']]
+            stats['unindexed'] += len(paths)
+            if paths:
+                stats['deleted'] += len(await self.audio_service.delete_stored_files(paths))
+            await asyncio.sleep(self.batch_pause)
+
+    async def _find_unindexed(self, storage_paths: List[str]) -> Dict[str, Tuple[bool, List[str]]]:
+        """按 file_id 分组返回不属于任何索引条目的存储路径：{file_id: (是否有索引条目, 路径列表)}"""
+        unindexed: Dict[str, Tuple[bool, List[str]]] = {}
+        entries: Dict[str, Optional[dict]] = {}
+        for storage_path in storage_paths:
+            # 文件名为 {file_id}.mp3 或 {file_id}.{rendition}.mp3
+            file_id = os.path.basename(storage_path).split('.', 1)[0]
+            if file_id not in entries:
+                entries[file_id] = await self.audio_service.manifest.get(file_id)
+            entry = entries[file_id]
+            if entry is None or storage_path not in self._indexed_paths(entry):
+                unindexed.setdefault(file_id, (entry is not None, []))[1].append(storage_path)
+        return unindexed
+
+    async def _unreferenced(self, unindexed: Dict[str, Tuple[bool, List[str]]], warn: bool = False) -> List[str]:
+        """
+        排除没有索引条目但仍被题目引用的文件；有索引条目的 file_id，
+        题目引用的是条目指向的文件，索引之外的副本可以删除
+        """
+        without_entry = [file_id for file_id, (has_entry, _) in unindexed.items() if not has_entry]
+        referenced = await asyncio.to_thread(self.find_referenced, without_entry) if without_entry else set()
+        if warn:
+            for file_id in referenced:
+                logger.warning(f"音频 {file_id} 被题目引用但没有索引条目，保留存储中的文件")
+        return [
+            path for file_id, (has_entry, paths) in unindexed.items()
+            if has_entry or file_id not in referenced
+            for path in paths
+        ]
+
+    async def run_forever(self, interval: float) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"孤立音频回收失败: {e!r}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float) -> asyncio.Task:
+        """在应用启动时调用，按固定间隔在后台执行回收"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever(interval))
+        return self._task
+
+    async def stop(self) -> None:
+        """在应用关闭时调用"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def create_orphan_audio_collector() -> OrphanAudioCollector:
+    """按配置创建回收器，引用查询使用独立的数据库会话"""
+    from backend.app.core.config import settings
+    from backend.app.core.database import SessionLocal
+    from backend.app.core.redis import get_redis
+    from backend.app.repositories.question_repository import QuestionRepository
+    from backend.app.services.audio_service import get_audio_service
+
+    def find_referenced(audio_file_ids: List[str]) -> Set[str]:
+        db = SessionLocal()
+        try:
+            return QuestionRepository(db).get_referenced_audio_ids(audio_file_ids)
+        finally:
+            db.close()
+
+    return OrphanAudioCollector(
+        get_audio_service(),
+        find_referenced,
+        redis_client=get_redis(),
+        batch_size=settings.audio_gc_batch_size,
+        min_age=timedelta(hours=settings.audio_gc_min_age_hours),
+        batch_pause=settings.audio_gc_batch_pause,
+        max_deletes_per_run=settings.audio_gc_max_deletes_per_run
+    )
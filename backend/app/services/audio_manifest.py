@@ -0,0 +1,86 @@
+from typing import Dict, List, Optional, Tuple
+import json
+
+
+# 在 Redis 中原子地合并字段：条目不存在时不写入并返回 nil，
+# 避免与 touch 等并发更新互相覆盖，也不会重建已被删除的条目
+UPDATE_SCRIPT = """
+local raw = redis.call('HGET', KEYS[1], ARGV[1])
+if not raw then
+    return nil
+end
+local entry = cjson.decode(raw)
+for name, value in pairs(cjson.decode(ARGV[2])) do
+    entry[name] = value
+end
+raw = cjson.encode(entry)
+redis.call('HSET', KEYS[1], ARGV[1], raw)
+return raw
+"""
+
+class AudioManifest:
+    """
+    音频索引 - file_id 到存储位置的映射
+
+    上传时写入，查询和删除时直接命中，不再探测存储。
+    有Redis时存放在一个哈希中（随AOF持久化，多进程共享），
+    否则退化为进程内字典，仅适用于开发环境。
+    """
+    KEY = "audio:manifest"
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self._local: Dict[str, str] = {}
+        self._order: List[str] = []
+        self._update = redis_client.register_script(UPDATE_SCRIPT) if redis_client else None
+
+    async def get(self, file_id: str) -> Optional[dict]:
+        if self.redis:
+            raw = await self.redis.hget(self.KEY, file_id)
+        else:
+            raw = self._local.get(file_id)
+        return json.loads(raw) if raw else None
+
+    async def put(self, file_id: str, entry: dict) -> None:
+        raw = json.dumps(entry)
+        if self.redis:
+            await self.redis.hset(self.KEY, file_id, raw)
+        else:
+            if file_id not in self._local:
+                self._order.append(file_id)
+            self._local[file_id] = raw
+
+    async def update(self, file_id: str, **fields) -> Optional[dict]:
+        """原子地合并更新已有条目的字段，条目不存在（如已被回收）时不写入并返回None"""
+        if self.redis:
+            raw = await self._update(keys=[self.KEY], args=[file_id, json.dumps(fields)])
+            return json.loads(raw) if raw else None
+
+        # 进程内模式读写之间没有 await，不会与其他协程交错
+        raw = self._local.get(file_id)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        entry.update(fields)
+        self._local[file_id] = json.dumps(entry)
+        return entry
+
+    async def scan(self, cursor: int = 0, count: int = 100) -> Tuple[int, List[dict]]:
+        """增量遍历索引，返回 (下一游标, 条目列表)，游标为0表示遍历结束"""
+        if self.redis:
+            cursor, raw_entries = await self.redis.hscan(self.KEY, cursor, count=count)
+            return cursor, [json.loads(raw) for raw in raw_entries.values()]
+
+        # 进程内模式按只追加的顺序表遍历，遍历期间删除条目不会使游标错位
+        file_ids = self._order[cursor:cursor + count]
+        next_cursor = cursor + count if cursor + count < len(self._order) else 0
+        entries = [json.loads(self._local[fid]) for fid in file_ids if fid in self._local]
+        if next_cursor == 0:
+            self._order = [fid for fid in self._order if fid in self._local]
+        return next_cursor, entries
+
+    async def delete(self, file_id: str) -> None:
+        if self.redis:
+            await self.redis.hdel(self.KEY, file_id)
+        else:
+            self._local.pop(file_id, None)
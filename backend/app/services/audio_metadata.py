@@ -0,0 +1,235 @@
+from typing import Optional
+import struct
+
+
+AUDIO_METADATA_FIELDS = ('duration', 'bitrate', 'sample_rate', 'channels')
+
+# MPEG 音频帧头查表：比特率（kbps），按 (版本是否为MPEG1, 层) 索引
+MPEG_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# 版本位：3 = MPEG1，2 = MPEG2，0 = MPEG2.5
+MPEG_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+
+
+class AudioMetadataParser:
+    """
+    只解析文件头的音频元数据提取器
+
+    在上传的流式读取中逐块喂入，只缓存文件头附近的字节（ID3 标签直接跳过），
+    从 MP3 帧头与 Xing/Info/VBRI 标签、WAV 的 fmt/data 块中得到
+    时长、码率、采样率和声道数，不解码音频。
+    """
+    HEADER_WINDOW = 64 * 1024  # 跳过ID3后最多在这么多字节内寻找首个音频帧
+
+    def __init__(self, content_type: str):
+        self.is_wav = content_type == 'audio/wav'
+        self._buffer = bytearray()
+        self._base = 0          # _buffer[0] 在文件中的绝对偏移
+        self._total = 0         # 已喂入的字节数
+        self._audio_start: Optional[int] = None
+        self._done = False
+        self._result: dict = {}
+        self._pending: Optional[dict] = None  # 需要文件总大小才能算出时长的中间结果
+
+    def feed(self, chunk: bytes) -> None:
+        start = self._total
+        self._total += len(chunk)
+        if self._done:
+            return
+
+        # 丢弃位于待跳过区间（如ID3标签）内的字节
+        skip_until = self._audio_start if self._audio_start is not None else 0
+        if self._total <= skip_until:
+            self._base = self._total
+            return
+        if start < skip_until:
+            chunk = chunk[skip_until - start:]
+            start = skip_until
+        if not self._buffer:
+            self._base = start
+        self._buffer += chunk
+
+        if self.is_wav:
+            self._parse_wav()
+        else:
+            self._parse_mp3()
+
+    def _bytes_at(self, pos: int, size: int) -> Optional[bytes]:
+        offset = pos - self._base
+        if offset < 0 or offset + size > len(self._buffer):
+            return None
+        return bytes(self._buffer[offset:offset + size])
+
+    def _parse_wav(self) -> None:
+        header = self._bytes_at(0, 12)
+        if header is None:
+            return
+        if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            self._done = True
+            return
+
+        fmt = None
+        pos = 12
+        while True:
+            chunk_header = self._bytes_at(pos, 8)
+            if chunk_header is None:
+                return
+            chunk_id = chunk_header[:4]
+            chunk_size = struct.unpack('<I', chunk_header[4:])[0]
+
+            if chunk_id == b'fmt ':
+                body = self._bytes_at(pos + 8, 16)
+                if body is None:
+                    return
+                _, channels, sample_rate, byte_rate, _, bits = struct.unpack('<HHIIHH', body)
+                fmt = {'channels': channels, 'sample_rate': sample_rate,
+                       'byte_rate': byte_rate, 'bits_per_sample': bits}
+            elif chunk_id == b'data':
+                if fmt is None or fmt['byte_rate'] == 0:
+                    self._done = True
+                    return
+                self._pending = {'format': 'wav', 'data_offset': pos + 8, 'data_size': chunk_size, **fmt}
+                self._done = True
+                self._buffer = bytearray()
+                return
+
+            if pos + 8 + chunk_size > self._base + len(self._buffer) + self.HEADER_WINDOW:
+                self._done = True
+                return
+            pos += 8 + chunk_size + (chunk_size & 1)
+
+    def _parse_mp3(self) -> None:
+        if self._audio_start is None:
+            id3 = self._bytes_at(0, 10)
+            if id3 is None:
+                return
+            self._audio_start = 0
+            if id3[:3] == b'ID3':
+                # ID3v2 标签大小为 synchsafe 整数；带 footer 时再加10字节
+                tag_size = (id3[6] << 21) | (id3[7] << 14) | (id3[8] << 7) | id3[9]
+                self._audio_start = 10 + tag_size + (10 if id3[5] & 0x10 else 0)
+                keep_from = self._audio_start - self._base
+                if keep_from >= len(self._buffer):
+                    self._buffer = bytearray()
+                    self._base = self._total
+                    return
+                del self._buffer[:keep_from]
+                self._base = self._audio_start
+
+        self._find_mp3_frame()
+
+    def _find_mp3_frame(self, final: bool = False) -> None:
+        buffer = self._buffer
+        offset = 0
+        while offset + 4 <= len(buffer):
+            if buffer[offset] == 0xFF and (buffer[offset + 1] & 0xE0) == 0xE0:
+                frame = self._parse_frame_header(bytes(buffer[offset:offset + 4]))
+                if frame is not None:
+                    frame_pos = self._base + offset
+                    tag_area = self._bytes_at(frame_pos, 4 + 32 + 22)
+                    if tag_area is None and not final:
+                        return  # 等待更多数据以读取 Xing/VBRI 标签
+                    self._finish_mp3(frame, frame_pos, tag_area or bytes(buffer[offset:]))
+                    return
+            offset += 1
+
+        if len(buffer) > self.HEADER_WINDOW:
+            self._done = True
+
+    @staticmethod
+    def _parse_frame_header(header: bytes) -> Optional[dict]:
+        version = (header[1] >> 3) & 0x3
+        layer_bits = (header[1] >> 1) & 0x3
+        bitrate_index = header[2] >> 4
+        sample_rate_index = (header[2] >> 2) & 0x3
+        if version == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+            return None
+
+        layer = 4 - layer_bits
+        is_mpeg1 = version == 3
+        channels = 1 if (header[3] >> 6) == 3 else 2
+        if layer == 1:
+            samples_per_frame = 384
+        elif layer == 2 or is_mpeg1:
+            samples_per_frame = 1152
+        else:
+            samples_per_frame = 576
+
+        return {
+            'is_mpeg1': is_mpeg1,
+            'bitrate': MPEG_BITRATES[(is_mpeg1, layer)][bitrate_index] * 1000,
+            'sample_rate': MPEG_SAMPLE_RATES[version][sample_rate_index],
+            'channels': channels,
+            'samples_per_frame': samples_per_frame,
+        }
+
+    def _finish_mp3(self, frame: dict, frame_pos: int, data: bytes) -> None:
+        pending = {'format': 'mp3', 'audio_start': frame_pos, **frame}
+
+        # Xing/Info 标签位于帧头和 side info 之后
+        if frame['is_mpeg1']:
+            side_info = 17 if frame['channels'] == 1 else 32
+        else:
+            side_info = 9 if frame['channels'] == 1 else 17
+        xing_pos = 4 + side_info
+        if data[xing_pos:xing_pos + 4] in (b'Xing', b'Info') and len(data) >= xing_pos + 16:
+            flags = struct.unpack('>I', data[xing_pos + 4:xing_pos + 8])[0]
+            field = xing_pos + 8
+            if flags & 0x1:
+                pending['frames'] = struct.unpack('>I', data[field:field + 4])[0]
+                field += 4
+            if flags & 0x2:
+                pending['stream_bytes'] = struct.unpack('>I', data[field:field + 4])[0]
+        elif data[36:40] == b'VBRI' and len(data) >= 54:
+            pending['stream_bytes'] = struct.unpack('>I', data[46:50])[0]
+            pending['frames'] = struct.unpack('>I', data[50:54])[0]
+
+        self._pending = pending
+        self._done = True
+        self._buffer = bytearray()
+
+    def result(self, total_size: Optional[int] = None) -> dict:
+        """读取结束后调用，返回元数据；无法识别时返回空字典"""
+        total_size = self._total if total_size is None else total_size
+        if self._pending is None and not self._done and not self.is_wav and self._audio_start is not None:
+            self._find_mp3_frame(final=True)
+        pending = self._pending
+        if pending is None:
+            return {}
+
+        if pending['format'] == 'wav':
+            data_size = pending['data_size']
+            if data_size in (0, 0xFFFFFFFF) or pending['data_offset'] + data_size > total_size:
+                data_size = total_size - pending['data_offset']
+            return {
+                'duration': round(data_size / pending['byte_rate'], 3),
+                'bitrate': pending['byte_rate'] * 8,
+                'sample_rate': pending['sample_rate'],
+                'channels': pending['channels'],
+            }
+
+        if pending.get('frames'):
+            duration = pending['frames'] * pending['samples_per_frame'] / pending['sample_rate']
+            stream_bytes = pending.get('stream_bytes') or (total_size - pending['audio_start'])
+            bitrate = int(stream_bytes * 8 / duration) if duration else pending['bitrate']
+        else:
+            # 无 VBR 标签时按 CBR 估算
+            bitrate = pending['bitrate']
+            duration = (total_size - pending['audio_start']) * 8 / bitrate
+
+        return {
+            'duration': round(duration, 3),
+            'bitrate': bitrate,
+            'sample_rate': pending['sample_rate'],
+            'channels': pending['channels'],
+        }
@@ -1,13 +1,26 @@
+import asyncio
 import os
 import hashlib
+import itertools
+import shutil
+import tempfile
 import aiofiles
 from fastapi import UploadFile, HTTPException, status
-from typing import Optional
-from datetime import datetime, timedelta
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+from datetime import datetime
 import mimetypes
 import logging
 from pathlib import Path
 
+from backend.app.core.config import settings
+from backend.app.core.metrics import AUDIO_BYTES_TOTAL
+from backend.app.core.redis import get_redis
+from backend.app.services.audio_manifest import AudioManifest
+from backend.app.services.audio_metadata import AUDIO_METADATA_FIELDS, AudioMetadataParser
+from backend.app.services.audio_cache import CachedAudio, HotAudioCache
+from backend.app.services.audio_transcoder import COMPACT_RENDITION, AudioTranscoder
+from backend.app.services.storage_executor import StorageExecutor
+
 # 只有在启用OSS时才导入oss2
 oss_available = os.getenv('ALIYUN_OSS_ACCESS_KEY') is not None
 if oss_available:
@@ -19,9 +32,24 @@ if oss_available:
 
 logger = logging.getLogger(__name__)
 
+_UPLOAD_BYTES = AUDIO_BYTES_TOTAL.labels("in", "upload")
+_ORIGIN_BYTES = AUDIO_BYTES_TOTAL.labels("in", "origin")
+
 
 class AudioService:
-    def __init__(self):
+    # 存储中已有文件回填到索引后写入，多个进程、多次启动只回填一次
+    MANIFEST_MIGRATED_KEY = "audio:manifest:migrated"
+    # 遍历存储时每页的文件数（OSS list_objects 单次最多返回1000个）
+    STORAGE_PAGE_SIZE = 1000
+
+    def __init__(self, redis_client=None, storage_executor: Optional[StorageExecutor] = None):
+        self.manifest = AudioManifest(redis_client)
+        # oss2 是同步SDK，所有OSS调用都放到专用线程池中执行
+        self.storage = storage_executor or StorageExecutor()
+        # 上传后的转码阶段，由 get_audio_service 按配置挂载
+        self.transcoder: Optional[AudioTranscoder] = None
+        # OSS 前的热点音频缓存，由 get_audio_service 按配置挂载
+        self.cache: Optional[HotAudioCache] = None
         self.oss_enabled = os.getenv('ALIYUN_OSS_ACCESS_KEY') is not None
 
         if self.oss_enabled:
@@ -53,9 +81,10 @@ class AudioService:
 
         self.allowed_content_types = ['audio/mpeg', 'audio/wav', 'audio/mp3']
         self.max_file_size = 10 * 1024 * 1024
+        self.chunk_size = 64 * 1024
 
     async def validate_audio_file(self, file: UploadFile) -> dict:
-        # 验证文件扩展名
+        """校验扩展名与 MIME 类型；文件头和大小在流式上传过程中校验"""
         filename_lower = file.filename.lower() if file.filename else ""
         if not any(filename_lower.endswith(ext) for ext in ['.mp3', '.wav']):
             raise HTTPException(
@@ -63,7 +92,6 @@ class AudioService:
                 detail='不支持的文件扩展名，仅支持 MP3 和 WAV 格式'
             )
 
-        # 验证 MIME 类型
         real_mime = mimetypes.guess_type(filename_lower)[0] or file.content_type
         if real_mime not in self.allowed_content_types:
             raise HTTPException(
@@ -71,38 +99,18 @@ class AudioService:
                 detail=f'不支持的音频格式: {real_mime}。支持的格式: MP3, WAV'
             )
 
-        # 读取并验证文件头
-        file_bytes = await file.read(2048)  # 只读取前面的字节进行验证
-        file.file.seek(0)  # 重置文件指针
-        
-        if not self._validate_file_header(file_bytes, real_mime):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail='文件格式验证失败，请上传有效的音频文件'
-            )
+        # 客户端已声明大小时提前拒绝，避免无谓的读取
+        if file.size is not None and file.size > self.max_file_size:
+            raise self._file_too_large()
 
-        # 验证文件大小
-        if file.size is not None:
-            if file.size > self.max_file_size:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f'音频文件过大，最大支持 {self.max_file_size // 1024 // 1024}MB'
-                )
-        else:
-            # 如果无法直接获取文件大小，读取整个文件并验证大小
-            file_contents = await file.read()
-            if len(file_contents) > self.max_file_size:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f'音频文件过大，最大支持 {self.max_file_size // 1024 // 1024}MB'
-                )
-            # 重置文件指针并重新分配内容
-            import io
-            file.file = io.BytesIO(file_contents)
-            file.size = len(file_contents)
-        
         return {'content_type': real_mime, 'size': file.size}
 
+    def _file_too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'音频文件过大，最大支持 {self.max_file_size // 1024 // 1024}MB'
+        )
+
     def _validate_file_header(self, file_bytes: bytes, content_type: str) -> bool:
         if content_type == 'audio/mpeg' or content_type == 'audio/mp3':
             return file_bytes.startswith(b'ID3') or file_bytes[:3] == b'\xff\xfb'
@@ -110,14 +118,60 @@ class AudioService:
             return file_bytes[:4] == b'RIFF' and file_bytes[8:12] == b'WAVE'
         return False
 
-    async def calculate_file_hash(self, file: UploadFile) -> str:
+    def _get_temp_dir(self) -> str:
+        # 本地存储时临时文件与目标目录位于同一文件系统，保证 os.replace 为原子操作
+        if self.oss_enabled:
+            return tempfile.gettempdir()
+        temp_dir = os.path.join(self.local_storage_path, '.tmp')
+        os.makedirs(temp_dir, exist_ok=True)
+        return temp_dir
+
+    async def _stream_to_temp(self, file: UploadFile, content_type: str) -> Tuple[str, str, int, dict]:
+        """
+        单次读取上传流：同时校验文件头、累计大小、计算 SHA-256、解析元数据并写入临时文件。
+        内存峰值为一个分块大小。返回 (临时文件路径, 文件哈希, 文件大小, 音频元数据)。
+        """
         hash_sha256 = hashlib.sha256()
+        metadata_parser = AudioMetadataParser(content_type)
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self._get_temp_dir(), suffix='.part')
+        os.close(fd)
 
-        while chunk := await file.read(8192):
-            hash_sha256.update(chunk)
+        try:
+            async with aiofiles.open(temp_path, 'wb') as f:
+                while chunk := await file.read(self.chunk_size):
+                    if size == 0 and not self._validate_file_header(chunk, content_type):
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail='文件格式验证失败，请上传有效的音频文件'
+                        )
+
+                    size += len(chunk)
+                    if size > self.max_file_size:
+                        raise self._file_too_large()
+
+                    hash_sha256.update(chunk)
+                    metadata_parser.feed(chunk)
+                    await f.write(chunk)
 
-        file.file.seek(0)
-        return hash_sha256.hexdigest()
+            if size == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail='文件格式验证失败，请上传有效的音频文件'
+                )
+        except BaseException:
+            self._remove_temp(temp_path)
+            raise
+
+        return temp_path, hash_sha256.hexdigest(), size, metadata_parser.result(size)
+
+    def _remove_temp(self, temp_path: str) -> None:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"清理临时文件失败: {temp_path}, 错误: {str(e)}")
 
     def _get_storage_path(self, file_hash: str, extension: str) -> str:
         now = datetime.now()
@@ -130,37 +184,61 @@ class AudioService:
             return os.path.join(self.local_storage_path, year, month, f'{file_hash}{extension}')
 
     async def upload_audio(self, file: UploadFile) -> dict:
-        await self.validate_audio_file(file)
+        validated = await self.validate_audio_file(file)
+        content_type = validated['content_type']
+        extension = mimetypes.guess_extension(content_type) or '.mp3'
 
-        file_hash = await self.calculate_file_hash(file)
-        extension = mimetypes.guess_extension(file.content_type) or '.mp3'
-        storage_path = self._get_storage_path(file_hash, extension)
+        temp_path, file_hash, size, metadata = await self._stream_to_temp(file, content_type)
+        _UPLOAD_BYTES.inc(size)
+        try:
+            # 相同内容已在索引中（可能位于更早的月份目录），直接复用
+            existing = await self.touch(file_hash)
+            if existing is not None:
+                return {
+                    'file_id': file_hash,
+                    'storage_path': existing['storage_path'],
+                    'content_type': existing['content_type'],
+                    'size': existing['size'],
+                    'metadata': {k: existing.get(k) for k in AUDIO_METADATA_FIELDS}
+                }
+
+            storage_path = self._get_storage_path(file_hash, extension)
 
-        if self.oss_enabled:
-            file_id = await self._upload_to_oss(file, storage_path, file_hash)
-        else:
-            file_id = await self._upload_to_local(file, storage_path, file_hash)
+            if self.oss_enabled:
+                file_id = await self._upload_to_oss(temp_path, storage_path, file_hash)
+            else:
+                file_id = await self._upload_to_local(temp_path, storage_path, file_hash)
+        finally:
+            self._remove_temp(temp_path)
+
+        await self.manifest.put(file_id, self._manifest_entry(
+            file_id, storage_path, extension, size, metadata
+        ))
+
+        if self.transcoder is not None:
+            self.transcoder.schedule(file_id)
 
         return {
             'file_id': file_id,
             'storage_path': storage_path,
-            'content_type': file.content_type,
-            'size': file.size
+            'content_type': content_type,
+            'size': size,
+            'metadata': metadata
         }
 
-    async def _upload_to_oss(self, file: UploadFile, storage_path: str, file_hash: str) -> str:
+    async def _upload_to_oss(self, temp_path: str, storage_path: str, file_hash: str) -> str:
         if not self.oss_enabled or self.bucket is None:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail='OSS服务不可用，请检查配置'
             )
-            
+
         try:
-            if self.bucket.object_exists(storage_path):
+            if await self.storage.run('object_exists', self.bucket.object_exists, storage_path):
                 return file_hash
 
-            content = await file.read()
-            self.bucket.put_object(storage_path, content)
+            # 从临时文件流式上传，不把整个文件读入内存
+            await self.storage.run('put_object', self.bucket.put_object_from_file, storage_path, temp_path)
 
             return file_hash
 
@@ -175,7 +253,7 @@ class AudioService:
                 detail=f'音频上传失败: {str(e)}'
             )
 
-    async def _upload_to_local(self, file: UploadFile, storage_path: str, file_hash: str) -> str:
+    async def _upload_to_local(self, temp_path: str, storage_path: str, file_hash: str) -> str:
         try:
             if os.path.exists(storage_path):
                 return file_hash
@@ -183,9 +261,8 @@ class AudioService:
             directory = os.path.dirname(storage_path)
             os.makedirs(directory, exist_ok=True)
 
-            async with aiofiles.open(storage_path, 'wb') as f:
-                while chunk := await file.read(8192):
-                    await f.write(chunk)
+            # 原子重命名到内容寻址路径，读者不会看到写了一半的文件
+            os.replace(temp_path, storage_path)
 
             return file_hash
 
@@ -195,61 +272,337 @@ class AudioService:
                 detail=f'音频上传失败: {str(e)}'
             )
 
-    def get_audio_url(self, file_id: str) -> str:
-        now = datetime.now()
-        year = now.strftime('%Y')
-        month = now.strftime('%m')
+    async def preflight(self, file_hash: str, size: int) -> Optional[dict]:
+        """
+        上传前按客户端计算的哈希查重：内容已存在时返回索引条目，
+        客户端无需再传输文件。大小必须一致，以免仅凭哈希取得他人文件。
+        """
+        entry = await self.manifest.get(file_hash)
+        if entry is None or entry['size'] != size:
+            return None
+        return await self.touch(file_hash) or entry
+
+    async def touch(self, file_id: str) -> Optional[dict]:
+        """记录文件被复用的时间，孤立音频回收对刚复用、尚未写入题目的文件留出宽限期"""
+        return await self.manifest.update(file_id, last_used_at=datetime.now().isoformat())
+
+    async def get_audio_url(self, file_id: str) -> str:
+        entry = await self.manifest.get(file_id)
+        if entry is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='音频文件不存在'
+            )
+        return f'/api/audio/{file_id}{entry["extension"]}'
 
-        extensions = ['.mp3', '.wav']
+    async def get_audio_entry(self, file_id: str, extension: str) -> dict:
+        """按 file_id 和扩展名取得索引条目，不存在时抛出404"""
+        entry = await self.manifest.get(file_id)
+        if entry is None or entry['extension'] != extension:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='音频文件不存在'
+            )
+        return entry
 
-        for ext in extensions:
-            storage_path = f'audio-files/{year}/{month}/{file_id}{ext}'
+    def get_local_relative_path(self, entry: dict) -> str:
+        """本地文件相对于存储根目录的路径，用于 X-Accel-Redirect"""
+        return os.path.relpath(entry['storage_path'], self.local_storage_path).replace(os.sep, '/')
 
-            if self.oss_enabled:
-                if self.bucket.object_exists(storage_path):
-                    return f'/api/audio/{file_id}{ext}'
-            else:
-                full_path = os.path.join(self.local_storage_path, year, month, f'{file_id}{ext}')
-                if os.path.exists(full_path):
-                    return f'/api/audio/{file_id}{ext}'
+    def sign_oss_url(self, storage_path: str, expires: int) -> str:
+        return self.bucket.sign_url('GET', storage_path, expires)
 
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail='音频文件不存在'
-        )
+    async def read_through_cache(self, served: dict, pin: bool = False) -> CachedAudio:
+        """
+        经热点缓存读取 OSS 上的音频（原文件或转码版本的索引条目）。
+        pin 为 True 时返回的磁盘文件在发送完成前不会被淘汰，调用方须在发送后 release
+        """
+        storage_path = served['storage_path']
+
+        async def load(target_path: str) -> None:
+            await self.storage.run('get_object', self.bucket.get_object_to_file, storage_path, target_path)
+            _ORIGIN_BYTES.inc(served['size'])
+
+        return await self.cache.get(os.path.basename(storage_path), load, pin=pin)
+
+    def record_served(self, nbytes: int, delivery: str) -> None:
+        """记录分发给客户端的字节数，delivery 为 app / cache / x_accel"""
+        AUDIO_BYTES_TOTAL.labels("out", delivery).inc(nbytes)
+
+    async def warm_cache(self, file_ids, concurrency: int = 4) -> None:
+        """预热一批音频（试卷发布后在后台调用），最多 concurrency 个并发回源，优先缓存默认分发的 compact 版本"""
+        if self.cache is None:
+            return
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def warm(file_id: str) -> None:
+            async with semaphore:
+                entry = await self.manifest.get(file_id)
+                if entry is None:
+                    return
+                served = entry.get('renditions', {}).get(COMPACT_RENDITION, entry)
+                try:
+                    await self.read_through_cache(served)
+                except Exception as e:
+                    logger.warning(f"预热音频缓存失败: {file_id}, 错误: {e!r}")
+
+        await asyncio.gather(*[warm(file_id) for file_id in file_ids])
 
     async def delete_audio(self, file_id: str) -> bool:
-        deleted = False
-
-        for ext in ['.mp3', '.wav']:
-            for month_offset in range(3):
-                now = datetime.now() - timedelta(days=month_offset * 30)
-                year = now.strftime('%Y')
-                month = now.strftime('%m')
-
-                storage_path = f'audio-files/{year}/{month}/{file_id}{ext}'
-
-                if self.oss_enabled:
-                    try:
-                        if self.bucket.object_exists(storage_path):
-                            self.bucket.delete_object(storage_path)
-                            deleted = True
-                            logger.info(f"已删除 OSS 音频文件: {storage_path}")
-                            break
-                    except OssError as e:
-                        logger.warning(f"删除 OSS 文件失败: {storage_path}, 错误: {str(e)}")
-                else:
-                    full_path = os.path.join(self.local_storage_path, year, month, f'{file_id}{ext}')
-                    if os.path.exists(full_path):
-                        try:
-                            os.remove(full_path)
-                            deleted = True
-                            logger.info(f"已删除本地音频文件: {full_path}")
-                            break
-                        except OSError as e:
-                            logger.warning(f"删除本地文件失败: {full_path}, 错误: {str(e)}")
-
-            if deleted:
-                break
+        entry = await self.manifest.get(file_id)
+        if entry is None:
+            return False
+
+        storage_paths = [entry['storage_path']]
+        storage_paths += [r['storage_path'] for r in entry.get('renditions', {}).values()]
+
+        for storage_path in storage_paths:
+            if not await self._delete_stored_file(storage_path):
+                return False
+
+        await self.manifest.delete(file_id)
+        return True
+
+    async def _delete_stored_file(self, storage_path: str) -> bool:
+        if self.oss_enabled:
+            try:
+                await self.storage.run('delete_object', self.bucket.delete_object, storage_path)
+                logger.info(f"已删除 OSS 音频文件: {storage_path}")
+            except OssError as e:
+                logger.warning(f"删除 OSS 文件失败: {storage_path}, 错误: {str(e)}")
+                return False
+        else:
+            try:
+                os.remove(storage_path)
+                logger.info(f"已删除本地音频文件: {storage_path}")
+            except FileNotFoundError:
+                logger.warning(f"本地音频文件已不存在: {storage_path}")
+            except OSError as e:
+                logger.warning(f"删除本地文件失败: {storage_path}, 错误: {str(e)}")
+                return False
+        return True
+
+    async def delete_audio_batch(self, entries: List[dict]) -> List[str]:
+        """
+        批量删除音频（含转码版本）及其索引条目，返回成功删除的 file_id。
+        OSS 使用批量删除接口，每次请求最多1000个对象。
+        """
+        if not entries:
+            return []
+
+        paths_by_id = {
+            entry['file_id']: [entry['storage_path']] + [
+                r['storage_path'] for r in entry.get('renditions', {}).values()
+            ]
+            for entry in entries
+        }
+
+        if self.oss_enabled:
+            all_keys = [key for keys in paths_by_id.values() for key in keys]
+            failed_keys = set()
+            for offset in range(0, len(all_keys), 1000):
+                batch = all_keys[offset:offset + 1000]
+                try:
+                    await self.storage.run('batch_delete_objects', self.bucket.batch_delete_objects, batch)
+                except OssError as e:
+                    logger.warning(f"批量删除 OSS 文件失败: {len(batch)} 个对象, 错误: {str(e)}")
+                    failed_keys.update(batch)
+            deleted = [fid for fid, keys in paths_by_id.items() if not failed_keys.intersection(keys)]
+        else:
+            deleted = []
+            for file_id, paths in paths_by_id.items():
+                if all([await self._delete_stored_file(path) for path in paths]):
+                    deleted.append(file_id)
+
+        for file_id in deleted:
+            await self.manifest.delete(file_id)
+
+        logger.info(f"批量删除音频 {len(deleted)}/{len(entries)} 个")
+        return deleted
+
+    async def fetch_to_local(self, entry: dict, work_dir: str) -> str:
+        """取得原文件的本地路径；OSS 文件先下载到 work_dir"""
+        if not self.oss_enabled:
+            return entry['storage_path']
+
+        local_path = os.path.join(work_dir, os.path.basename(entry['storage_path']))
+        await self.storage.run('get_object', self.bucket.get_object_to_file, entry['storage_path'], local_path)
+        return local_path
 
+    async def store_rendition(self, entry: dict, rendition: str, local_path: str) -> str:
+        """将转码结果存放到原文件旁，文件名为 {file_id}.{rendition}.mp3，返回存储路径"""
+        file_name = f"{entry['file_id']}.{rendition}.mp3"
+
+        if self.oss_enabled:
+            storage_path = f"{os.path.dirname(entry['storage_path'])}/{file_name}"
+            await self.storage.run('put_object', self.bucket.put_object_from_file, storage_path, local_path)
+        else:
+            storage_path = os.path.join(os.path.dirname(entry['storage_path']), file_name)
+            shutil.move(local_path, storage_path)
+
+        return storage_path
+
+    async def rebuild_manifest(self) -> int:
+        """
+        扫描一次存储并回填音频索引，用于迁移索引建立之前上传的文件。
+        返回新写入的条目数。
+        """
+        count = 0
+        async for page in self.list_storage():
+            for item in page:
+                if item['temp']:
+                    continue
+                storage_path, size = item['storage_path'], item['size']
+                file_name = os.path.basename(storage_path)
+                file_id, extension = os.path.splitext(file_name)
+                # 转码版本（{file_id}.compact.mp3）随原文件条目记录，不单独建索引
+                if '.' in file_id or extension not in ('.mp3', '.wav') or await self.manifest.get(file_id):
+                    continue
+
+                await self.manifest.put(file_id, self._manifest_entry(
+                    file_id, storage_path, extension, size
+                ))
+                count += 1
+
+        logger.info(f"音频索引回填完成，新增 {count} 条")
+        return count
+
+    async def ensure_manifest(self) -> int:
+        """
+        应用启动时调用：索引尚未回填过时扫描存储回填一次，之后的启动直接跳过。
+        无Redis时索引只在进程内，每次启动都需要回填。返回新写入的条目数。
+        """
+        redis_client = self.manifest.redis
+        if redis_client and await redis_client.exists(self.MANIFEST_MIGRATED_KEY):
+            return 0
+        count = await self.rebuild_manifest()
+        if redis_client:
+            await redis_client.set(self.MANIFEST_MIGRATED_KEY, datetime.now().isoformat())
+        return count
+
+    async def list_storage(self, page_size: int = STORAGE_PAGE_SIZE) -> AsyncIterator[List[dict]]:
+        """
+        分页遍历存储中的文件，每页为 {'storage_path', 'size', 'modified', 'temp'} 的列表，
+        temp 表示本地上传中断残留的临时文件。用于索引回填和孤立音频回收；
+        一次只取一页，存储中的文件再多也不会整体读入内存
+        """
+        if self.oss_enabled:
+            marker = ''
+            while True:
+                result = await self.storage.run(
+                    'list_objects', self.bucket.list_objects, 'audio-files/', '', marker, page_size
+                )
+                yield [
+                    {
+                        'storage_path': obj.key,
+                        'size': obj.size,
+                        'modified': datetime.fromtimestamp(obj.last_modified),
+                        'temp': False
+                    }
+                    for obj in result.object_list
+                ]
+                if not result.is_truncated:
+                    return
+                marker = result.next_marker
+
+        # 本地目录遍历是一个生成器，每页在线程中推进一次；不经过重试，避免重试时跳过已遍历的部分
+        files = self._walk_local_storage()
+        while True:
+            page = await asyncio.to_thread(lambda: list(itertools.islice(files, page_size)))
+            if not page:
+                return
+            yield page
+
+    def _walk_local_storage(self) -> Iterator[dict]:
+        for root, dirs, files in os.walk(self.local_storage_path):
+            # 只进入上传临时目录，跳过其他隐藏目录
+            dirs[:] = [d for d in dirs if not d.startswith('.') or d == '.tmp']
+            temp = os.path.basename(root) == '.tmp'
+            for name in files:
+                full_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(full_path)
+                except FileNotFoundError:
+                    # 遍历期间被删除
+                    continue
+                yield {
+                    'storage_path': full_path,
+                    'size': stat.st_size,
+                    'modified': datetime.fromtimestamp(stat.st_mtime),
+                    'temp': temp
+                }
+
+    async def delete_stored_files(self, storage_paths: List[str]) -> List[str]:
+        """删除不在索引中的存储文件（不改动索引），返回删除成功的路径"""
+        if not self.oss_enabled:
+            return [path for path in storage_paths if await self._delete_stored_file(path)]
+
+        deleted = []
+        for offset in range(0, len(storage_paths), 1000):
+            batch = storage_paths[offset:offset + 1000]
+            try:
+                await self.storage.run('batch_delete_objects', self.bucket.batch_delete_objects, batch)
+                deleted.extend(batch)
+            except OssError as e:
+                logger.warning(f"批量删除 OSS 文件失败: {len(batch)} 个对象, 错误: {str(e)}")
         return deleted
+
+    def _manifest_entry(
+        self,
+        file_id: str,
+        storage_path: str,
+        extension: str,
+        size: int,
+        metadata: Optional[dict] = None
+    ) -> dict:
+        # 元数据在上传时解析一次写入索引条目，之后不再为此读取文件
+        return {
+            **(metadata or {}),
+            'file_id': file_id,
+            'storage': 'oss' if self.oss_enabled else 'local',
+            'storage_path': storage_path,
+            'extension': extension,
+            'size': size,
+            'content_type': 'audio/wav' if extension == '.wav' else 'audio/mpeg',
+            'created_at': datetime.now().isoformat()
+        }
+
+
+_audio_service: Optional[AudioService] = None
+
+
+def get_audio_service() -> AudioService:
+    """进程内共享的音频服务实例，各路由复用同一份索引与存储连接"""
+    global _audio_service
+    if _audio_service is None:
+        _audio_service = AudioService(
+            redis_client=get_redis(),
+            storage_executor=StorageExecutor(
+                max_workers=settings.storage_executor_workers,
+                timeout=settings.storage_call_timeout,
+                retries=settings.storage_call_retries
+            )
+        )
+        if _audio_service.oss_enabled and settings.audio_cache_enabled:
+            _audio_service.cache = HotAudioCache(
+                settings.audio_cache_dir,
+                memory_limit=settings.audio_cache_memory_limit,
+                disk_limit=settings.audio_cache_disk_limit
+            )
+        if settings.audio_transcode_enabled:
+            _audio_service.transcoder = AudioTranscoder(
+                _audio_service,
+                max_workers=settings.audio_transcode_workers,
+                bitrate=settings.audio_compact_bitrate,
+                sample_rate=settings.audio_compact_sample_rate,
+                on_rendition=_rebuild_audio_papers
+            )
+    return _audio_service
+
+
+async def _rebuild_audio_papers(file_id: str) -> int:
+    # 快照服务依赖本模块，延迟导入
+    from backend.app.services.paper_snapshot_service import rebuild_audio_papers
+
+    return await rebuild_audio_papers(file_id)
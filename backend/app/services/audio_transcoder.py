@@ -0,0 +1,152 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, List, Optional, Set
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+
+logger = logging.getLogger(__name__)
+
+COMPACT_RENDITION = 'compact'
+
+
+def build_ffmpeg_command(source_path: str, target_path: str, bitrate: str, sample_rate: int) -> List[str]:
+    """单声道、响度归一化的低码率MP3，适合课堂Wi-Fi下分发的听力材料"""
+    return [
+        'ffmpeg', '-nostdin', '-loglevel', 'error', '-y',
+        '-i', source_path,
+        '-vn', '-ac', '1', '-ar', str(sample_rate),
+        '-af', 'loudnorm=I=-16:TP=-1.5:LRA=11',
+        '-codec:a', 'libmp3lame', '-b:a', bitrate,
+        target_path
+    ]
+
+
+def transcode_file(source_path: str, target_path: str, bitrate: str, sample_rate: int) -> int:
+    """在子进程中执行转码，返回输出文件大小（供进程池调用，需为模块级函数）"""
+    subprocess.run(
+        build_ffmpeg_command(source_path, target_path, bitrate, sample_rate),
+        check=True,
+        capture_output=True,
+        timeout=300
+    )
+    return os.path.getsize(target_path)
+
+
+def file_sha256(path: str) -> str:
+    hash_sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(64 * 1024):
+            hash_sha256.update(chunk)
+    return hash_sha256.hexdigest()
+
+
+class AudioTranscoder:
+    """
+    上传后的异步转码阶段
+
+    每个上传文件在进程池中转码为低码率单声道版本，
+    结果作为 compact 版本记录在音频索引条目的 renditions 下，原文件保留。
+    记录后调用 on_rendition(file_id)，由其重建发布时还只能指向原文件的试卷音频清单和快照。
+    max_workers 为0时在线程中转码，用于开发和测试环境。
+    """
+
+    def __init__(
+        self,
+        audio_service,
+        max_workers: int = 2,
+        bitrate: str = '48k',
+        sample_rate: int = 22050,
+        transcode_func: Callable[[str, str, str, int], int] = transcode_file,
+        on_rendition: Optional[Callable[[str], Awaitable[object]]] = None
+    ):
+        self.audio_service = audio_service
+        self.on_rendition = on_rendition
+        self.bitrate = bitrate
+        self.sample_rate = sample_rate
+        self.transcode_func = transcode_func
+        self.enabled = transcode_func is not transcode_file or shutil.which('ffmpeg') is not None
+        if not self.enabled:
+            logger.warning("未找到ffmpeg，音频转码已停用，将直接分发原文件")
+        self._pool = ProcessPoolExecutor(max_workers=max_workers) if self.enabled and max_workers > 0 else None
+        # 持有后台任务的引用，避免任务在完成前被垃圾回收
+        self._tasks: Set[asyncio.Task] = set()
+
+    def schedule(self, file_id: str) -> Optional[asyncio.Task]:
+        """在后台为 file_id 生成 compact 版本，不阻塞上传请求"""
+        if not self.enabled:
+            return None
+        task = asyncio.create_task(self.transcode(file_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"音频转码任务异常退出: {task.exception()!r}")
+
+    async def wait(self) -> None:
+        """等待所有进行中的转码完成，供测试和关闭时使用"""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def transcode(self, file_id: str) -> Optional[dict]:
+        service = self.audio_service
+        entry = await service.manifest.get(file_id)
+        if entry is None or COMPACT_RENDITION in entry.get('renditions', {}):
+            return None
+
+        work_dir = tempfile.mkdtemp(prefix='transcode-')
+        try:
+            source_path = await service.fetch_to_local(entry, work_dir)
+            target_path = os.path.join(work_dir, f'{file_id}.{COMPACT_RENDITION}.mp3')
+
+            loop = asyncio.get_running_loop()
+            size = await loop.run_in_executor(
+                self._pool, self.transcode_func, source_path, target_path, self.bitrate, self.sample_rate
+            )
+
+            if size >= entry['size']:
+                logger.info(f"音频 {file_id} 转码后未变小，保留原文件分发")
+                return None
+
+            # 试卷音频清单按实际分发的文件给出哈希，客户端用于校验预取结果
+            sha256 = await asyncio.to_thread(file_sha256, target_path)
+            rendition = {
+                'storage_path': await service.store_rendition(entry, COMPACT_RENDITION, target_path),
+                'extension': '.mp3',
+                'size': size,
+                'sha256': sha256,
+                'content_type': 'audio/mpeg',
+                'bitrate': self.bitrate,
+                'sample_rate': self.sample_rate,
+                'channels': 1
+            }
+            renditions = dict(entry.get('renditions', {}), **{COMPACT_RENDITION: rendition})
+            if await service.manifest.update(file_id, renditions=renditions) is None:
+                # 转码期间音频已被删除或回收，清理刚写入的转码文件，不重建条目
+                logger.info(f"音频 {file_id} 已被删除，丢弃转码结果")
+                await service.delete_stored_files([rendition['storage_path']])
+                return None
+
+            logger.info(f"音频 {file_id} 转码完成: {entry['size']} -> {size} 字节")
+        except Exception as e:
+            logger.error(f"音频 {file_id} 转码失败: {e!r}")
+            return None
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        if self.on_rendition is not None:
+            try:
+                await self.on_rendition(file_id)
+            except Exception as e:
+                logger.error(f"音频 {file_id} 转码后重建试卷快照失败: {e!r}")
+        return rendition
+
+    def shutdown(self) -> None:
+        if self._pool:
+            self._pool.shutdown(wait=False)
@@ -0,0 +1,333 @@
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+ANSWER_PREFIX = "a:"
+CURRENT_FIELD = "_current"
+SAVES_FIELD = "_saves"
+SEQ_FIELD = "_seq"
+LOADED_FIELD = "_loaded"
+
+# 校验序号并合并增量，整个过程在 Redis 中原子完成。返回 -1 表示接受，否则返回已接受的最大序号
+APPLY_DELTA_SCRIPT = """
+local seq = tonumber(ARGV[1])
+if seq > 0 then
+    local current = tonumber(redis.call('HGET', KEYS[1], '_seq') or '0')
+    if seq <= current then
+        return current
+    end
+    redis.call('HSET', KEYS[1], '_seq', seq)
+end
+for i = 4, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HINCRBY', KEYS[1], '_saves', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[3])
+return -1
+"""
+
+# 写回成功后扣减保存次数。缓冲在写回期间已被交卷清除时不再重建（否则会留下没有过期时间的键）
+ACKNOWLEDGE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], '_saves', -tonumber(ARGV[1]))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+# 把数据库中已写回的作答并入缓冲，不覆盖缓冲中更新的作答，并标记为已载入
+LOAD_SAVED_SCRIPT = """
+for i = 2, #ARGV, 2 do
+    redis.call('HSETNX', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HSET', KEYS[1], '_loaded', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+class AutosaveBuffer:
+    """
+    答题进度写缓冲
+
+    自动保存只写入每个 exam_token 一个的 Redis 哈希（每题一个字段），并把 token 加入脏集合，
+    立即返回。客户端只需发送变化的作答和递增的序号，序号不大于已接受序号的增量视为乱序并拒绝。
+    后台按固定间隔取出脏 token，合并成一条多行 UPDATE 写回 student_exams。
+    交卷时调用 flush_exam 同步写回该学生的缓冲，停止时把剩余缓冲全部写回。
+    缓冲写回后保留到过期，答题期间第一次读取进度时用 load_saved 并入数据库中的作答，
+    之后读取进度只读缓冲。
+    无Redis时退化为进程内字典，仅适用于开发环境。
+    """
+    DIRTY_KEY = "autosave:dirty"
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[dict]], int],
+        redis_client=None,
+        batch_size: int = 500,
+        buffer_ttl: int = 2 * 24 * 3600
+    ):
+        self.write_batch = write_batch
+        self.redis = redis_client
+        self.batch_size = batch_size
+        self.buffer_ttl = buffer_ttl
+        self._local: Dict[str, Dict[str, str]] = {}
+        self._dirty: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self._apply_delta = redis_client.register_script(APPLY_DELTA_SCRIPT) if redis_client else None
+        self._acknowledge_saves = redis_client.register_script(ACKNOWLEDGE_SCRIPT) if redis_client else None
+        self._load_saved = redis_client.register_script(LOAD_SAVED_SCRIPT) if redis_client else None
+
+    @staticmethod
+    def _key(exam_token: str) -> str:
+        return f"autosave:{exam_token}"
+
+    async def save(
+        self,
+        exam_token: str,
+        answers: Dict[str, str],
+        current_question: Optional[int] = None,
+        seq: Optional[int] = None
+    ) -> Tuple[bool, int]:
+        """
+        合并一次保存（可以是完整作答，也可以只含变化的题目）并标记为待写回。
+        返回 (是否接受, 已接受的最大序号)；未带序号的保存总是接受。
+        """
+        fields = {ANSWER_PREFIX + question_id: answer for question_id, answer in answers.items()}
+        if current_question is not None:
+            fields[CURRENT_FIELD] = str(current_question)
+
+        if self.redis:
+            args = [seq or 0, self.buffer_ttl, exam_token]
+            for name, value in fields.items():
+                args.extend((name, value))
+            result = int(await self._apply_delta(keys=[self._key(exam_token), self.DIRTY_KEY], args=args))
+            if result >= 0:
+                return False, result
+            return True, seq or 0
+
+        buffered = self._local.setdefault(exam_token, {})
+        if seq:
+            current = int(buffered.get(SEQ_FIELD, 0))
+            if seq <= current:
+                return False, current
+            buffered[SEQ_FIELD] = str(seq)
+        buffered.update(fields)
+        buffered[SAVES_FIELD] = str(int(buffered.get(SAVES_FIELD, 0)) + 1)
+        self._dirty.add(exam_token)
+        return True, seq or 0
+
+    async def load_saved(self, exam_token: str, answers: Dict[str, str]) -> dict:
+        """
+        把数据库中已写回的作答并入缓冲（缓冲中已有的题目以缓冲为准）并标记为已载入，
+        返回合并后的进度。载入的作答不标记为待写回
+        """
+        fields = {ANSWER_PREFIX + question_id: answer for question_id, answer in answers.items()}
+        if self.redis:
+            args = [self.buffer_ttl]
+            for name, value in fields.items():
+                args.extend((name, value))
+            await self._load_saved(keys=[self._key(exam_token)], args=args)
+        else:
+            buffered = self._local.setdefault(exam_token, {})
+            for name, value in fields.items():
+                buffered.setdefault(name, value)
+            buffered[LOADED_FIELD] = '1'
+        return await self.get_buffered(exam_token)
+
+    async def get_buffered(self, exam_token: str) -> Optional[dict]:
+        """
+        读取缓冲中的进度：{'answers': {...}, 'current_question': n, 'loaded': 是否已并入数据库中的作答}
+        """
+        if self.redis:
+            raw = await self.redis.hgetall(self._key(exam_token))
+            fields = {k.decode(): v.decode() for k, v in raw.items()}
+        else:
+            fields = dict(self._local.get(exam_token, {}))
+        if not fields:
+            return None
+        return self._parse(exam_token, fields)
+
+    @staticmethod
+    def _parse(exam_token: str, fields: Dict[str, str]) -> dict:
+        current = fields.get(CURRENT_FIELD)
+        return {
+            'exam_token': exam_token,
+            'answers': {
+                name[len(ANSWER_PREFIX):]: value
+                for name, value in fields.items() if name.startswith(ANSWER_PREFIX)
+            },
+            'current_question': int(current) if current is not None else None,
+            'saves': int(fields.get(SAVES_FIELD, 0)),
+            'seq': int(fields.get(SEQ_FIELD, 0)),
+            'loaded': LOADED_FIELD in fields
+        }
+
+    async def _pop_dirty(self) -> List[str]:
+        if self.redis:
+            tokens = await self.redis.spop(self.DIRTY_KEY, self.batch_size)
+            return [t.decode() for t in tokens or []]
+        tokens = []
+        while self._dirty and len(tokens) < self.batch_size:
+            tokens.append(self._dirty.pop())
+        return tokens
+
+    async def _mark_dirty(self, exam_tokens: List[str]) -> None:
+        if not exam_tokens:
+            return
+        if self.redis:
+            await self.redis.sadd(self.DIRTY_KEY, *exam_tokens)
+        else:
+            self._dirty.update(exam_tokens)
+
+    async def _read(self, exam_tokens: List[str]) -> List[dict]:
+        if self.redis:
+            pipe = self.redis.pipeline(transaction=False)
+            for exam_token in exam_tokens:
+                pipe.hgetall(self._key(exam_token))
+            results = await pipe.execute()
+            field_maps = [{k.decode(): v.decode() for k, v in raw.items()} for raw in results]
+        else:
+            field_maps = [dict(self._local.get(t, {})) for t in exam_tokens]
+        return [
+            self._parse(exam_token, fields)
+            for exam_token, fields in zip(exam_tokens, field_maps) if fields
+        ]
+
+    async def _acknowledge(self, rows: List[dict]) -> None:
+        """写回成功后扣减已计入数据库的保存次数；期间的新保存仍留在缓冲中"""
+        if self.redis:
+            pipe = self.redis.pipeline(transaction=False)
+            for row in rows:
+                self._acknowledge_saves(
+                    keys=[self._key(row['exam_token'])], args=[row['saves'], self.buffer_ttl], client=pipe
+                )
+            await pipe.execute()
+        else:
+            for row in rows:
+                buffered = self._local.get(row['exam_token'])
+                if buffered is not None:
+                    buffered[SAVES_FIELD] = str(int(buffered.get(SAVES_FIELD, 0)) - row['saves'])
+
+    async def _write(self, exam_tokens: List[str]) -> int:
+        rows = await self._read(exam_tokens)
+        if not rows:
+            return 0
+        try:
+            await asyncio.to_thread(self.write_batch, rows)
+        except Exception:
+            # 写回失败时重新标记，下一轮重试
+            await self._mark_dirty(exam_tokens)
+            raise
+        await self._acknowledge(rows)
+        return len(rows)
+
+    async def flush_once(self) -> int:
+        """写回当前所有脏缓冲，返回写回的 token 数"""
+        flushed = 0
+        while True:
+            exam_tokens = await self._pop_dirty()
+            if not exam_tokens:
+                break
+            flushed += await self._write(exam_tokens)
+            if len(exam_tokens) < self.batch_size:
+                break
+        if flushed:
+            logger.info(f"自动保存写回 {flushed} 份答题进度")
+        return flushed
+
+    async def flush_exam(self, exam_token: str) -> Optional[dict]:
+        """交卷或到期时同步写回单个学生的缓冲并清除，返回缓冲中的进度"""
+        buffered = await self.get_buffered(exam_token)
+        if buffered is not None:
+            await self._write([exam_token])
+        await self.discard(exam_token)
+        return buffered
+
+    async def flush_tokens(self, exam_tokens: List[str]) -> int:
+        """截止判分前成批写回这些学生的缓冲并清除，返回写回的 token 数"""
+        flushed = 0
+        for start in range(0, len(exam_tokens), self.batch_size):
+            batch = exam_tokens[start:start + self.batch_size]
+            flushed += await self._write(batch)
+            for exam_token in batch:
+                await self.discard(exam_token)
+        return flushed
+
+    async def discard(self, exam_token: str) -> None:
+        if self.redis:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.delete(self._key(exam_token))
+            pipe.srem(self.DIRTY_KEY, exam_token)
+            await pipe.execute()
+        else:
+            self._local.pop(exam_token, None)
+            self._dirty.discard(exam_token)
+
+    async def run_forever(self, interval: float) -> None:
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.flush_once()
+                except Exception as e:
+                    logger.error(f"自动保存写回失败: {e!r}")
+        finally:
+            # 停止时做最后一次写回
+            await self.flush_once()
+
+    def start(self, interval: float) -> asyncio.Task:
+        """在应用启动时调用，按固定间隔在后台写回"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever(interval))
+        return self._task
+
+    async def stop(self) -> None:
+        """在应用关闭时调用，等待最后一次写回完成"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_autosave_buffer: Optional[AutosaveBuffer] = None
+
+
+def get_autosave_buffer() -> AutosaveBuffer:
+    """按配置创建写缓冲，写回使用独立的数据库会话"""
+    global _autosave_buffer
+    if _autosave_buffer is None:
+        from backend.app.core.config import settings
+        from backend.app.core.database import SessionLocal
+        from backend.app.core.redis import get_redis
+        from backend.app.repositories.exam_repository import ExamRepository
+
+        def write_batch(rows: List[dict]) -> int:
+            db = SessionLocal()
+            try:
+                updated = ExamRepository(db).bulk_update_progress(rows, datetime.now())
+                db.commit()
+                return updated
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        _autosave_buffer = AutosaveBuffer(
+            write_batch,
+            redis_client=get_redis(),
+            batch_size=settings.autosave_batch_size,
+            buffer_ttl=settings.autosave_buffer_ttl_seconds
+        )
+    return _autosave_buffer
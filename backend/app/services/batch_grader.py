@@ -0,0 +1,300 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from backend.app.services.exam_analytics import SCORE_BUCKETS, WRONG_ANSWER_MAX_LENGTH, AnalyticsDelta
+
+
+logger = logging.getLogger(__name__)
+
+# 未作答、或作答不在任何题目的候选答案中
+NO_ANSWER = -1
+
+
+def normalize_answer(answer) -> Optional[str]:
+    if answer is None:
+        return None
+    normalized = str(answer).strip().upper()
+    return normalized or None
+
+
+@dataclass
+class GradeResult:
+    """
+    一批答卷的判分结果，行与输入答卷一一对应
+    scores: 百分制得分；raw_scores: 得分合计；correct_counts: 答对题数；
+    correctness: (答卷数, 题目数) 的布尔矩阵，列顺序同 BatchGrader.question_ids
+    """
+    scores: np.ndarray
+    raw_scores: np.ndarray
+    correct_counts: np.ndarray
+    correctness: np.ndarray
+
+    def question_correct_counts(self) -> np.ndarray:
+        """每道题答对的人数"""
+        return self.correctness.sum(axis=0)
+
+
+class BatchGrader:
+    """
+    批量判分
+
+    试卷的标准答案和分值只加载一次，编码为整数向量；一批答卷编码为答案矩阵，
+    一次向量运算得到全班的得分、答对题数和逐题对错。
+    得分按 sum(答对题目分值) / 总分 × 100 计算，保留两位小数。
+    """
+
+    def __init__(self, answer_key: Sequence[dict]):
+        """answer_key: 按题号顺序的 [{'id', 'correct_answer', 'score'}, ...]"""
+        self.question_ids: List[str] = [str(q['id']) for q in answer_key]
+        self.question_index: Dict[str, int] = {qid: i for i, qid in enumerate(self.question_ids)}
+        self.points = np.array([q['score'] for q in answer_key], dtype=np.float64)
+        self.total_points = float(self.points.sum())
+
+        # 每题的正确答案编码为 0..n-1 的整数，答卷只需与之逐列比较
+        self._codes: Dict[str, int] = {}
+        self._raw_codes: Dict[object, int] = {None: NO_ANSWER}
+        self.correct_codes = np.array(
+            [self._code(normalize_answer(q['correct_answer'])) for q in answer_key],
+            dtype=np.int32
+        )
+
+    def _code(self, answer: Optional[str]) -> int:
+        if answer is None:
+            return NO_ANSWER
+        code = self._codes.get(answer)
+        if code is None:
+            code = self._codes[answer] = len(self._codes)
+        return code
+
+    def encode(self, submissions: Sequence[Dict[str, str]]) -> np.ndarray:
+        """把答卷（题目ID → 作答）编码为 (答卷数, 题目数) 的整数矩阵"""
+        question_ids = self.question_ids
+        raw_codes = self._raw_codes
+        rows = []
+        for answers in submissions:
+            answers = answers or {}
+            row = []
+            for question_id in question_ids:
+                answer = answers.get(question_id)
+                code = raw_codes.get(answer)
+                if code is None:
+                    # 原始作答种类很少（通常就是几个选项字母），规范化结果按原值缓存
+                    code = raw_codes[answer] = self._codes.get(normalize_answer(answer), NO_ANSWER)
+                row.append(code)
+            rows.append(row)
+        return np.array(rows, dtype=np.int32).reshape(len(submissions), len(question_ids))
+
+    def grade(self, submissions: Sequence[Dict[str, str]]) -> GradeResult:
+        matrix = self.encode(submissions)
+        correctness = (matrix == self.correct_codes) & (matrix != NO_ANSWER)
+        raw_scores = correctness @ self.points
+        if self.total_points > 0:
+            scores = np.round(raw_scores / self.total_points * 100, 2)
+        else:
+            scores = np.zeros(len(submissions))
+        return GradeResult(
+            scores=scores,
+            raw_scores=raw_scores,
+            correct_counts=correctness.sum(axis=1),
+            correctness=correctness
+        )
+
+    def analytics_deltas(
+        self,
+        paper_id: str,
+        class_ids: Sequence[str],
+        submissions: Sequence[Dict[str, str]],
+        result: GradeResult,
+        include: Optional[Sequence[bool]] = None,
+        exam_tokens: Optional[Sequence[str]] = None
+    ) -> List[AnalyticsDelta]:
+        """
+        按班级汇总一批判分结果，用于累加逐题统计；include 为 False 的答卷不计入。
+        exam_tokens 与答卷一一对应，记录在增量中，同一份答卷重复累加时被跳过
+        """
+        class_ids = np.array([str(class_id) for class_id in class_ids], dtype=object)
+        mask = np.ones(len(class_ids), dtype=bool) if include is None else np.asarray(include, dtype=bool)
+
+        deltas = []
+        for class_id in sorted(set(class_ids[mask])):
+            rows = np.nonzero(mask & (class_ids == class_id))[0]
+            scores = result.scores[rows]
+            correctness = result.correctness[rows]
+            buckets = np.bincount(np.minimum(scores // 10, SCORE_BUCKETS - 1).astype(np.int64), minlength=SCORE_BUCKETS)
+
+            # 错误答案分布只能逐个统计，但只需遍历答错的格子
+            wrong_answers: Dict[str, Dict[str, int]] = {}
+            for row in rows:
+                answers = submissions[row] or {}
+                for column in np.nonzero(~result.correctness[row])[0]:
+                    question_id = self.question_ids[column]
+                    answer = normalize_answer(answers.get(question_id))
+                    if answer is None:
+                        continue
+                    histogram = wrong_answers.setdefault(question_id, {})
+                    answer = answer[:WRONG_ANSWER_MAX_LENGTH]
+                    histogram[answer] = histogram.get(answer, 0) + 1
+
+            deltas.append(AnalyticsDelta(
+                paper_id=str(paper_id),
+                class_id=class_id,
+                graded=len(rows),
+                score_sum=float(scores.sum()),
+                score_min=float(scores.min()),
+                score_max=float(scores.max()),
+                score_buckets=buckets.tolist(),
+                correct_counts=dict(zip(self.question_ids, correctness.sum(axis=0).tolist())),
+                wrong_answers=wrong_answers,
+                exam_tokens=[str(exam_tokens[row]) for row in rows] if exam_tokens is not None else []
+            ))
+        return deltas
+
+
+def grade_exam(repository, exam_id: str, paper_id: str, now: datetime) -> dict:
+    """
+    给一次考试中所有待判分的答卷判分并写回。
+    repository 为 ExamRepository；截止后仍未交卷的答卷按已保存的作答判分，并标记为已过期。
+    调用方负责提交事务。
+    """
+    submissions = repository.get_ungraded_submissions(exam_id, now)
+    if not submissions:
+        return {'graded': 0, 'average_score': None, 'overdue_tokens': [], 'analytics': []}
+
+    grader = BatchGrader(repository.get_answer_key(paper_id))
+    answers = [row['answers'] or {} for row in submissions]
+    result = grader.grade(answers)
+
+    rows = [
+        {
+            'id': row['id'],
+            'score': float(score),
+            'status': 'submitted' if row['status'] == 'submitted' else 'overdue'
+        }
+        for row, score in zip(submissions, result.scores)
+    ]
+    # 期间经交卷队列判分的答卷不会被覆盖，也不计入统计
+    updated = {str(row_id) for row_id in repository.bulk_update_scores(rows, now)}
+    include = [str(row['id']) in updated for row in submissions]
+    logger.info(f"考试 {exam_id} 判分完成: {len(updated)} 份答卷")
+    return {
+        'graded': len(updated),
+        'average_score': round(float(result.scores[include].mean()), 2) if updated else None,
+        # 这些 token 的状态变为已过期，调用方应使 ExamTokenCache 中的上下文失效
+        'overdue_tokens': [
+            row['exam_token'] for row, included in zip(submissions, include)
+            if included and row['status'] != 'submitted'
+        ],
+        # 调用方在提交事务后交给 ExamAnalytics.apply 累加
+        'analytics': grader.analytics_deltas(
+            paper_id, [row['class_id'] for row in submissions], answers, result,
+            include=include, exam_tokens=[row['exam_token'] for row in submissions]
+        )
+    }
+
+
+def grade_submissions(
+    repository,
+    submissions: List[dict],
+    now: datetime
+) -> Tuple[Dict[str, dict], List[AnalyticsDelta]]:
+    """
+    给一批交卷判分并写回，同一试卷的答卷一次判完。
+    submissions: [{'exam_token', 'answers', 'submitted_at', 'time_spent'}, ...]
+    返回 ({exam_token: {'status': 'graded', 'score', 'correct_count', 'total_count'}}, 统计增量)；
+    已过期或 token 无效的答卷返回 {'status': 'rejected'}，不计入统计；已交卷并判分的答卷返回已有得分，
+    统计增量按已保存的作答重新生成，已累加过的由 ExamAnalytics 按 exam_token 跳过。
+    调用方负责提交事务。
+    """
+    contexts = {
+        row['exam_token']: row
+        for row in repository.get_submission_contexts([s['exam_token'] for s in submissions])
+    }
+
+    by_paper: Dict[str, List[dict]] = {}
+    already_graded: Dict[str, float] = {}
+    retried_by_paper: Dict[str, List[dict]] = {}
+    for submission in submissions:
+        context = contexts.get(submission['exam_token'])
+        if context is None:
+            continue
+        if context['status'] == 'submitted' and context['score'] is not None:
+            # 上次处理已写库但未确认（如累加统计或更新状态时出错），重试时返回已有结果并补发统计增量
+            already_graded[submission['exam_token']] = float(context['score'])
+            retried_by_paper.setdefault(str(context['paper_id']), []).append({
+                'class_id': context['class_id'],
+                'exam_token': submission['exam_token'],
+                'answers': context['answers'] or {}
+            })
+            continue
+        if context['status'] not in ('pending', 'in_progress'):
+            continue
+        by_paper.setdefault(str(context['paper_id']), []).append({
+            'id': context['id'],
+            'class_id': context['class_id'],
+            'exam_token': submission['exam_token'],
+            'answers': {**(context['answers'] or {}), **submission['answers']},
+            'submitted_at': submission['submitted_at'],
+            'time_spent': submission.get('time_spent')
+        })
+
+    graders: Dict[str, BatchGrader] = {}
+
+    def get_grader(paper_id: str) -> BatchGrader:
+        if paper_id not in graders:
+            graders[paper_id] = BatchGrader(repository.get_answer_key(paper_id))
+        return graders[paper_id]
+
+    rows = []
+    graded_papers = []
+    for paper_id, paper_rows in by_paper.items():
+        grader = get_grader(paper_id)
+        result = grader.grade([row['answers'] for row in paper_rows])
+        graded_papers.append((paper_id, paper_rows, grader, result))
+        for row, score, correct_count in zip(paper_rows, result.scores, result.correct_counts):
+            row['score'] = float(score)
+            row['correct_count'] = int(correct_count)
+            row['total_count'] = len(grader.question_ids)
+            rows.append(row)
+
+    submitted = set(repository.bulk_submit(rows, now))
+    deltas = []
+    for paper_id, paper_rows, grader, result in graded_papers:
+        deltas.extend(grader.analytics_deltas(
+            paper_id,
+            [row['class_id'] for row in paper_rows],
+            [row['answers'] for row in paper_rows],
+            result,
+            include=[row['exam_token'] in submitted for row in paper_rows],
+            exam_tokens=[row['exam_token'] for row in paper_rows]
+        ))
+    for paper_id, paper_rows in retried_by_paper.items():
+        grader = get_grader(paper_id)
+        answers = [row['answers'] for row in paper_rows]
+        deltas.extend(grader.analytics_deltas(
+            paper_id,
+            [row['class_id'] for row in paper_rows],
+            answers,
+            grader.grade(answers),
+            exam_tokens=[row['exam_token'] for row in paper_rows]
+        ))
+
+    graded = {row['exam_token']: row for row in rows if row['exam_token'] in submitted}
+    results = {}
+    for submission in submissions:
+        row = graded.get(submission['exam_token'])
+        if submission['exam_token'] in already_graded:
+            results[submission['exam_token']] = {'status': 'graded', 'score': already_graded[submission['exam_token']]}
+        elif row is None:
+            results[submission['exam_token']] = {'status': 'rejected'}
+        else:
+            results[submission['exam_token']] = {
+                'status': 'graded',
+                'score': row['score'],
+                'correct_count': row['correct_count'],
+                'total_count': row['total_count']
+            }
+    return results, deltas
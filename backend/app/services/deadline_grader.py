@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, List, Optional
+import asyncio
+import logging
+
+if TYPE_CHECKING:
+    from backend.app.services.autosave_buffer import AutosaveBuffer
+    from backend.app.services.exam_analytics import ExamAnalytics
+    from backend.app.services.exam_token_cache import ExamTokenCache
+
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineGrader:
+    """
+    截止判分
+
+    定时查找截止时间已过（并过了交卷宽限期和等待队列处理完的时间）仍有待判分答卷的考试，
+    先把未交卷学生的自动保存缓冲写回数据库，再按已保存的作答调用 grade_exam 判分，
+    未交卷的答卷标记为已过期。提交后累加逐题统计，并使过期 token 的缓存上下文失效。
+    """
+
+    def __init__(
+        self,
+        find_due: Callable[[datetime], List[dict]],
+        grade: Callable[[str, str, datetime], dict],
+        autosave_buffer: Optional["AutosaveBuffer"] = None,
+        token_cache: Optional["ExamTokenCache"] = None,
+        analytics: Optional["ExamAnalytics"] = None,
+        delay: float = 180.0
+    ):
+        """
+        find_due(cutoff) 返回截止时间早于 cutoff 的待判分考试 [{'exam_id', 'paper_id', 'exam_tokens'}]，
+        exam_tokens 为未交卷的 token；grade(exam_id, paper_id, now) 判分并提交事务，返回 grade_exam 的结果。
+        两者在线程中执行。
+        """
+        self.find_due = find_due
+        self.grade = grade
+        self.autosave_buffer = autosave_buffer
+        self.token_cache = token_cache
+        self.analytics = analytics
+        self.delay = timedelta(seconds=delay)
+        self._task: Optional[asyncio.Task] = None
+
+    async def grade_exam(self, exam: dict, now: datetime) -> dict:
+        if self.autosave_buffer is not None and exam['exam_tokens']:
+            # 缓冲中的作答比数据库新，判分前先写回
+            await self.autosave_buffer.flush_tokens(exam['exam_tokens'])
+        summary = await asyncio.to_thread(self.grade, exam['exam_id'], exam['paper_id'], now)
+        if self.analytics is not None:
+            await self.analytics.apply(summary['analytics'])
+        if self.token_cache is not None:
+            await self.token_cache.invalidate(summary['overdue_tokens'])
+        return summary
+
+    async def run_once(self) -> int:
+        """给所有到期的考试判分，返回判分的答卷数"""
+        now = datetime.now()
+        graded = 0
+        for exam in await asyncio.to_thread(self.find_due, now - self.delay):
+            try:
+                graded += (await self.grade_exam(exam, now))['graded']
+            except Exception as e:
+                # 单场考试失败不影响其他考试，下一轮重试
+                logger.error(f"考试 {exam['exam_id']} 截止判分失败: {e!r}")
+        if graded:
+            logger.info(f"截止判分完成: {graded} 份答卷")
+        return graded
+
+    async def run_forever(self, interval: float) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"截止判分失败: {e!r}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float) -> asyncio.Task:
+        """在应用启动时调用，按固定间隔在后台判分"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever(interval))
+        return self._task
+
+    async def stop(self) -> None:
+        """在应用关闭时调用"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_deadline_grader: Optional[DeadlineGrader] = None
+
+
+def get_deadline_grader() -> DeadlineGrader:
+    """按配置创建截止判分任务，查询和判分使用独立的数据库会话"""
+    global _deadline_grader
+    if _deadline_grader is None:
+        from backend.app.core.config import settings
+        from backend.app.core.database import SessionLocal
+        from backend.app.repositories.exam_repository import ExamRepository
+        from backend.app.services.autosave_buffer import get_autosave_buffer
+        from backend.app.services.batch_grader import grade_exam
+        from backend.app.services.exam_analytics import get_exam_analytics
+        from backend.app.services.exam_token_cache import get_exam_token_cache
+
+        def find_due(cutoff: datetime) -> List[dict]:
+            db = SessionLocal()
+            try:
+                repository = ExamRepository(db)
+                exams = repository.get_due_exams(cutoff, settings.deadline_grading_batch_exams)
+                for exam in exams:
+                    exam['exam_tokens'] = repository.get_unsubmitted_tokens(exam['exam_id'])
+                return exams
+            finally:
+                db.close()
+
+        def grade(exam_id: str, paper_id: str, now: datetime) -> dict:
+            db = SessionLocal()
+            try:
+                summary = grade_exam(ExamRepository(db), exam_id, paper_id, now)
+                db.commit()
+                return summary
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        _deadline_grader = DeadlineGrader(
+            find_due,
+            grade,
+            autosave_buffer=get_autosave_buffer(),
+            token_cache=get_exam_token_cache(),
+            analytics=get_exam_analytics(),
+            delay=settings.submission_grace_seconds + settings.deadline_grading_delay_seconds
+        )
+    return _deadline_grader
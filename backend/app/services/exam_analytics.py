@@ -0,0 +1,282 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+import json
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+# 分数段：0-9, 10-19, ..., 90-100
+SCORE_BUCKETS = 10
+COMMON_WRONG_ANSWERS = 3
+# 填空等自由作答只保留前若干个字符计入错误答案分布
+WRONG_ANSWER_MAX_LENGTH = 32
+
+# 只累加到已初始化的统计上：统计在发布时初始化，Redis 数据丢失后由查询时的重建接管，
+# 避免从零开始的累加覆盖重建结果。
+# 增量带上所含答卷的 exam_token，已计入过的（判分提交后累加失败的重试、已被重建包含的）不再累加。
+# 每次累加递增版本号 v，供重建检测并发累加。返回1表示已累加
+APPLY_DELTA_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local token_count = tonumber(ARGV[4])
+for i = 5, 4 + token_count do
+    if redis.call('SISMEMBER', KEYS[2], ARGV[i]) == 1 then
+        return 0
+    end
+end
+for i = 5, 4 + token_count do
+    redis.call('SADD', KEYS[2], ARGV[i])
+end
+local score_min = redis.call('HGET', KEYS[1], 'min')
+if not score_min or tonumber(ARGV[1]) < tonumber(score_min) then
+    redis.call('HSET', KEYS[1], 'min', ARGV[1])
+end
+local score_max = redis.call('HGET', KEYS[1], 'max')
+if not score_max or tonumber(ARGV[2]) > tonumber(score_max) then
+    redis.call('HSET', KEYS[1], 'max', ARGV[2])
+end
+redis.call('HINCRBYFLOAT', KEYS[1], 'sum', ARGV[3])
+for i = 5 + token_count, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HINCRBY', KEYS[1], 'v', 1)
+return 1
+"""
+
+# 重建开始读取数据库之后若有增量累加（版本号变化），放弃替换由调用方重试，
+# 否则替换统计并把已计入的 token 换成重建包含的答卷。返回1表示已替换
+REPLACE_SCRIPT = """
+local version = redis.call('HGET', KEYS[1], 'v') or ''
+if version ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1], KEYS[2])
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HSET', KEYS[1], 'v', (tonumber(version) or 0) + 1)
+local tokens = cjson.decode(ARGV[2])
+for i = 1, #tokens, 1000 do
+    redis.call('SADD', KEYS[2], unpack(tokens, i, math.min(i + 999, #tokens)))
+end
+return 1
+"""
+
+
+@dataclass
+class AnalyticsDelta:
+    """一批判分结果对某个班级、某份试卷统计的增量"""
+    paper_id: str
+    class_id: str
+    graded: int
+    score_sum: float
+    score_min: float
+    score_max: float
+    score_buckets: List[int]
+    correct_counts: Dict[str, int]
+    wrong_answers: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # 计入该增量的答卷，用于去重
+    exam_tokens: List[str] = field(default_factory=list)
+
+    def counters(self) -> Dict[str, int]:
+        """展开为哈希字段的整数增量"""
+        counters = {'n': self.graded}
+        for bucket, count in enumerate(self.score_buckets):
+            if count:
+                counters[f"b:{bucket}"] = count
+        for question_id, count in self.correct_counts.items():
+            if count:
+                counters[f"q:{question_id}:c"] = count
+        for question_id, answers in self.wrong_answers.items():
+            for answer, count in answers.items():
+                counters[f"q:{question_id}:w:{answer}"] = count
+        return counters
+
+
+class ExamAnalytics:
+    """
+    逐题统计
+
+    每个（试卷, 班级）一个 Redis 哈希：已判分人数、分数总和/最高/最低、分数段人数、
+    每题答对人数和错误答案分布。每批判分后按增量累加，查询只读一个哈希，
+    耗时与学生人数无关，考试进行中也可以实时刷新。
+    统计在发布时初始化；Redis 数据丢失时由查询方从 student_exams 重建一次。
+    每个统计另有一个已计入答卷的集合，同一份答卷的增量只累加一次；
+    重建与并发的累加通过版本号协调，见 replace。
+    无Redis时退化为进程内字典，仅适用于开发环境。
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self._local: Dict[str, Dict[str, str]] = {}
+        self._local_applied: Dict[str, Set[str]] = {}
+        self._apply_delta = redis_client.register_script(APPLY_DELTA_SCRIPT) if redis_client else None
+        self._replace = redis_client.register_script(REPLACE_SCRIPT) if redis_client else None
+
+    @staticmethod
+    def _key(paper_id: str, class_id: str) -> str:
+        return f"analytics:{paper_id}:{class_id}"
+
+    @staticmethod
+    def _applied_key(paper_id: str, class_id: str) -> str:
+        return f"analytics:{paper_id}:{class_id}:applied"
+
+    async def initialize(self, paper_id: str, class_ids: Iterable[str], question_ids: List[str]) -> None:
+        """发布时调用：记录题目顺序，之后的判分增量才会被累加"""
+        questions = json.dumps([str(q) for q in question_ids])
+        if self.redis:
+            pipe = self.redis.pipeline(transaction=False)
+            for class_id in class_ids:
+                key = self._key(paper_id, class_id)
+                pipe.hsetnx(key, 'questions', questions)
+                pipe.hsetnx(key, 'n', 0)
+            await pipe.execute()
+        else:
+            for class_id in class_ids:
+                stats = self._local.setdefault(self._key(paper_id, class_id), {})
+                stats.setdefault('questions', questions)
+                stats.setdefault('n', '0')
+
+    async def apply(self, deltas: Iterable[AnalyticsDelta]) -> None:
+        deltas = [delta for delta in deltas if delta.graded]
+        if not deltas:
+            return
+        if self.redis:
+            for delta in deltas:
+                args = [delta.score_min, delta.score_max, delta.score_sum, len(delta.exam_tokens), *delta.exam_tokens]
+                for name, count in delta.counters().items():
+                    args.extend((name, count))
+                await self._apply_delta(
+                    keys=[self._key(delta.paper_id, delta.class_id), self._applied_key(delta.paper_id, delta.class_id)],
+                    args=args
+                )
+            return
+
+        for delta in deltas:
+            key = self._key(delta.paper_id, delta.class_id)
+            stats = self._local.get(key)
+            if stats is None:
+                continue
+            applied = self._local_applied.setdefault(key, set())
+            if applied.intersection(delta.exam_tokens):
+                continue
+            applied.update(delta.exam_tokens)
+            if 'min' not in stats or delta.score_min < float(stats['min']):
+                stats['min'] = str(delta.score_min)
+            if 'max' not in stats or delta.score_max > float(stats['max']):
+                stats['max'] = str(delta.score_max)
+            stats['sum'] = str(float(stats.get('sum', 0)) + delta.score_sum)
+            for name, count in delta.counters().items():
+                stats[name] = str(int(stats.get(name, 0)) + count)
+            stats['v'] = str(int(stats.get('v', 0)) + 1)
+
+    async def get_version(self, paper_id: str, class_id: str) -> str:
+        """统计的版本号，每次累加或替换后改变；重建前读取，传给 replace"""
+        key = self._key(paper_id, class_id)
+        if self.redis:
+            version = await self.redis.hget(key, 'v')
+            return version.decode() if version is not None else ''
+        return self._local.get(key, {}).get('v', '')
+
+    async def replace(
+        self,
+        paper_id: str,
+        class_id: str,
+        question_ids: List[str],
+        delta: Optional[AnalyticsDelta],
+        version: str
+    ) -> bool:
+        """
+        用从数据库重建的完整统计替换现有统计；delta 为 None 表示还没有已判分的答卷。
+        version 为开始读取数据库前的 get_version：期间有增量累加时不替换并返回 False，
+        由调用方重新读取；替换后重建已包含的答卷再到达的增量会被丢弃。
+        """
+        fields = {'questions': json.dumps([str(q) for q in question_ids]), 'n': '0'}
+        exam_tokens: List[str] = []
+        if delta is not None and delta.graded:
+            fields.update({'sum': str(delta.score_sum), 'min': str(delta.score_min), 'max': str(delta.score_max)})
+            fields.update({name: str(count) for name, count in delta.counters().items()})
+            exam_tokens = delta.exam_tokens
+        key = self._key(paper_id, class_id)
+        if self.redis:
+            args = [version, json.dumps(exam_tokens)]
+            for name, value in fields.items():
+                args.extend((name, value))
+            return bool(int(await self._replace(keys=[key, self._applied_key(paper_id, class_id)], args=args)))
+
+        current = self._local.get(key, {}).get('v', '')
+        if current != version:
+            return False
+        self._local[key] = {**fields, 'v': str(int(current or 0) + 1)}
+        self._local_applied[key] = set(exam_tokens)
+        return True
+
+    async def get_summary(self, paper_id: str, class_id: str) -> Optional[dict]:
+        """读取统计；尚未初始化（或 Redis 数据丢失）时返回 None"""
+        key = self._key(paper_id, class_id)
+        if self.redis:
+            raw = await self.redis.hgetall(key)
+            fields = {k.decode(): v.decode() for k, v in raw.items()}
+        else:
+            fields = dict(self._local.get(key, {}))
+        if 'questions' not in fields:
+            return None
+        return self._summarize(paper_id, class_id, fields)
+
+    @staticmethod
+    def _summarize(paper_id: str, class_id: str, fields: Dict[str, str]) -> dict:
+        graded = int(fields.get('n', 0))
+        correct_counts: Dict[str, int] = {}
+        wrong_answers: Dict[str, Dict[str, int]] = {}
+        buckets = [0] * SCORE_BUCKETS
+        for name, value in fields.items():
+            if name.startswith('q:'):
+                question_id, kind, *answer = name[2:].split(':', 2)
+                if kind == 'c':
+                    correct_counts[question_id] = int(value)
+                elif kind == 'w':
+                    wrong_answers.setdefault(question_id, {})[answer[0]] = int(value)
+            elif name.startswith('b:'):
+                buckets[int(name[2:])] = int(value)
+
+        questions = []
+        for question_id in json.loads(fields['questions']):
+            correct = correct_counts.get(question_id, 0)
+            wrong = wrong_answers.get(question_id, {})
+            common = sorted(wrong.items(), key=lambda item: -item[1])[:COMMON_WRONG_ANSWERS]
+            questions.append({
+                'question_id': question_id,
+                'correct_count': correct,
+                'wrong_count': graded - correct,
+                'unanswered_count': graded - correct - sum(wrong.values()),
+                'correct_rate': round(correct / graded * 100, 2) if graded else 0.0,
+                'common_wrong_answers': [{'answer': answer, 'count': count} for answer, count in common]
+            })
+
+        return {
+            'paper_id': paper_id,
+            'class_id': class_id,
+            'graded_count': graded,
+            'average_score': round(float(fields.get('sum', 0)) / graded, 2) if graded else None,
+            'max_score': float(fields['max']) if graded and 'max' in fields else None,
+            'min_score': float(fields['min']) if graded and 'min' in fields else None,
+            'score_distribution': [
+                {'range': f"{i * 10}-{i * 10 + 9 if i < SCORE_BUCKETS - 1 else 100}", 'count': count}
+                for i, count in enumerate(buckets)
+            ],
+            'questions': questions
+        }
+
+
+_exam_analytics: Optional[ExamAnalytics] = None
+
+
+def get_exam_analytics() -> ExamAnalytics:
+    global _exam_analytics
+    if _exam_analytics is None:
+        from backend.app.core.redis import get_redis
+
+        _exam_analytics = ExamAnalytics(redis_client=get_redis())
+    return _exam_analytics
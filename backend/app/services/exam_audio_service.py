@@ -0,0 +1,116 @@
+from typing import Dict, List, Optional, Set
+import asyncio
+import json
+import logging
+
+from backend.app.core.redis import get_redis
+from backend.app.services.audio_service import AudioService, get_audio_service
+from backend.app.services.audio_transcoder import COMPACT_RENDITION
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExamAudioService:
+    """
+    试卷音频清单
+
+    发布试卷时按题目顺序生成一次（实际分发文件的地址、大小、哈希和时长），
+    学生端首屏随试卷下发，用于预取；同时在后台把这些音频预热到热点缓存，不阻塞发布请求。
+    """
+
+    def __init__(self, audio_service: AudioService, redis_client=None, warm_concurrency: int = 4):
+        self.audio_service = audio_service
+        self.redis = redis_client
+        self.warm_concurrency = warm_concurrency
+        self._local: Dict[str, str] = {}
+        # 持有后台预热任务的引用，避免任务在完成前被垃圾回收
+        self._warming: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _cache_key(paper_id: str) -> str:
+        return f"paper:{paper_id}:audio"
+
+    async def build_manifest(self, paper_id: str, questions: List[dict]) -> dict:
+        """根据有序题目列表生成并保存试卷音频清单"""
+        files = []
+        seen = set()
+        for question in questions:
+            file_id = question.get('audio_file_id')
+            if not file_id or file_id in seen:
+                continue
+            seen.add(file_id)
+
+            entry = await self.audio_service.manifest.get(file_id)
+            if entry is None:
+                logger.warning(f"试卷 {paper_id} 的题目 {question['id']} 引用了不存在的音频 {file_id}")
+                continue
+
+            url = f"/api/audio/{file_id}{entry['extension']}"
+            served = entry.get('renditions', {}).get(COMPACT_RENDITION)
+            if served is None or 'sha256' not in served:
+                # 没有 compact 版本（或旧版本未记录哈希）时清单指向原文件，原文件的哈希即 file_id
+                served = {'size': entry['size'], 'sha256': file_id}
+                url += "?rendition=original"
+            files.append({
+                'file_id': file_id,
+                'question_id': str(question['id']),
+                'url': url,
+                'size': served['size'],
+                'sha256': served['sha256'],
+                'duration': entry.get('duration')
+            })
+
+        manifest = {
+            'paper_id': str(paper_id),
+            'total_bytes': sum(f['size'] for f in files),
+            'files': files
+        }
+
+        raw = json.dumps(manifest)
+        if self.redis:
+            await self.redis.set(self._cache_key(paper_id), raw)
+        else:
+            self._local[self._cache_key(paper_id)] = raw
+
+        self._schedule_warm(seen)
+        return manifest
+
+    def _schedule_warm(self, file_ids: Set[str]) -> None:
+        if self.audio_service.cache is None or not file_ids:
+            return
+        task = asyncio.create_task(self.audio_service.warm_cache(file_ids, self.warm_concurrency))
+        self._warming.add(task)
+        task.add_done_callback(self._on_warmed)
+
+    def _on_warmed(self, task: asyncio.Task) -> None:
+        self._warming.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"音频缓存预热异常退出: {task.exception()!r}")
+
+    async def wait_warming(self) -> None:
+        """等待进行中的预热完成，供测试和关闭时使用"""
+        await asyncio.gather(*self._warming, return_exceptions=True)
+
+    async def get_manifest(self, paper_id: str) -> Optional[dict]:
+        if self.redis:
+            raw = await self.redis.get(self._cache_key(paper_id))
+        else:
+            raw = self._local.get(self._cache_key(paper_id))
+        return json.loads(raw) if raw else None
+
+
+_exam_audio_service: Optional[ExamAudioService] = None
+
+
+def get_exam_audio_service() -> ExamAudioService:
+    global _exam_audio_service
+    if _exam_audio_service is None:
+        from backend.app.core.config import settings
+
+        _exam_audio_service = ExamAudioService(
+            get_audio_service(),
+            redis_client=get_redis(),
+            warm_concurrency=settings.audio_cache_warm_concurrency
+        )
+    return _exam_audio_service
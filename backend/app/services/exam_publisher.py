@@ -0,0 +1,168 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional
+import asyncio
+import base64
+import io
+import logging
+import secrets
+
+
+logger = logging.getLogger(__name__)
+
+
+def generate_tokens(count: int) -> List[str]:
+    """一次生成一批答题 token；256 位随机数，实际不会碰撞，仍由唯一索引兜底"""
+    return [secrets.token_urlsafe(32) for _ in range(count)]
+
+
+def normalize_deadline(deadline: datetime) -> datetime:
+    """
+    带时区的截止时间（如 ISO 字符串带 Z 或偏移）转为本地时间并去掉时区，
+    与数据库 TIMESTAMP 和 datetime.now() 的形式一致，缓存的上下文才能直接比较
+    """
+    if deadline.tzinfo is None:
+        return deadline
+    return deadline.astimezone().replace(tzinfo=None)
+
+
+def render_qr_code(url: str) -> str:
+    """生成答题链接二维码（PNG，base64编码）"""
+    import qrcode
+
+    image = qrcode.make(url)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def render_qr_batch(urls: List[str]) -> List[str]:
+    """在子进程中渲染一批二维码，按批提交以摊薄进程间传输开销"""
+    return [render_qr_code(url) for url in urls]
+
+
+class QrCodeRenderer:
+    """
+    二维码渲染进程池
+
+    二维码编码和 PNG 压缩是纯 CPU 计算，放在进程池中并行，不占用事件循环和 GIL。
+    按批提交，结果按提交顺序返回，渲染与响应的流式输出同时进行。
+    max_workers 为0时在线程中渲染，用于开发和测试环境。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        chunk_size: int = 32,
+        render_batch: Callable[[List[str]], List[str]] = render_qr_batch
+    ):
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.render_batch = render_batch
+        self._pool: Optional[Executor] = None
+
+    def _executor(self) -> Optional[Executor]:
+        if self._pool is None and self.max_workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    async def render_chunks(self, urls: List[str]) -> AsyncIterator[List[str]]:
+        """按顺序逐批产出二维码；所有批次先提交，进程池满负荷运行"""
+        loop = asyncio.get_running_loop()
+        executor = self._executor()
+        futures = [
+            loop.run_in_executor(executor, self.render_batch, urls[start:start + self.chunk_size])
+            for start in range(0, len(urls), self.chunk_size)
+        ]
+        try:
+            for future in futures:
+                yield await future
+        finally:
+            # 客户端中途断开时取消尚未开始的批次
+            for future in futures:
+                future.cancel()
+
+    async def render(self, urls: List[str]) -> List[str]:
+        qr_codes = []
+        async for chunk in self.render_chunks(urls):
+            qr_codes.extend(chunk)
+        return qr_codes
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+@dataclass
+class PublishedExams:
+    """一次发布的结果：每个班级一场考试，每个学生一个答题链接"""
+    exam_ids: Dict[str, str]
+    links: List[dict] = field(default_factory=list)
+    token_contexts: Dict[str, dict] = field(default_factory=dict)
+
+
+def create_exams(
+    repository,
+    paper: dict,
+    class_ids: List[str],
+    deadline: datetime,
+    duration: Optional[int],
+    name: Optional[str],
+    created_by: str,
+    exam_base_url: str
+) -> PublishedExams:
+    """
+    在同一事务中为多个班级创建考试和答题记录：一次查出所有学生，一次生成全部 token，
+    考试和答题记录各用多行 INSERT 写入。repository 为 ExamRepository，调用方负责提交事务。
+    """
+    paper_id = str(paper['id'])
+    deadline = normalize_deadline(deadline)
+    students = repository.get_students_by_classes(class_ids)
+    exam_ids = repository.create_exams(paper_id, class_ids, name or paper['name'], deadline, duration, created_by)
+    tokens = generate_tokens(len(students))
+
+    rows = [
+        {'exam_id': exam_ids[str(student['class_id'])], 'student_id': student['id'], 'exam_token': exam_token}
+        for student, exam_token in zip(students, tokens)
+    ]
+    student_exam_ids = repository.bulk_create_student_exams(rows)
+    repository.mark_paper_published(paper_id)
+
+    published = PublishedExams(exam_ids)
+    for student, exam_token in zip(students, tokens):
+        class_id = str(student['class_id'])
+        published.links.append({
+            'class_id': class_id,
+            'exam_id': exam_ids[class_id],
+            'student_id': str(student['id']),
+            'exam_url': f"{exam_base_url}/exam/{exam_token}"
+        })
+        published.token_contexts[exam_token] = {
+            'student_exam_id': student_exam_ids[exam_token],
+            'exam_id': exam_ids[class_id],
+            'student_id': student['id'],
+            'student_name': student['name'],
+            'paper_id': paper_id,
+            'class_id': class_id,
+            'deadline': deadline,
+            'duration': duration,
+            'status': 'pending'
+        }
+    return published
+
+
+_qr_code_renderer: Optional[QrCodeRenderer] = None
+
+
+def get_qr_code_renderer() -> QrCodeRenderer:
+    global _qr_code_renderer
+    if _qr_code_renderer is None:
+        from backend.app.core.config import settings
+
+        _qr_code_renderer = QrCodeRenderer(
+            max_workers=settings.publish_qr_workers,
+            chunk_size=settings.publish_qr_chunk_size
+        )
+    return _qr_code_renderer
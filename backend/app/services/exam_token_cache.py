@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import json
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# 缓存的上下文字段，均在发布后不变，只有 status 会在交卷、过期时改变
+CONTEXT_FIELDS = (
+    'student_exam_id', 'exam_id', 'student_id', 'student_name',
+    'paper_id', 'class_id', 'deadline', 'duration', 'status'
+)
+# 考试截止后缓存再保留一段时间，供学生查看结果
+TOKEN_INDEX_GRACE = timedelta(days=1)
+
+
+class ExamTokenCache:
+    """
+    答题 token 上下文缓存
+
+    把 exam_token 解析为学生、考试、试卷、截止时间和状态。发布时写入，交卷或过期时失效，
+    开考后试卷、自动保存、交卷请求都不再查询 student_exams。
+    两级缓存：进程内 LRU 在前，Redis 在后，Redis 中的条目在截止时间之后自动过期。
+    其他 worker 引起的状态变化只会让进程内条目在 local_ttl 秒内滞后，
+    交卷队列和写回 SQL 仍会按数据库中的状态把关。无Redis时只使用进程内缓存。
+    """
+
+    def __init__(self, redis_client=None, memory_items: int = 20000, local_ttl: float = 5.0):
+        self.redis = redis_client
+        self.memory_items = memory_items
+        self.local_ttl = local_ttl
+        self._memory: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+
+    @staticmethod
+    def _key(exam_token: str) -> str:
+        return f"exam_token:{exam_token}"
+
+    @staticmethod
+    def _compact(context: dict) -> dict:
+        compact = {field: context.get(field) for field in CONTEXT_FIELDS}
+        for field in ('student_exam_id', 'exam_id', 'student_id', 'paper_id', 'class_id'):
+            if compact[field] is not None:
+                compact[field] = str(compact[field])
+        return compact
+
+    @staticmethod
+    def _encode(context: dict) -> str:
+        return json.dumps({**context, 'deadline': context['deadline'].isoformat()}, ensure_ascii=False)
+
+    @staticmethod
+    def _decode(raw: bytes) -> dict:
+        context = json.loads(raw)
+        context['deadline'] = datetime.fromisoformat(context['deadline'])
+        return context
+
+    def _remember(self, exam_token: str, context: dict) -> None:
+        # 无Redis时进程内缓存是唯一一级，条目一直有效直到失效或被淘汰
+        expires_at = time.monotonic() + self.local_ttl if self.redis else float('inf')
+        self._memory[exam_token] = (expires_at, context)
+        self._memory.move_to_end(exam_token)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    async def get(self, exam_token: str, loader: Callable[[], Optional[dict]]) -> Optional[dict]:
+        """返回 token 上下文；两级缓存都未命中时调用 loader 查库并回填，token 无效返回 None"""
+        cached = self._memory.get(exam_token)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                self._memory.move_to_end(exam_token)
+                return cached[1]
+            del self._memory[exam_token]
+
+        if self.redis:
+            raw = await self.redis.get(self._key(exam_token))
+            if raw is not None:
+                context = self._decode(raw)
+                self._remember(exam_token, context)
+                return context
+
+        context = loader()
+        if context is None:
+            return None
+        context = self._compact(context)
+        await self._store({exam_token: context})
+        return context
+
+    async def put_many(self, contexts: Dict[str, dict]) -> None:
+        """写入一批 token 上下文，发布时调用"""
+        await self._store({exam_token: self._compact(context) for exam_token, context in contexts.items()})
+
+    async def _store(self, contexts: Dict[str, dict]) -> None:
+        if self.redis and contexts:
+            pipe = self.redis.pipeline(transaction=False)
+            for exam_token, context in contexts.items():
+                expire_at = int((context['deadline'] + TOKEN_INDEX_GRACE).timestamp())
+                pipe.set(self._key(exam_token), self._encode(context), exat=expire_at)
+            await pipe.execute()
+        for exam_token, context in contexts.items():
+            self._remember(exam_token, context)
+
+    async def invalidate(self, exam_tokens: Iterable[str]) -> None:
+        """状态变化（交卷、过期）后调用，下次访问重新查库"""
+        exam_tokens = list(exam_tokens)
+        if not exam_tokens:
+            return
+        for exam_token in exam_tokens:
+            self._memory.pop(exam_token, None)
+        if self.redis:
+            await self.redis.delete(*[self._key(exam_token) for exam_token in exam_tokens])
+
+
+_exam_token_cache: Optional[ExamTokenCache] = None
+
+
+def get_exam_token_cache() -> ExamTokenCache:
+    global _exam_token_cache
+    if _exam_token_cache is None:
+        from backend.app.core.config import settings
+        from backend.app.core.redis import get_redis
+
+        _exam_token_cache = ExamTokenCache(
+            redis_client=get_redis(),
+            memory_items=settings.exam_token_cache_items,
+            local_ttl=settings.exam_token_local_ttl_seconds
+        )
+    return _exam_token_cache
@@ -7,6 +7,12 @@ import json
 from datetime import datetime, timedelta
 from typing import TYPE_CHECKING
 
+from backend.app.core.metrics import CACHE_REQUESTS_TOTAL
+
+
+_PAPER_CACHE_HIT = CACHE_REQUESTS_TOTAL.labels("paper", "hit")
+_PAPER_CACHE_MISS = CACHE_REQUESTS_TOTAL.labels("paper", "miss")
+
 
 class QuestionType(str, Enum):
     SINGLE_CHOICE = "single_choice"
@@ -78,8 +84,10 @@ class PaperGenerator:
         cache_key = f"paper:{config_hash}"
         cached_result = await self.redis.get(cache_key)
         if cached_result:
+            _PAPER_CACHE_HIT.inc()
             question_dicts = json.loads(cached_result)
             return [Question(**qd) for qd in question_dicts]
+        _PAPER_CACHE_MISS.inc()
         return None
 
     async def cache_paper(self, config_hash: str, questions: List[Question], ttl: int = 3600):
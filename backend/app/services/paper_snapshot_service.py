@@ -0,0 +1,217 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+import time
+
+from backend.app.core.json_codec import dumps
+
+if TYPE_CHECKING:
+    from backend.app.services.exam_audio_service import ExamAudioService
+
+
+logger = logging.getLogger(__name__)
+
+# 快照只包含这些题目字段，正确答案等字段不会进入学生端
+SNAPSHOT_QUESTION_FIELDS = ('id', 'type', 'content', 'options', 'audio_file_id', 'reading_material', 'score')
+
+
+@dataclass(frozen=True)
+class PaperSnapshot:
+    body: bytes
+    gzip_body: bytes
+    etag: str
+
+    @property
+    def gzip_etag(self) -> str:
+        # 压缩后的表示字节不同，强 ETag 必须不同
+        return self.etag[:-1] + '-gz"'
+
+
+class PaperSnapshotService:
+    """
+    试卷快照
+
+    发布时为每份试卷渲染一次学生端首屏数据（题目去掉答案 + 音频清单），
+    预先序列化并以 gzip 压缩。开考时所有学生的请求
+    只需按 token 找到试卷ID，再原样返回快照字节，不再查询题目。
+    有Redis时存放在哈希中，否则写入本地目录；进程内再缓存最近用到的若干份，
+    最多 memory_ttl 秒后重新读取，其他 worker 修改题目后重建的快照随之生效。
+    """
+
+    def __init__(
+        self,
+        exam_audio_service: "ExamAudioService",
+        redis_client=None,
+        snapshot_dir: str = "./cache/papers",
+        memory_items: int = 32,
+        memory_ttl: float = 5.0
+    ):
+        self.exam_audio_service = exam_audio_service
+        self.redis = redis_client
+        self.snapshot_dir = snapshot_dir
+        self.memory_items = memory_items
+        self.memory_ttl = memory_ttl
+        self._memory: "OrderedDict[str, Tuple[PaperSnapshot, float]]" = OrderedDict()
+
+    @staticmethod
+    def _snapshot_key(paper_id: str) -> str:
+        return f"paper:{paper_id}:snapshot"
+
+    @staticmethod
+    def render(paper_id: str, questions: List[dict], audio_manifest: dict) -> PaperSnapshot:
+        """渲染快照：固定字段顺序、gzip 头不含时间戳，同一试卷总是得到相同字节"""
+        body = dumps({
+            "paper_id": str(paper_id),
+            "questions": [
+                {**{field: question.get(field) for field in SNAPSHOT_QUESTION_FIELDS}, "id": str(question['id'])}
+                for question in questions
+            ],
+            "audio_manifest": audio_manifest
+        })
+        gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        return PaperSnapshot(body, gzip_body, etag)
+
+    async def build_snapshot(self, paper_id: str, questions: List[dict]) -> PaperSnapshot:
+        """生成并保存试卷快照；已存在时直接返回（试卷发布后内容冻结）"""
+        existing = await self.get_snapshot(paper_id)
+        if existing is not None:
+            return existing
+
+        audio_manifest = await self.exam_audio_service.get_manifest(paper_id)
+        if audio_manifest is None:
+            audio_manifest = await self.exam_audio_service.build_manifest(paper_id, questions)
+        return await self._save(paper_id, questions, audio_manifest)
+
+    async def rebuild_snapshot(self, paper_id: str, questions: List[dict]) -> PaperSnapshot:
+        """已发布试卷中的题目被修改后，重新生成音频清单和快照"""
+        audio_manifest = await self.exam_audio_service.build_manifest(paper_id, questions)
+        return await self._save(paper_id, questions, audio_manifest)
+
+    async def rebuild_published(self, paper_ids: List[str], load_questions: Callable[[str], List[dict]]) -> int:
+        """
+        重建其中已发布（已有快照）试卷的音频清单和快照，返回重建的试卷数。
+        音频生成 compact 版本后调用，发布时尚未转码完成的试卷改为分发转码后的小文件；
+        load_questions(paper_id) 在线程中执行
+        """
+        rebuilt = 0
+        for paper_id in paper_ids:
+            if await self.get_snapshot(paper_id) is None:
+                continue
+            try:
+                questions = await asyncio.to_thread(load_questions, paper_id)
+                await self.rebuild_snapshot(paper_id, questions)
+                rebuilt += 1
+            except Exception as e:
+                logger.error(f"重建试卷 {paper_id} 快照失败: {e!r}")
+        return rebuilt
+
+    async def _save(self, paper_id: str, questions: List[dict], audio_manifest: dict) -> PaperSnapshot:
+        snapshot = self.render(paper_id, questions, audio_manifest)
+        if self.redis:
+            await self.redis.hset(self._snapshot_key(paper_id), mapping={
+                'json': snapshot.body,
+                'gzip': snapshot.gzip_body,
+                'etag': snapshot.etag
+            })
+        else:
+            self._write_to_disk(str(paper_id), snapshot)
+
+        self._remember(str(paper_id), snapshot)
+        logger.info(f"试卷 {paper_id} 快照已生成: {len(snapshot.body)} 字节，压缩后 {len(snapshot.gzip_body)} 字节")
+        return snapshot
+
+    async def get_snapshot(self, paper_id: str) -> Optional[PaperSnapshot]:
+        paper_id = str(paper_id)
+        cached = self._memory.get(paper_id)
+        if cached is not None and cached[1] > time.monotonic():
+            self._memory.move_to_end(paper_id)
+            return cached[0]
+
+        if self.redis:
+            stored = await self.redis.hgetall(self._snapshot_key(paper_id))
+            if not stored:
+                return None
+            snapshot = PaperSnapshot(stored[b'json'], stored[b'gzip'], stored[b'etag'].decode())
+        else:
+            snapshot = self._read_from_disk(paper_id)
+            if snapshot is None:
+                return None
+
+        self._remember(paper_id, snapshot)
+        return snapshot
+
+    def _remember(self, paper_id: str, snapshot: PaperSnapshot) -> None:
+        self._memory[paper_id] = (snapshot, time.monotonic() + self.memory_ttl)
+        self._memory.move_to_end(paper_id)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, paper_id: str, suffix: str) -> str:
+        return os.path.join(self.snapshot_dir, f"{paper_id}{suffix}")
+
+    def _write_to_disk(self, paper_id: str, snapshot: PaperSnapshot) -> None:
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        for suffix, data in (('.json', snapshot.body), ('.json.gz', snapshot.gzip_body)):
+            temp_path = self._disk_path(paper_id, suffix + '.part')
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._disk_path(paper_id, suffix))
+
+    def _read_from_disk(self, paper_id: str) -> Optional[PaperSnapshot]:
+        try:
+            with open(self._disk_path(paper_id, '.json'), 'rb') as f:
+                body = f.read()
+            with open(self._disk_path(paper_id, '.json.gz'), 'rb') as f:
+                gzip_body = f.read()
+        except FileNotFoundError:
+            return None
+        return PaperSnapshot(body, gzip_body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+_paper_snapshot_service: Optional[PaperSnapshotService] = None
+
+
+def get_paper_snapshot_service() -> PaperSnapshotService:
+    global _paper_snapshot_service
+    if _paper_snapshot_service is None:
+        from backend.app.core.config import settings
+        from backend.app.core.redis import get_redis
+        from backend.app.services.exam_audio_service import get_exam_audio_service
+
+        _paper_snapshot_service = PaperSnapshotService(
+            get_exam_audio_service(),
+            redis_client=get_redis(),
+            snapshot_dir=settings.paper_snapshot_dir,
+            memory_items=settings.paper_snapshot_memory_items,
+            memory_ttl=settings.paper_snapshot_local_ttl_seconds
+        )
+    return _paper_snapshot_service
+
+
+async def rebuild_audio_papers(file_id: str) -> int:
+    """音频的 compact 版本生成后，重建引用该音频的已发布试卷，由 AudioTranscoder 回调"""
+    from backend.app.core.database import SessionLocal
+    from backend.app.repositories.exam_repository import ExamRepository
+
+    def find_papers() -> List[str]:
+        db = SessionLocal()
+        try:
+            return ExamRepository(db).get_audio_paper_ids(file_id)
+        finally:
+            db.close()
+
+    def load_questions(paper_id: str) -> List[dict]:
+        db = SessionLocal()
+        try:
+            return ExamRepository(db).get_paper_questions(paper_id)
+        finally:
+            db.close()
+
+    paper_ids = await asyncio.to_thread(find_papers)
+    return await get_paper_snapshot_service().rebuild_published(paper_ids, load_questions)
@@ -96,17 +96,7 @@ class QuestionService:
         if question.created_by != current_user.id and current_user.role != "admin":
             raise UnauthorizedAction("删除题目")
 
-        # 删除音频文件
-        if question.audio_file_id:
-            try:
-                import asyncio
-                # 使用事件循环运行异步删除
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(self.audio_service.delete_audio(question.audio_file_id))
-                loop.close()
-            except Exception as e:
-                logger.error(f"删除音频文件失败: {e}")
+        # 音频按内容去重，可能被其他题目共用，由孤立音频回收器在无引用后删除
 
         # 删除题目
         success = self.repository.delete(question_id)
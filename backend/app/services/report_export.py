@@ -0,0 +1,305 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+from openpyxl import Workbook
+
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+RESULT_HEADER = ["学号", "姓名", "状态", "得分", "用时（秒）", "交卷时间"]
+STATUS_LABELS = {"pending": "未开始", "in_progress": "答题中", "submitted": "已交卷", "overdue": "已过期"}
+CORRECT_MARK = "✓"
+WRONG_MARK = "✗"
+
+
+def report_filename(class_id: str, paper_id: str, created_at: datetime, job_id: str) -> str:
+    """
+    按设计文档的存储布局 {class_id}_{paper_id}_{timestamp}.xlsx，时间戳后加任务ID前8位，
+    同一秒内对同一班级试卷的多次导出不会写到同一个文件（及其 .part 临时文件）
+    """
+    return f"{class_id}_{paper_id}_{created_at:%Y%m%d%H%M%S}_{job_id[:8]}.xlsx"
+
+
+def write_report(
+    path: str,
+    answer_key: List[dict],
+    results: Iterable[dict],
+    analysis: Optional[dict] = None,
+    progress: Optional[Callable[[int], None]] = None,
+    progress_every: int = 200
+) -> int:
+    """
+    以只写模式流式写出成绩报表，内存占用与学生人数无关。
+    results 逐行产出 {student_number, name, status, score, time_spent, submitted_at, answers}；
+    同时写“成绩”和“答题明细”两张表，analysis 不为空时追加“逐题分析”表。
+    先写入 path + ".part"，完成后再改名，下载方不会读到写了一半的文件。返回写出的学生数。
+    """
+    from backend.app.services.batch_grader import normalize_answer
+
+    workbook = Workbook(write_only=True)
+    result_sheet = workbook.create_sheet("成绩")
+    detail_sheet = workbook.create_sheet("答题明细")
+    result_sheet.append(RESULT_HEADER)
+
+    question_ids = [str(q['id']) for q in answer_key]
+    correct_answers = [normalize_answer(q['correct_answer']) for q in answer_key]
+    detail_sheet.append(["学号", "姓名"] + [f"第{i}题" for i in range(1, len(question_ids) + 1)] + ["答对题数"])
+    detail_sheet.append(["", "正确答案"] + [q['correct_answer'] for q in answer_key] + [""])
+
+    written = 0
+    for row in results:
+        result_sheet.append([
+            row['student_number'],
+            row['name'],
+            STATUS_LABELS.get(row['status'], row['status']),
+            float(row['score']) if row['score'] is not None else None,
+            row['time_spent'],
+            row['submitted_at']
+        ])
+
+        answers = row['answers'] or {}
+        cells = []
+        correct_count = 0
+        for question_id, correct in zip(question_ids, correct_answers):
+            answer = answers.get(question_id)
+            if answer is None:
+                cells.append("")
+            elif normalize_answer(answer) == correct:
+                correct_count += 1
+                cells.append(f"{answer} {CORRECT_MARK}")
+            else:
+                cells.append(f"{answer} {WRONG_MARK}")
+        detail_sheet.append([row['student_number'], row['name']] + cells + [correct_count])
+
+        written += 1
+        if progress is not None and written % progress_every == 0:
+            progress(written)
+
+    if analysis is not None:
+        analysis_sheet = workbook.create_sheet("逐题分析")
+        analysis_sheet.append(["题号", "答对人数", "答错人数", "未作答", "正确率（%）", "常见错误答案"])
+        for number, question in enumerate(analysis['questions'], 1):
+            analysis_sheet.append([
+                number,
+                question['correct_count'],
+                question['wrong_count'],
+                question['unanswered_count'],
+                question['correct_rate'],
+                "，".join(f"{a['answer']}（{a['count']}人）" for a in question['common_wrong_answers'])
+            ])
+
+    temp_path = path + ".part"
+    workbook.save(temp_path)
+    os.replace(temp_path, path)
+    return written
+
+
+class ReportExportService:
+    """
+    成绩报表导出
+
+    导出作为后台任务在专用线程池中执行：逐批读取答卷、以只写模式流式写入 XLSX，
+    直接落到报表目录，请求只负责创建任务并立即返回任务ID。任务进度写入 Redis，
+    客户端轮询进度，完成后下载（可交给 nginx 内部 location 发送文件）。
+    任务状态过期（job_ttl）后报表无法再下载，由后台清理删除。
+    无Redis时任务状态保存在进程内，仅适用于开发环境。
+    """
+
+    def __init__(
+        self,
+        export_dir: str,
+        build_report: Callable[[str, str, str, Optional[dict], Callable[[int], None]], int],
+        redis_client=None,
+        max_workers: int = 2,
+        job_ttl: int = 24 * 3600
+    ):
+        """build_report(path, paper_id, class_id, analysis, progress) 在线程中写出报表，返回写出的学生数"""
+        self.export_dir = export_dir
+        self.build_report = build_report
+        self.redis = redis_client
+        self.job_ttl = job_ttl
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-export')
+        self._local_jobs: Dict[str, Dict[str, str]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"report_export:{job_id}"
+
+    async def _update(self, job_id: str, **fields) -> None:
+        fields = {name: str(value) for name, value in fields.items()}
+        if self.redis:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(self._key(job_id), mapping=fields)
+            pipe.expire(self._key(job_id), self.job_ttl)
+            await pipe.execute()
+        else:
+            self._local_jobs.setdefault(job_id, {}).update(fields)
+
+    async def get_job(self, job_id: str) -> Optional[dict]:
+        if self.redis:
+            raw = await self.redis.hgetall(self._key(job_id))
+            fields = {k.decode(): v.decode() for k, v in raw.items()}
+        else:
+            fields = dict(self._local_jobs.get(job_id, {}))
+        if not fields:
+            return None
+        total = int(fields.get('total', 0))
+        written = int(fields.get('written', 0))
+        return {
+            'job_id': job_id,
+            'paper_id': fields['paper_id'],
+            'class_id': fields['class_id'],
+            'status': fields['status'],
+            'total': total,
+            'written': written,
+            'progress': 100 if fields['status'] == STATUS_DONE else (round(written / total * 100) if total else 0),
+            'filename': fields['filename'],
+            'error': fields.get('error') or None
+        }
+
+    def report_path(self, filename: str) -> str:
+        return os.path.join(self.export_dir, filename)
+
+    async def start(self, paper_id: str, class_id: str, total: int, analysis: Optional[dict] = None) -> dict:
+        """创建导出任务并在后台执行；total 为预计的学生数，用于计算进度"""
+        job_id = uuid.uuid4().hex
+        filename = report_filename(class_id, paper_id, datetime.now(), job_id)
+        await self._update(
+            job_id, paper_id=paper_id, class_id=class_id, status=STATUS_PENDING,
+            total=total, written=0, filename=filename, error=""
+        )
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id, paper_id, class_id, filename, analysis))
+        return await self.get_job(job_id)
+
+    async def _run(self, job_id: str, paper_id: str, class_id: str, filename: str, analysis: Optional[dict]) -> None:
+        loop = asyncio.get_running_loop()
+        updates = []
+
+        def progress(written: int) -> None:
+            # 在导出线程中调用，把进度交回事件循环写入
+            updates.append(asyncio.run_coroutine_threadsafe(self._update(job_id, written=written), loop))
+
+        try:
+            await self._update(job_id, status=STATUS_RUNNING)
+            os.makedirs(self.export_dir, exist_ok=True)
+            written = await loop.run_in_executor(
+                self._pool, self.build_report, self.report_path(filename), paper_id, class_id, analysis, progress
+            )
+            # 先等中途的进度写完，避免覆盖最终结果
+            await asyncio.gather(*[asyncio.wrap_future(update) for update in updates], return_exceptions=True)
+            await self._update(job_id, status=STATUS_DONE, written=written)
+            logger.info(f"报表导出完成: {filename}，{written} 名学生")
+        except Exception as e:
+            logger.error(f"报表导出失败: {filename}: {e!r}")
+            await self._update(job_id, status=STATUS_FAILED, error="导出失败，请重试")
+        finally:
+            self._tasks.pop(job_id, None)
+
+    async def wait(self, job_id: str) -> None:
+        """等待任务结束，供测试和关闭时使用"""
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await task
+
+    def _remove_expired(self, cutoff: float) -> int:
+        removed = 0
+        try:
+            entries = list(os.scandir(self.export_dir))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            # 包括异常退出时残留的 .part 文件
+            if not entry.is_file() or not entry.name.endswith((".xlsx", ".xlsx.part")):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    async def cleanup(self) -> int:
+        """删除修改时间早于任务状态有效期的报表，返回删除的文件数"""
+        removed = await asyncio.to_thread(self._remove_expired, time.time() - self.job_ttl)
+        if removed:
+            logger.info(f"清理过期报表: {removed} 个文件")
+        return removed
+
+    async def run_cleanup_forever(self, interval: float) -> None:
+        while True:
+            try:
+                await self.cleanup()
+            except Exception as e:
+                logger.error(f"清理过期报表失败: {e!r}")
+            await asyncio.sleep(interval)
+
+    def start_cleanup(self, interval: float) -> asyncio.Task:
+        """在应用启动时调用，按固定间隔清理过期报表"""
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.create_task(self.run_cleanup_forever(interval))
+        return self._cleanup_task
+
+    async def stop(self) -> None:
+        """在应用关闭时调用"""
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            try:
+                await self._cleanup_task
+            except asyncio.CancelledError:
+                pass
+            self._cleanup_task = None
+
+
+_report_export_service: Optional[ReportExportService] = None
+
+
+def get_report_export_service() -> ReportExportService:
+    """按配置创建导出服务，每个任务在线程中使用独立的数据库会话"""
+    global _report_export_service
+    if _report_export_service is None:
+        from backend.app.core.config import settings
+        from backend.app.core.database import SessionLocal
+        from backend.app.core.redis import get_redis
+        from backend.app.repositories.exam_repository import ExamRepository
+
+        def build_report(
+            path: str,
+            paper_id: str,
+            class_id: str,
+            analysis: Optional[dict],
+            progress: Callable[[int], None]
+        ) -> int:
+            db = SessionLocal()
+            try:
+                repository = ExamRepository(db)
+                return write_report(
+                    path,
+                    repository.get_answer_key(paper_id),
+                    repository.iter_exam_results(paper_id, class_id),
+                    analysis=analysis,
+                    progress=progress
+                )
+            finally:
+                db.close()
+
+        _report_export_service = ReportExportService(
+            settings.report_export_dir,
+            build_report,
+            redis_client=get_redis(),
+            max_workers=settings.report_export_workers
+        )
+    return _report_export_service
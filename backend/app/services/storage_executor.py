@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+import asyncio
+import logging
+import time
+
+from backend.app.core.metrics import (
+    STORAGE_CALL_DURATION,
+    STORAGE_CALLS_TOTAL,
+    STORAGE_REJECTED_TOTAL,
+    STORAGE_RETRIES_TOTAL,
+    STORAGE_THREADS_BUSY,
+    STORAGE_TIMEOUTS_TOTAL,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_retryable_storage_error(exc: BaseException) -> bool:
+    """网络错误、超时和服务端5xx可以重试；404、权限等客户端错误重试无意义"""
+    if isinstance(exc, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    # oss2 的异常带有 status：RequestError 为负数（网络层失败），ServerError 为 5xx
+    status = getattr(exc, 'status', None)
+    return isinstance(status, int) and (status < 0 or status >= 500)
+
+
+class StorageExecutor:
+    """
+    阻塞存储调用的专用有界线程池
+
+    oss2 等同步SDK的调用在这里执行，不占用事件循环；
+    每次调用都有超时、有限次数的重试，指标计入 /metrics 的 storage_* 系列。
+
+    超时只是不再等待，线程仍阻塞在调用中。因此每次调用占用一个名额，
+    直到线程真正返回才释放：名额用尽时新调用最多等待一个超时时间，重试则不再排队，直接抛出上一次的错误，
+    避免卡住的调用越积越多。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        timeout: float = 30.0,
+        retries: int = 2,
+        backoff: float = 0.2,
+        is_retryable: Callable[[BaseException], bool] = is_retryable_storage_error
+    ):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='storage')
+        self._slots = asyncio.Semaphore(max_workers)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.is_retryable = is_retryable
+        # 已提交且线程尚未返回的调用数
+        self.in_flight = 0
+
+    def _submit(self, loop: asyncio.AbstractEventLoop, func: Callable[..., Any], args, kwargs) -> asyncio.Future:
+        try:
+            future = self._pool.submit(func, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        self.in_flight += 1
+        STORAGE_THREADS_BUSY.inc()
+        future.add_done_callback(lambda _: self._notify_finished(loop))
+        return asyncio.wrap_future(future)
+
+    def _notify_finished(self, loop: asyncio.AbstractEventLoop) -> None:
+        # 在工作线程中回调，回到事件循环中释放名额
+        try:
+            loop.call_soon_threadsafe(self._finished)
+        except RuntimeError:
+            # 事件循环已关闭（进程退出或测试结束）
+            pass
+
+    def _finished(self) -> None:
+        self.in_flight -= 1
+        STORAGE_THREADS_BUSY.dec()
+        self._slots.release()
+
+    async def _acquire(self, retrying: bool) -> bool:
+        """取得一个名额；重试时名额已满返回 False，首次调用最多等待一个超时时间"""
+        if retrying and self._slots.locked():
+            return False
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def run(self, operation: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """在线程池中执行 func(*args, **kwargs)，失败时按退避策略重试"""
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        error = None
+
+        while True:
+            if not await self._acquire(retrying=error is not None):
+                STORAGE_REJECTED_TOTAL.labels(operation).inc()
+                STORAGE_CALLS_TOTAL.labels(operation, 'error').inc()
+                if error is not None:
+                    logger.warning(f"存储线程池已满，不再重试 {operation}")
+                    raise error
+                raise asyncio.TimeoutError(f"存储线程池已满，{operation} 等待超时")
+
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self._submit(loop, func, args, kwargs), self.timeout)
+                STORAGE_CALLS_TOTAL.labels(operation, 'ok').inc()
+                return result
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    STORAGE_TIMEOUTS_TOTAL.labels(operation).inc()
+                if attempt >= self.retries or not self.is_retryable(e):
+                    STORAGE_CALLS_TOTAL.labels(operation, 'error').inc()
+                    raise
+
+                error = e
+                attempt += 1
+                STORAGE_RETRIES_TOTAL.labels(operation).inc()
+                logger.warning(f"存储操作 {operation} 失败，第 {attempt} 次重试: {e!r}")
+            finally:
+                STORAGE_CALL_DURATION.labels(operation).observe(time.perf_counter() - started)
+
+            await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
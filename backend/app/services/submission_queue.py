@@ -0,0 +1,395 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import socket
+
+if TYPE_CHECKING:
+    from backend.app.services.autosave_buffer import AutosaveBuffer
+    from backend.app.services.exam_analytics import AnalyticsDelta, ExamAnalytics
+    from backend.app.services.exam_token_cache import ExamTokenCache
+
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_FAILED = "failed"
+
+# 同一 exam_token 只入队一次：状态哈希不存在时才写入并追加到流，返回1；已存在返回0
+ENQUEUE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', 'queued', 'submitted_at', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('XADD', KEYS[2], '*', 'exam_token', ARGV[1], 'answers', ARGV[2], 'submitted_at', ARGV[3], 'time_spent', ARGV[5])
+return 1
+"""
+
+
+class SubmissionQueue:
+    """
+    交卷队列
+
+    交卷请求只校验 token 并把答卷写入 Redis Stream，立即返回回执；同一 exam_token 重复交卷
+    返回同一份回执，不会重复入队。后台若干 worker 通过消费组成批取出答卷，合并自动保存缓冲后
+    判分并写回 student_exams，最后更新可供轮询的交卷状态。
+    worker 异常退出时未确认的答卷留在消费组中，空闲超过 claim_idle 秒后由其他 worker 接管。
+    整批判分失败时逐份重试，只有导致失败的答卷留下；投递超过 max_deliveries 次仍失败的答卷
+    移入死信流并把状态置为 failed，不再重试（截止判分仍会按已保存的作答给其判分）。
+    无Redis时退化为进程内队列，仅适用于开发和测试环境。
+    """
+    STREAM_KEY = "submissions"
+    DEAD_LETTER_KEY = "submissions:dead"
+    GROUP = "graders"
+
+    def __init__(
+        self,
+        grade_batch: Callable[[List[dict]], Tuple[Dict[str, dict], List["AnalyticsDelta"]]],
+        redis_client=None,
+        autosave_buffer: Optional["AutosaveBuffer"] = None,
+        token_cache: Optional["ExamTokenCache"] = None,
+        analytics: Optional["ExamAnalytics"] = None,
+        batch_size: int = 100,
+        status_ttl: int = 2 * 24 * 3600,
+        claim_idle: float = 60.0,
+        max_deliveries: int = 10
+    ):
+        """
+        grade_batch 接收一批答卷，返回 ({exam_token: {'status', 'score', ...}}, 逐题统计增量)，在线程中执行
+        """
+        self.grade_batch = grade_batch
+        self.redis = redis_client
+        self.autosave_buffer = autosave_buffer
+        self.token_cache = token_cache
+        self.analytics = analytics
+        self.batch_size = batch_size
+        self.status_ttl = status_ttl
+        self.claim_idle = claim_idle
+        self.max_deliveries = max_deliveries
+        self._local_status: Dict[str, Dict[str, str]] = {}
+        self._local_queue: Optional[asyncio.Queue] = None
+        self._local_deliveries: Dict[str, int] = {}
+        self._local_dead: List[dict] = []
+        self._tasks: List[asyncio.Task] = []
+        self._enqueue = redis_client.register_script(ENQUEUE_SCRIPT) if redis_client else None
+
+    @staticmethod
+    def _status_key(exam_token: str) -> str:
+        return f"submission:{exam_token}"
+
+    def _queue(self) -> asyncio.Queue:
+        if self._local_queue is None:
+            self._local_queue = asyncio.Queue()
+        return self._local_queue
+
+    async def enqueue(
+        self,
+        exam_token: str,
+        answers: Dict[str, str],
+        time_spent: Optional[int] = None,
+        submitted_at: Optional[datetime] = None
+    ) -> Tuple[bool, dict]:
+        """入队一份答卷，返回 (是否新入队, 交卷状态)"""
+        submitted_at = (submitted_at or datetime.now()).isoformat()
+        if self.redis:
+            created = await self._enqueue(
+                keys=[self._status_key(exam_token), self.STREAM_KEY],
+                args=[
+                    exam_token,
+                    json.dumps(answers, ensure_ascii=False),
+                    submitted_at,
+                    self.status_ttl,
+                    time_spent if time_spent is not None else ""
+                ]
+            )
+            return bool(int(created)), await self.get_status(exam_token)
+
+        if exam_token in self._local_status:
+            return False, await self.get_status(exam_token)
+        self._local_status[exam_token] = {'status': STATUS_QUEUED, 'submitted_at': submitted_at}
+        self._queue().put_nowait({
+            'exam_token': exam_token,
+            'answers': dict(answers),
+            'submitted_at': submitted_at,
+            'time_spent': time_spent
+        })
+        return True, await self.get_status(exam_token)
+
+    async def get_status(self, exam_token: str) -> Optional[dict]:
+        """交卷状态：{'status', 'submitted_at', 'score', 'correct_count', 'total_count'}，未交卷或已过期返回 None"""
+        if self.redis:
+            raw = await self.redis.hgetall(self._status_key(exam_token))
+            fields = {k.decode(): v.decode() for k, v in raw.items()}
+        else:
+            fields = dict(self._local_status.get(exam_token, {}))
+        if not fields:
+            return None
+        return {
+            'exam_token': exam_token,
+            'status': fields['status'],
+            'submitted_at': datetime.fromisoformat(fields['submitted_at']),
+            'score': float(fields['score']) if 'score' in fields else None,
+            'correct_count': int(fields['correct_count']) if 'correct_count' in fields else None,
+            'total_count': int(fields['total_count']) if 'total_count' in fields else None
+        }
+
+    @staticmethod
+    def _result_fields(result: dict) -> Dict[str, str]:
+        return {name: str(value) for name, value in result.items() if value is not None}
+
+    async def _set_results(self, results: Dict[str, dict]) -> None:
+        if self.redis:
+            pipe = self.redis.pipeline(transaction=False)
+            for exam_token, result in results.items():
+                pipe.hset(self._status_key(exam_token), mapping=self._result_fields(result))
+            await pipe.execute()
+        else:
+            for exam_token, result in results.items():
+                fields = self._local_status.setdefault(exam_token, {'submitted_at': datetime.now().isoformat()})
+                fields.update(self._result_fields(result))
+
+    async def _merge_buffered(self, submissions: List[dict]) -> None:
+        """交卷时的作答覆盖自动保存缓冲中的作答"""
+        if self.autosave_buffer is None:
+            return
+        for submission in submissions:
+            buffered = await self.autosave_buffer.get_buffered(submission['exam_token'])
+            if buffered is not None:
+                submission['answers'] = {**buffered['answers'], **submission['answers']}
+
+    async def process(self, submissions: List[dict]) -> Dict[str, dict]:
+        """判分并写回一批答卷；失败时抛出异常，由调用方决定是否重试"""
+        if not submissions:
+            return {}
+        await self._merge_buffered(submissions)
+        results, deltas = await asyncio.to_thread(self.grade_batch, submissions)
+        await self._set_results(results)
+        if self.analytics is not None:
+            await self.analytics.apply(deltas)
+        if self.autosave_buffer is not None:
+            for exam_token in results:
+                await self.autosave_buffer.discard(exam_token)
+        if self.token_cache is not None:
+            # 已交卷的 token 状态改变，缓存的上下文失效
+            await self.token_cache.invalidate(results)
+        logger.info(f"交卷处理完成: {len(results)} 份")
+        return results
+
+    @staticmethod
+    def _decode_entry(fields: Dict[bytes, bytes]) -> dict:
+        fields = {k.decode(): v.decode() for k, v in fields.items()}
+        return {
+            'exam_token': fields['exam_token'],
+            'answers': json.loads(fields['answers']),
+            'submitted_at': fields['submitted_at'],
+            'time_spent': int(fields['time_spent']) if fields.get('time_spent') else None
+        }
+
+    async def _ensure_group(self) -> None:
+        try:
+            await self.redis.xgroup_create(self.STREAM_KEY, self.GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _dead_letter_exhausted(self) -> None:
+        """把投递次数已达上限、仍未确认的答卷移入死信流"""
+        pending = await self.redis.xpending_range(
+            self.STREAM_KEY, self.GROUP, min="-", max="+", count=self.batch_size,
+            idle=int(self.claim_idle * 1000)
+        )
+        exhausted = [p for p in pending if p['times_delivered'] >= self.max_deliveries]
+        if not exhausted:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for p in exhausted:
+            pipe.xrange(self.STREAM_KEY, min=p['message_id'], max=p['message_id'])
+        ranges = await pipe.execute()
+
+        failed_at = datetime.now().isoformat()
+        pipe = self.redis.pipeline(transaction=False)
+        for p, entries in zip(exhausted, ranges):
+            entry_id = p['message_id']
+            if entries:
+                fields = {k.decode(): v.decode() for k, v in entries[0][1].items()}
+                pipe.xadd(self.DEAD_LETTER_KEY, {
+                    **fields,
+                    'entry_id': entry_id,
+                    'deliveries': p['times_delivered'],
+                    'failed_at': failed_at
+                })
+                pipe.hset(self._status_key(fields['exam_token']), 'status', STATUS_FAILED)
+                logger.error(f"交卷 {fields['exam_token']} 投递 {p['times_delivered']} 次仍处理失败，已移入死信流")
+            pipe.xack(self.STREAM_KEY, self.GROUP, entry_id)
+            pipe.xdel(self.STREAM_KEY, entry_id)
+        await pipe.execute()
+
+    async def _read_stream(self, consumer: str, block_ms: int) -> List[Tuple[bytes, dict]]:
+        await self._dead_letter_exhausted()
+        # 先接管其他 worker 取走但长时间未确认的答卷
+        claimed = await self.redis.xautoclaim(
+            self.STREAM_KEY, self.GROUP, consumer,
+            min_idle_time=int(self.claim_idle * 1000), start_id="0-0", count=self.batch_size
+        )
+        entries = claimed[1]
+        if not entries:
+            response = await self.redis.xreadgroup(
+                self.GROUP, consumer, {self.STREAM_KEY: ">"}, count=self.batch_size, block=block_ms
+            )
+            entries = response[0][1] if response else []
+        return [(entry_id, fields) for entry_id, fields in entries if fields]
+
+    async def _process_isolating(self, submissions: List[dict]) -> List[bool]:
+        """
+        处理一批答卷，返回每份是否成功。整批失败时逐份重试，
+        使一份有问题的答卷不会拖住同批的其他答卷；全部失败时抛出最后一个异常。
+        """
+        try:
+            await self.process(submissions)
+            return [True] * len(submissions)
+        except Exception as e:
+            if len(submissions) == 1:
+                raise
+            logger.warning(f"整批交卷处理失败，逐份重试: {e!r}")
+            error = e
+
+        succeeded = []
+        for submission in submissions:
+            try:
+                await self.process([submission])
+                succeeded.append(True)
+            except Exception as e:
+                logger.error(f"交卷 {submission['exam_token']} 处理失败: {e!r}")
+                succeeded.append(False)
+                error = e
+        if not any(succeeded):
+            raise error
+        return succeeded
+
+    async def _retry_local(self, submissions: List[dict]) -> None:
+        """放回进程内队列，下一轮重试；次数达到上限的移入死信列表"""
+        for submission in submissions:
+            exam_token = submission['exam_token']
+            deliveries = self._local_deliveries[exam_token] = self._local_deliveries.get(exam_token, 0) + 1
+            if deliveries < self.max_deliveries:
+                self._queue().put_nowait(submission)
+                continue
+            self._local_deliveries.pop(exam_token)
+            self._local_dead.append({**submission, 'deliveries': deliveries, 'failed_at': datetime.now().isoformat()})
+            self._local_status.setdefault(exam_token, {'submitted_at': submission['submitted_at']})['status'] = STATUS_FAILED
+            logger.error(f"交卷 {exam_token} 处理 {deliveries} 次仍失败，已移入死信列表")
+
+    async def get_dead_letters(self, count: int = 100) -> List[dict]:
+        """最近移入死信的答卷，供管理员排查后重新判分"""
+        if self.redis:
+            entries = await self.redis.xrevrange(self.DEAD_LETTER_KEY, count=count)
+            return [{k.decode(): v.decode() for k, v in fields.items()} for _, fields in entries]
+        return list(reversed(self._local_dead[-count:]))
+
+    async def drain_once(self, consumer: str = "local", block_ms: int = 1000) -> int:
+        """取出并处理一批答卷，返回处理成功的份数；全部失败时抛出异常"""
+        if self.redis:
+            entries = await self._read_stream(consumer, block_ms)
+            if not entries:
+                return 0
+            submissions = [self._decode_entry(fields) for _, fields in entries]
+            # 失败的答卷不确认，留在消费组中由 XAUTOCLAIM 重新投递
+            succeeded = await self._process_isolating(submissions)
+            entry_ids = [entry_id for (entry_id, _), ok in zip(entries, succeeded) if ok]
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.xack(self.STREAM_KEY, self.GROUP, *entry_ids)
+            pipe.xdel(self.STREAM_KEY, *entry_ids)
+            await pipe.execute()
+            return len(entry_ids)
+
+        queue = self._queue()
+        try:
+            submissions = [await asyncio.wait_for(queue.get(), block_ms / 1000)]
+        except asyncio.TimeoutError:
+            return 0
+        while len(submissions) < self.batch_size and not queue.empty():
+            submissions.append(queue.get_nowait())
+        try:
+            succeeded = await self._process_isolating(submissions)
+        except Exception:
+            await self._retry_local(submissions)
+            raise
+        await self._retry_local([s for s, ok in zip(submissions, succeeded) if not ok])
+        for submission, ok in zip(submissions, succeeded):
+            if ok:
+                self._local_deliveries.pop(submission['exam_token'], None)
+        return sum(succeeded)
+
+    async def run_worker(self, consumer: str, retry_delay: float = 1.0) -> None:
+        if self.redis:
+            await self._ensure_group()
+        while True:
+            try:
+                await self.drain_once(consumer)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"交卷处理失败: {e!r}")
+                await asyncio.sleep(retry_delay)
+
+    def start(self, workers: int) -> List[asyncio.Task]:
+        """在应用启动时调用，启动若干个 worker 消费交卷队列"""
+        if not self._tasks:
+            prefix = f"{socket.gethostname()}-{os.getpid()}"
+            self._tasks = [
+                asyncio.create_task(self.run_worker(f"{prefix}-{i}"))
+                for i in range(workers)
+            ]
+        return self._tasks
+
+    async def stop(self) -> None:
+        """在应用关闭时调用；未处理完的答卷留在流中，由下次启动的 worker 继续处理"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+_submission_queue: Optional[SubmissionQueue] = None
+
+
+def get_submission_queue() -> SubmissionQueue:
+    """按配置创建交卷队列，判分和写回使用独立的数据库会话"""
+    global _submission_queue
+    if _submission_queue is None:
+        from backend.app.core.config import settings
+        from backend.app.core.database import SessionLocal
+        from backend.app.core.redis import get_redis
+        from backend.app.repositories.exam_repository import ExamRepository
+        from backend.app.services.autosave_buffer import get_autosave_buffer
+        from backend.app.services.batch_grader import grade_submissions
+        from backend.app.services.exam_analytics import get_exam_analytics
+        from backend.app.services.exam_token_cache import get_exam_token_cache
+
+        def grade_batch(submissions: List[dict]) -> Tuple[Dict[str, dict], List["AnalyticsDelta"]]:
+            db = SessionLocal()
+            try:
+                graded = grade_submissions(ExamRepository(db), submissions, datetime.now())
+                db.commit()
+                return graded
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        _submission_queue = SubmissionQueue(
+            grade_batch,
+            redis_client=get_redis(),
+            autosave_buffer=get_autosave_buffer(),
+            token_cache=get_exam_token_cache(),
+            analytics=get_exam_analytics(),
+            batch_size=settings.submission_batch_size,
+            status_ttl=settings.submission_status_ttl_seconds,
+            claim_idle=settings.submission_claim_idle_seconds,
+            max_deliveries=settings.submission_max_deliveries
+        )
+    return _submission_queue
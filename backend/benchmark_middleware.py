@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+中间件性能基准脚本
+比较旧版（BaseHTTPMiddleware + 逐个正则）与纯ASGI实现的单请求开销
+"""
+
+import asyncio
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.core.metrics_middleware import MetricsMiddleware
+from backend.app.core.rate_limit import LocalRateLimiter
+from backend.app.core.rate_limit_middleware import RateLimitMiddleware
+from backend.app.core.security_middleware import InputValidationMiddleware, SecurityHeadersMiddleware
+
+
+LEGACY_PATTERNS = [re.compile(p, re.IGNORECASE) for p in InputValidationMiddleware.BLACKLIST_PATTERNS]
+
+SAMPLE_REQUESTS = [
+    ("/api/questions/", b"grade=3&unit=2&type=listening&page=1&page_size=20"),
+    ("/api/exam/3f9c0d7a2b1e4c5d8e7f6a5b4c3d2e1f/save-progress", b""),
+    ("/api/questions/", b"keyword=%E5%8A%A8%E7%89%A9&page=2"),
+    ("/api/audio/" + "a" * 64 + ".mp3", b"rendition=compact"),
+]
+
+
+def legacy_check(path: str, query_string: bytes) -> bool:
+    """旧版逻辑：对路径和重建后的查询串分别跑8个正则"""
+    from urllib.parse import parse_qsl, urlencode
+    query = urlencode(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+    for content in (path, query):
+        if content and any(p.search(content) for p in LEGACY_PATTERNS):
+            return True
+    return False
+
+
+def asgi_check(middleware: InputValidationMiddleware, path: str, query_string: bytes) -> bool:
+    if middleware.PATH_PATTERN.search(path):
+        return True
+    return bool(query_string) and middleware._query_contains_malicious(query_string)
+
+
+def bench(name: str, func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for path, query in SAMPLE_REQUESTS:
+            func(path, query)
+    per_request = (time.perf_counter() - start) / (iterations * len(SAMPLE_REQUESTS)) * 1e6
+    print(f"   {name:40s} {per_request:8.2f} µs/请求")
+    return per_request
+
+
+def bench_matcher(iterations: int = 20000):
+    print("\n1. 恶意输入匹配开销（不含框架）")
+    print("-" * 60)
+    middleware = InputValidationMiddleware(app=None)
+    legacy = bench("旧版：8个正则 + 查询串重建", legacy_check, iterations)
+    current = bench("新版：合并正则匹配原始字节", lambda p, q: asgi_check(middleware, p, q), iterations)
+    print(f"   加速比: {legacy / current:.1f}x")
+
+
+async def _drive(app, path: str, query_string: bytes) -> None:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query_string,
+        "root_path": "", "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+def bench_stack(build_apps, iterations: int = 5000):
+    """对每个中间件栈，测量完整 ASGI 调用相对于裸应用的额外开销"""
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def run(app) -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for path, query in SAMPLE_REQUESTS:
+                await _drive(app, path, query)
+        return (time.perf_counter() - start) / (iterations * len(SAMPLE_REQUESTS)) * 1e6
+
+    baseline = asyncio.run(run(endpoint))
+    print(f"   {'裸应用':40s} {baseline:8.2f} µs/请求")
+    results = {}
+    for name, app in build_apps(endpoint):
+        per_request = asyncio.run(run(app))
+        results[name] = per_request - baseline
+        print(f"   {name:40s} {per_request:8.2f} µs/请求（中间件 +{per_request - baseline:.2f} µs）")
+    return results
+
+
+def build_input_validation_stacks(endpoint):
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    class LegacyInputValidationMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            if any(p.search(request.url.path) for p in LEGACY_PATTERNS):
+                raise ValueError("malicious path")
+            query_string = str(request.query_params)
+            if query_string and any(p.search(query_string) for p in LEGACY_PATTERNS):
+                raise ValueError("malicious query")
+            return await call_next(request)
+
+    yield "旧版 InputValidation（BaseHTTPMiddleware）", LegacyInputValidationMiddleware(endpoint)
+    yield "新版 InputValidation（纯ASGI）", InputValidationMiddleware(endpoint)
+
+
+def build_security_headers_stacks(endpoint):
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            response = await call_next(request)
+            for name, value in SecurityHeadersMiddleware.SECURITY_HEADERS:
+                response.headers[name.decode()] = value.decode()
+            return response
+
+    yield "旧版 SecurityHeaders（BaseHTTPMiddleware）", LegacySecurityHeadersMiddleware(endpoint)
+    yield "新版 SecurityHeaders（纯ASGI）", SecurityHeadersMiddleware(endpoint)
+    yield "新版完整栈（两个纯ASGI中间件）", SecurityHeadersMiddleware(InputValidationMiddleware(endpoint))
+
+
+def bench_pure_asgi(iterations: int = 20000):
+    """不依赖 starlette：只测新版中间件相对裸应用的开销"""
+    def build(endpoint):
+        yield "新版 InputValidation（纯ASGI）", InputValidationMiddleware(endpoint)
+        yield "新版 SecurityHeaders（纯ASGI）", SecurityHeadersMiddleware(endpoint)
+        yield "新版完整栈（两个纯ASGI中间件）", SecurityHeadersMiddleware(InputValidationMiddleware(endpoint))
+        yield "Metrics（纯ASGI）", MetricsMiddleware(endpoint)
+        yield "RateLimit（进程内令牌桶）", RateLimitMiddleware(
+            endpoint, routes={"/api/questions": [1e9, 1e9], "/api/exam": [1e9, 1e9]},
+            ip_rate=1e9, ip_burst=1e9, limiter=LocalRateLimiter()
+        )
+    bench_stack(build, iterations)
+
+
+def main():
+    print("=" * 60)
+    print("中间件性能基准")
+    print("=" * 60)
+
+    bench_matcher()
+
+    print("\n2. 纯ASGI中间件开销")
+    print("-" * 60)
+    bench_pure_asgi()
+
+    print("\n3. 与旧版 BaseHTTPMiddleware 对比")
+    print("-" * 60)
+    try:
+        import starlette.middleware.base  # noqa: F401
+    except ImportError:
+        print("   [WARN] 未安装 starlette，跳过旧版中间件对比")
+        return
+    bench_stack(build_input_validation_stacks)
+    bench_stack(build_security_headers_stacks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+响应序列化基准脚本
+比较一页100道题（含选项、标签、阅读材料）在默认路径与快速路径下的编码耗时
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.core import json_codec
+
+
+PAGE_SIZE = 100
+
+
+def build_page():
+    now = datetime(2026, 3, 1, 8, 0, 0)
+    questions = []
+    for i in range(PAGE_SIZE):
+        questions.append({
+            "id": uuid.uuid4(),
+            "type": "reading" if i % 3 == 0 else "single_choice",
+            "grade": 3 + i % 4,
+            "unit": 1 + i % 12,
+            "difficulty": "medium",
+            "content": f"Read the passage and choose the best answer. ({i})",
+            "options": ["A. apple", "B. banana", "C. orange", "D. pear"],
+            "correct_answer": "A",
+            "audio_file_id": None,
+            "reading_material": "Tom has a little dog. 汤姆有一只小狗，它每天早上都和汤姆一起去公园散步。" * 6,
+            "knowledge_points": ["词汇", "阅读理解"],
+            "tags": ["三年级", "上册", f"Unit {1 + i % 12}"],
+            "score": 2,
+            "created_at": now + timedelta(minutes=i),
+        })
+    return {"total": 2400, "page": 1, "page_size": PAGE_SIZE, "questions": questions}
+
+
+def legacy_jsonable(obj):
+    """近似 jsonable_encoder：逐层递归转换为基础类型"""
+    if isinstance(obj, dict):
+        return {str(k): legacy_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set)):
+        return [legacy_jsonable(v) for v in obj]
+    if isinstance(obj, (str, int, float)) or obj is None:
+        return obj
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    return str(obj)
+
+
+def legacy_encode(page):
+    try:
+        from fastapi.encoders import jsonable_encoder
+    except ImportError:
+        jsonable_encoder = legacy_jsonable
+    return json.dumps(
+        jsonable_encoder(page), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def build_pydantic_encoder():
+    """按题目列表响应的字段定义模型，测 pydantic-core 直接序列化"""
+    from typing import List, Optional
+    from pydantic import BaseModel
+
+    class QuestionItem(BaseModel):
+        id: uuid.UUID
+        type: str
+        grade: int
+        unit: int
+        difficulty: str
+        content: str
+        options: Optional[List[str]] = None
+        correct_answer: str
+        audio_file_id: Optional[str] = None
+        reading_material: Optional[str] = None
+        knowledge_points: Optional[List[str]] = None
+        tags: Optional[List[str]] = None
+        score: int
+        created_at: datetime
+
+    class Page(BaseModel):
+        total: int
+        page: int
+        page_size: int
+        questions: List[QuestionItem]
+
+    def encode(page):
+        model = Page.model_validate(page, from_attributes=True)
+        return Page.__pydantic_serializer__.to_json(model)
+
+    return encode
+
+
+def bench(name, encode, page, iterations):
+    encode(page)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        body = encode(page)
+    per_page = (time.perf_counter() - start) / iterations * 1000
+    print(f"   {name:40s} {per_page:8.3f} ms/页  {len(body):7d} 字节")
+    return per_page
+
+
+def main(iterations: int = 300):
+    print("=" * 60)
+    print(f"响应序列化基准（每页 {PAGE_SIZE} 道题）")
+    print("=" * 60)
+
+    page = build_page()
+    legacy = bench("默认：jsonable_encoder + json", legacy_encode, page, iterations)
+    fast = bench(f"快速：json_codec（{json_codec.JSON_BACKEND}）", json_codec.dumps, page, iterations)
+    print(f"   加速比: {legacy / fast:.1f}x")
+
+    try:
+        encode = build_pydantic_encoder()
+    except ImportError:
+        print("   [WARN] 未安装 pydantic，跳过 pydantic-core 直接序列化")
+        return
+    direct = bench("快速：pydantic-core 校验并序列化", encode, page, iterations)
+    print(f"   加速比: {legacy / direct:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
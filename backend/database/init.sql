@@ -242,22 +242,41 @@ CREATE INDEX IF NOT EXISTS idx_logs_user ON operation_logs(user_id);
 CREATE INDEX IF NOT EXISTS idx_logs_action ON operation_logs(action);
 CREATE INDEX IF NOT EXISTS idx_logs_created ON operation_logs(created_at);
 
+-- 班级统计表：每个班级一行，发布和交卷时在同一语句中累加，学生变动由触发器维护，
+-- 班级看板只读一行，不再对 班级×学生×考试×答题记录 做连接聚合
+CREATE TABLE IF NOT EXISTS class_stats (
+    class_id UUID PRIMARY KEY REFERENCES classes(id) ON DELETE CASCADE,
+    student_count INTEGER NOT NULL DEFAULT 0,
+    exam_count INTEGER NOT NULL DEFAULT 0,
+    submitted_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 已有数据回填：每项计数单独按索引统计，避免连接扇出
+INSERT INTO class_stats (class_id, student_count, exam_count, submitted_count)
+SELECT
+    c.id,
+    (SELECT COUNT(*) FROM students s WHERE s.class_id = c.id),
+    (SELECT COUNT(*) FROM exams e WHERE e.class_id = c.id),
+    (SELECT COUNT(*) FROM student_exams se JOIN exams e ON e.id = se.exam_id
+     WHERE e.class_id = c.id AND se.status = 'submitted')
+FROM classes c
+ON CONFLICT (class_id) DO NOTHING;
+
 -- 创建视图
--- 班级学生统计视图
-CREATE OR REPLACE VIEW class_student_stats AS
+-- 班级学生统计视图（保留原有列，改为读取班级统计表）
+DROP VIEW IF EXISTS class_student_stats;
+CREATE VIEW class_student_stats AS
 SELECT
     c.id AS class_id,
     c.name AS class_name,
     c.grade,
     c.teacher_id,
-    COUNT(s.id) AS student_count,
-    COUNT(DISTINCT e.id) AS exam_count,
-    COUNT(DISTINCT CASE WHEN se.status = 'submitted' THEN se.id END) AS submitted_count
+    COALESCE(cs.student_count, 0) AS student_count,
+    COALESCE(cs.exam_count, 0) AS exam_count,
+    COALESCE(cs.submitted_count, 0) AS submitted_count
 FROM classes c
-LEFT JOIN students s ON c.id = s.class_id
-LEFT JOIN exams e ON c.id = e.class_id
-LEFT JOIN student_exams se ON e.id = se.exam_id
-GROUP BY c.id, c.name, c.grade, c.teacher_id;
+LEFT JOIN class_stats cs ON cs.class_id = c.id;
 
 -- 插入默认管理员用户（密码: admin123，需要在应用启动时修改）
 INSERT INTO users (username, password_hash, role, name, email)
@@ -290,6 +309,30 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- 学生加入、转出班级时维护班级人数
+CREATE OR REPLACE FUNCTION update_class_student_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.class_id IS NOT NULL THEN
+        UPDATE class_stats
+        SET student_count = student_count - 1, updated_at = CURRENT_TIMESTAMP
+        WHERE class_id = OLD.class_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.class_id IS NOT NULL THEN
+        INSERT INTO class_stats (class_id, student_count)
+        VALUES (NEW.class_id, 1)
+        ON CONFLICT (class_id) DO UPDATE
+        SET student_count = class_stats.student_count + 1, updated_at = CURRENT_TIMESTAMP;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_class_student_count ON students;
+CREATE TRIGGER update_class_student_count
+    AFTER INSERT OR DELETE OR UPDATE OF class_id ON students
+    FOR EACH ROW EXECUTE FUNCTION update_class_student_count();
+
 -- 为需要的表创建更新时间戳触发器
 CREATE TRIGGER update_users_updated_at BEFORE UPDATE ON users
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
@@ -156,9 +156,93 @@ def main():
             'name': '音频文件处理测试',
             'command': ['python3', 'test_audio_service.py']
         },
+        {
+            'name': '音频Range解析测试',
+            'command': ['python3', 'test_audio_range.py']
+        },
         {
             'name': '自动组卷算法测试',
             'command': ['python3', 'test_paper_generator.py']
+        },
+        {
+            'name': '存储线程池测试',
+            'command': ['python3', 'test_storage_executor.py']
+        },
+        {
+            'name': '音频转码测试',
+            'command': ['python3', 'test_audio_transcoder.py']
+        },
+        {
+            'name': '热点音频缓存测试',
+            'command': ['python3', 'test_audio_cache.py']
+        },
+        {
+            'name': '孤立音频回收测试',
+            'command': ['python3', 'test_audio_gc.py']
+        },
+        {
+            'name': '音频元数据提取测试',
+            'command': ['python3', 'test_audio_metadata.py']
+        },
+        {
+            'name': '安全中间件测试',
+            'command': ['python3', 'test_security_middleware.py']
+        },
+        {
+            'name': '监控指标测试',
+            'command': ['python3', 'test_metrics.py']
+        },
+        {
+            'name': '采样分析测试',
+            'command': ['python3', 'test_profiler.py']
+        },
+        {
+            'name': '限流测试',
+            'command': ['python3', 'test_rate_limit.py']
+        },
+        {
+            'name': 'JSON编码测试',
+            'command': ['python3', 'test_json_codec.py']
+        },
+        {
+            'name': '试卷快照测试',
+            'command': ['python3', 'test_paper_snapshot.py']
+        },
+        {
+            'name': '自动保存写缓冲测试',
+            'command': ['python3', 'test_autosave_buffer.py']
+        },
+        {
+            'name': '批量判分测试',
+            'command': ['python3', 'test_batch_grader.py']
+        },
+        {
+            'name': '截止判分测试',
+            'command': ['python3', 'test_deadline_grader.py']
+        },
+        {
+            'name': '交卷队列测试',
+            'command': ['python3', 'test_submission_queue.py']
+        },
+        {
+            'name': '答题token缓存测试',
+            'command': ['python3', 'test_exam_token_cache.py']
+        },
+        {
+            'name': '批量发布测试',
+            'command': ['python3', 'test_exam_publisher.py']
+        },
+        {
+            'name': '逐题统计测试',
+            'command': ['python3', 'test_exam_analytics.py']
+        },
+        {
+            'name': '报表导出测试',
+            'command': ['python3', 'test_report_export.py']
+        },
+        {
+            'name': '班级统计测试',
+            'command': ['python3', 'test_class_stats.py']
         }
     ]
     
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+热点音频缓存测试脚本
+测试两级LRU淘汰、并发回源合并和命中率统计
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.audio_cache import HotAudioCache
+
+
+class FakeOrigin:
+    """模拟OSS回源：记录每个文件被下载的次数"""
+
+    def __init__(self, files: dict, latency: float = 0.0):
+        self.files = files
+        self.latency = latency
+        self.fetches = {}
+
+    def loader(self, key: str):
+        async def load(target_path: str):
+            self.fetches[key] = self.fetches.get(key, 0) + 1
+            await asyncio.sleep(self.latency)
+            with open(target_path, 'wb') as f:
+                f.write(self.files[key])
+        return load
+
+
+def test_concurrent_misses_fetch_once():
+    """测试同一音频的并发未命中只回源一次"""
+    print("\n1. 测试并发回源合并...")
+    print("-" * 60)
+
+    async def scenario(cache_dir):
+        origin = FakeOrigin({'a.mp3': b'A' * 1000}, latency=0.05)
+        cache = HotAudioCache(cache_dir)
+        results = await asyncio.gather(*[cache.get('a.mp3', origin.loader('a.mp3')) for _ in range(40)])
+        return origin, cache, results
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        origin, cache, results = asyncio.run(scenario(cache_dir))
+
+    passed = origin.fetches['a.mp3'] == 1 and all(r.data == b'A' * 1000 for r in results)
+    print(f"   {'[PASS]' if passed else '[FAIL]'} 40个并发请求，回源 {origin.fetches['a.mp3']} 次")
+    assert passed
+
+
+def test_lru_eviction():
+    """测试内存层与磁盘层按LRU淘汰"""
+    print("\n2. 测试LRU淘汰...")
+    print("-" * 60)
+
+    async def scenario(cache_dir):
+        files = {f'{name}.mp3': name.encode() * 400 for name in 'abcd'}
+        origin = FakeOrigin(files)
+        cache = HotAudioCache(cache_dir, memory_limit=1000, disk_limit=1300, memory_item_limit=500)
+
+        for key in ['a.mp3', 'b.mp3', 'c.mp3']:
+            await cache.get(key, origin.loader(key))
+        await cache.get('a.mp3', origin.loader('a.mp3'))  # a 变为最近使用
+        await cache.get('d.mp3', origin.loader('d.mp3'))  # 淘汰最久未使用的 b
+        return cache, sorted(os.listdir(cache_dir))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache, on_disk = asyncio.run(scenario(cache_dir))
+
+    stats = cache.stats()
+    checks = [
+        ("磁盘层不超过上限", stats['disk_bytes'] <= 1300),
+        ("内存层不超过上限", stats['memory_bytes'] <= 1000),
+        ("淘汰最久未使用的文件", on_disk == ['a.mp3', 'c.mp3', 'd.mp3']),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_large_files_served_from_disk():
+    """测试超过单项上限的文件只走磁盘层"""
+    print("\n3. 测试大文件磁盘分发...")
+    print("-" * 60)
+
+    async def scenario(cache_dir):
+        origin = FakeOrigin({'big.wav': b'W' * 4096})
+        cache = HotAudioCache(cache_dir, memory_item_limit=1024)
+        first = await cache.get('big.wav', origin.loader('big.wav'))
+        second = await cache.get('big.wav', origin.loader('big.wav'))
+        return first, second
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        first, second = asyncio.run(scenario(cache_dir))
+        passed = first.data is None and second.path is not None and os.path.getsize(second.path) == 4096
+
+    print(f"   {'[PASS]' if passed else '[FAIL]'} 4KB 文件以磁盘路径返回")
+    assert passed
+
+
+def test_hit_ratio():
+    """测试命中率与分发字节统计"""
+    print("\n4. 测试命中率统计...")
+    print("-" * 60)
+
+    async def scenario(cache_dir):
+        origin = FakeOrigin({'a.mp3': b'A' * 100, 'b.mp3': b'B' * 100})
+        cache = HotAudioCache(cache_dir)
+        for key in ['a.mp3', 'b.mp3', 'a.mp3', 'a.mp3']:
+            result = await cache.get(key, origin.loader(key))
+            cache.record_served(result.size)
+        return cache.stats()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        stats = asyncio.run(scenario(cache_dir))
+
+    passed = stats['hit_ratio'] == 0.5 and stats['bytes_served'] == 400
+    print(f"   {'[PASS]' if passed else '[FAIL]'} 命中率 {stats['hit_ratio']:.2f}，分发 {stats['bytes_served']} 字节")
+    assert passed
+
+
+def test_pinned_files_not_evicted():
+    """测试正在发送的磁盘文件不被淘汰"""
+    print("\n5. 测试发送中的文件固定...")
+    print("-" * 60)
+
+    async def scenario(cache_dir):
+        files = {f'{name}.wav': name.encode() * 2048 for name in 'abc'}
+        origin = FakeOrigin(files)
+        cache = HotAudioCache(cache_dir, disk_limit=4096, memory_item_limit=1024)
+        serving = await cache.get('a.wav', origin.loader('a.wav'), pin=True)
+        # 磁盘只容得下两个文件：b、c 写入后 a 本应被淘汰
+        await cache.get('b.wav', origin.loader('b.wav'))
+        await cache.get('c.wav', origin.loader('c.wav'))
+        kept = sorted(os.listdir(cache_dir))
+        await cache.release(serving.pinned)
+        # 释放后 a 恢复为可淘汰，再写入新文件时按LRU最先淘汰
+        await cache.get('b.wav', origin.loader('b.wav'))
+        return serving, kept, sorted(os.listdir(cache_dir)), cache.stats()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        serving, kept, on_disk, stats = asyncio.run(scenario(cache_dir))
+
+    checks = [
+        ("固定的文件返回磁盘路径", serving.pinned == 'a.wav'),
+        ("发送期间不被删除，改为淘汰较新的文件", kept == ['a.wav', 'c.wav']),
+        ("释放后恢复淘汰", on_disk == ['b.wav', 'c.wav'] and stats['disk_bytes'] <= 4096),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("热点音频缓存测试")
+    print("=" * 60)
+
+    try:
+        test_concurrent_misses_fetch_once()
+        test_lru_eviction()
+        test_large_files_served_from_disk()
+        test_hit_ratio()
+        test_pinned_files_not_evicted()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
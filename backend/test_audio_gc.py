@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+孤立音频回收测试脚本
+使用进程内的音频索引与模拟Bucket测试分批回收、宽限期和删除上限
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.audio_gc import OrphanAudioCollector
+from backend.app.services.audio_manifest import AudioManifest
+
+
+class FakeBucket:
+    """进程内的 OSS Bucket 替身，只记录批量删除调用"""
+
+    def __init__(self, keys):
+        self.objects = set(keys)
+        self.batch_calls = []
+        # 对象修改时间，未设置的视为三天前写入
+        self.modified = {}
+
+    def batch_delete_objects(self, keys):
+        self.batch_calls.append(list(keys))
+        self.objects.difference_update(keys)
+
+
+class FakeAudioService:
+    """与 AudioService.delete_audio_batch 行为一致的替身"""
+
+    def __init__(self, bucket, page_size=3):
+        self.manifest = AudioManifest()
+        self.bucket = bucket
+        self.page_size = page_size
+        self.pages = []
+
+    async def delete_audio_batch(self, entries):
+        keys = [e['storage_path'] for e in entries]
+        keys += [r['storage_path'] for e in entries for r in e.get('renditions', {}).values()]
+        self.bucket.batch_delete_objects(keys)
+        for entry in entries:
+            await self.manifest.delete(entry['file_id'])
+        return [e['file_id'] for e in entries]
+
+    async def list_storage(self):
+        """与 OSS 的 marker 分页一致：每页从上一页最后一个键之后继续，期间删除的文件不影响后续分页"""
+        old = datetime.now() - timedelta(days=3)
+        marker = ''
+        while True:
+            keys = sorted(key for key in self.bucket.objects if key > marker)[:self.page_size]
+            if not keys:
+                return
+            self.pages.append(len(keys))
+            yield [
+                {'storage_path': key, 'size': 1, 'modified': self.bucket.modified.get(key, old), 'temp': '/.tmp/' in key}
+                for key in keys
+            ]
+            marker = keys[-1]
+
+    async def delete_stored_files(self, storage_paths):
+        self.bucket.batch_delete_objects(storage_paths)
+        return list(storage_paths)
+
+
+def make_entry(index: int, age: timedelta) -> dict:
+    file_id = f"{index:064x}"
+    return {
+        'file_id': file_id,
+        'storage_path': f'audio-files/2026/01/{file_id}.mp3',
+        'renditions': {'compact': {'storage_path': f'audio-files/2026/01/{file_id}.compact.mp3'}},
+        'created_at': (datetime.now() - age).isoformat()
+    }
+
+
+async def build_fixture(total: int, referenced_every: int, young: set):
+    entries = [
+        make_entry(i, timedelta(minutes=5) if i in young else timedelta(days=3))
+        for i in range(total)
+    ]
+    keys = [e['storage_path'] for e in entries] + [e['renditions']['compact']['storage_path'] for e in entries]
+    service = FakeAudioService(FakeBucket(keys))
+    for entry in entries:
+        await service.manifest.put(entry['file_id'], entry)
+
+    referenced = {e['file_id'] for i, e in enumerate(entries) if i % referenced_every == 0}
+    queries = []
+
+    def find_referenced(file_ids):
+        queries.append(len(file_ids))
+        return referenced.intersection(file_ids)
+
+    return service, referenced, find_referenced, queries
+
+
+def test_sweep_removes_only_orphans():
+    """测试只回收未被引用且超过宽限期的音频"""
+    print("\n1. 测试孤立音频识别...")
+    print("-" * 60)
+
+    async def scenario():
+        service, referenced, find_referenced, queries = await build_fixture(50, 3, young={1, 2})
+        collector = OrphanAudioCollector(service, find_referenced, batch_size=10, batch_pause=0)
+        stats = {'completed': False}
+        while not stats['completed']:
+            stats = await collector.run_once()
+        _, remaining = await service.manifest.scan(0, 1000)
+        return service, referenced, queries, {e['file_id'] for e in remaining}
+
+    service, referenced, queries, remaining = asyncio.run(scenario())
+    young_ids = {f"{i:064x}" for i in (1, 2)}
+
+    checks = [
+        ("被引用的音频全部保留", referenced <= remaining),
+        ("宽限期内的新上传保留", young_ids <= remaining),
+        ("其余孤立音频全部删除", remaining == referenced | young_ids),
+        ("转码版本一并删除", len(service.bucket.objects) == 2 * len(remaining)),
+        ("引用查询按批次进行", max(queries) <= 10),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_delete_cap_and_resume():
+    """测试每轮删除上限与游标续扫"""
+    print("\n2. 测试删除上限与续扫...")
+    print("-" * 60)
+
+    async def scenario():
+        service, _, find_referenced, _ = await build_fixture(40, 1000, young=set())
+        collector = OrphanAudioCollector(
+            service, find_referenced, batch_size=5, batch_pause=0, max_deletes_per_run=12
+        )
+        first = await collector.run_once()
+        rounds = 1
+        stats = first
+        while not stats['completed']:
+            stats = await collector.run_once()
+            rounds += 1
+        return first, rounds, service
+
+    first, rounds, service = asyncio.run(scenario())
+    checks = [
+        ("单轮删除不超过上限", first['deleted'] <= 12 and not first['completed']),
+        ("后续轮次从游标继续", rounds > 1),
+        ("每次批量删除请求有界", max(len(c) for c in service.bucket.batch_calls) <= 10),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_sweep_storage():
+    """测试遍历存储回收没有索引条目的文件"""
+    print("\n3. 测试存储遍历...")
+    print("-" * 60)
+
+    async def scenario():
+        service, referenced, find_referenced, _ = await build_fixture(6, 2, young=set())
+        kept_entry = make_entry(0, timedelta(days=3))
+        stray = {
+            'unindexed': f'audio-files/2025/12/{"f" * 64}.mp3',
+            'unindexed_compact': f'audio-files/2025/12/{"f" * 64}.compact.mp3',
+            'referenced': f'audio-files/2025/12/{"e" * 64}.mp3',
+            'duplicate': f'audio-files/2025/11/{kept_entry["file_id"]}.mp3',
+            'young': f'audio-files/2026/01/{"d" * 64}.mp3',
+            'old_temp': 'uploads/.tmp/tmpab12.part',
+            'young_temp': 'uploads/.tmp/tmpcd34.part',
+            'other': 'audio-files/README.txt',
+        }
+        service.bucket.objects.update(stray.values())
+        for name in ('young', 'young_temp'):
+            service.bucket.modified[stray[name]] = datetime.now() - timedelta(minutes=5)
+        referenced.add("e" * 64)
+
+        collector = OrphanAudioCollector(service, find_referenced, batch_size=4, batch_pause=0)
+        stats = {'completed': False}
+        while not stats['completed']:
+            stats = await collector.run_once()
+        return service, stray, stats
+
+    service, stray, stats = asyncio.run(scenario())
+    objects = service.bucket.objects
+    checks = [
+        ("没有索引且未被引用的文件删除", stray['unindexed'] not in objects and stray['unindexed_compact'] not in objects),
+        ("被引用但没有索引的文件保留", stray['referenced'] in objects),
+        ("索引之外的重复副本删除", stray['duplicate'] not in objects),
+        ("宽限期内的文件保留", stray['young'] in objects and stray['young_temp'] in objects),
+        ("残留临时文件删除", stray['old_temp'] not in objects and stats['temp_deleted'] == 1),
+        ("非音频文件不处理", stray['other'] in objects),
+        ("按页遍历存储", len(service.pages) > 1 and max(service.pages) <= service.page_size),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_recheck_before_delete():
+    """测试删除前重新确认引用和复用"""
+    print("\n4. 测试删除前复核...")
+    print("-" * 60)
+
+    async def scenario():
+        service, referenced, _, _ = await build_fixture(4, 1000, young=set())
+        reused, newly_referenced = f"{1:064x}", f"{2:064x}"
+        calls = []
+
+        def find_referenced(file_ids):
+            # 第一次查询后有新建的题目引用了其中一个文件
+            calls.append(list(file_ids))
+            return {newly_referenced}.intersection(file_ids) if len(calls) > 1 else set()
+
+        collector = OrphanAudioCollector(service, find_referenced, batch_size=10, batch_pause=0)
+        recheck = collector._recheck
+
+        async def reuse_then_recheck(orphans):
+            # 复核前另一个文件被上传查重复用
+            await service.manifest.update(reused, last_used_at=datetime.now().isoformat())
+            return await recheck(orphans)
+
+        collector._recheck = reuse_then_recheck
+        stats = await collector.run_once()
+        _, remaining = await service.manifest.scan(0, 1000)
+        return stats, {e['file_id'] for e in remaining}, reused, newly_referenced
+
+    stats, remaining, reused, newly_referenced = asyncio.run(scenario())
+    checks = [
+        ("刚被复用的文件保留", reused in remaining),
+        ("复核时已被引用的文件保留", newly_referenced in remaining),
+        ("其余孤立文件删除", len(remaining) == 2 and stats['deleted'] == 2),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("孤立音频回收测试")
+    print("=" * 60)
+
+    try:
+        test_sweep_removes_only_orphans()
+        test_delete_cap_and_resume()
+        test_sweep_storage()
+        test_recheck_before_delete()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
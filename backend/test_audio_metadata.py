@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+音频元数据提取测试脚本
+用构造的 WAV / MP3 文件头测试时长、码率、采样率、声道数的解析
+"""
+
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.audio_metadata import AudioMetadataParser
+
+
+def make_wav(seconds: float, sample_rate: int = 16000, channels: int = 1, bits: int = 16) -> bytes:
+    byte_rate = sample_rate * channels * bits // 8
+    data_size = int(byte_rate * seconds)
+    fmt = struct.pack('<HHIIHH', 1, channels, sample_rate, byte_rate, channels * bits // 8, bits)
+    list_chunk = b'LIST' + struct.pack('<I', 5) + b'INFOx' + b'\x00'  # 奇数长度块带填充字节
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + list_chunk
+    body += b'data' + struct.pack('<I', data_size) + b'\x00' * data_size
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def make_id3(size: int) -> bytes:
+    synchsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b'ID3\x04\x00\x00' + synchsafe + b'\x00' * size
+
+
+def make_cbr_mp3(frames: int) -> bytes:
+    # MPEG1 Layer III, 128kbps, 44.1kHz, 立体声：帧长 417 字节
+    header = b'\xff\xfb\x90\x00'
+    frame = header + b'\x00' * (417 - 4)
+    return frame * frames
+
+
+def make_xing_mp3(frames: int, stream_bytes: int) -> bytes:
+    # MPEG2 Layer III, 单声道, 24kHz：side info 9 字节，Xing 标签位于偏移 13
+    header = b'\xff\xf3\x44\xc4'
+    xing = b'Xing' + struct.pack('>III', 0x3, frames, stream_bytes)
+    first = header + b'\x00' * 9 + xing
+    return first + b'\x00' * (stream_bytes - len(first))
+
+
+def parse_in_chunks(content: bytes, content_type: str, chunk_size: int) -> dict:
+    parser = AudioMetadataParser(content_type)
+    for offset in range(0, len(content), chunk_size):
+        parser.feed(content[offset:offset + chunk_size])
+    return parser.result(len(content))
+
+
+def check(name: str, passed: bool) -> bool:
+    print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    return passed
+
+
+def test_wav_metadata():
+    """测试WAV fmt/data块解析"""
+    print("\n1. 测试WAV元数据...")
+    print("-" * 60)
+
+    content = make_wav(2.5, sample_rate=16000, channels=1)
+    results = [parse_in_chunks(content, 'audio/wav', size) for size in (7, 64 * 1024)]
+    passed = all([
+        check("时长 2.5 秒", all(r['duration'] == 2.5 for r in results)),
+        check("采样率与声道", all((r['sample_rate'], r['channels']) == (16000, 1) for r in results)),
+        check("码率 256kbps", all(r['bitrate'] == 256000 for r in results)),
+    ])
+    assert passed
+
+
+def test_cbr_mp3_with_id3():
+    """测试跳过ID3标签后的CBR MP3估算"""
+    print("\n2. 测试带ID3标签的CBR MP3...")
+    print("-" * 60)
+
+    id3 = make_id3(20000)
+    audio = make_cbr_mp3(100)
+    content = id3 + audio
+    results = [parse_in_chunks(content, 'audio/mpeg', size) for size in (5, 4096, 64 * 1024)]
+
+    expected = len(audio) * 8 / 128000
+    passed = all([
+        check("时长按CBR估算", all(abs(r['duration'] - expected) < 0.01 for r in results)),
+        check("码率/采样率/声道", all(
+            (r['bitrate'], r['sample_rate'], r['channels']) == (128000, 44100, 2) for r in results
+        )),
+    ])
+    assert passed
+
+
+def test_xing_mp3():
+    """测试Xing标签的VBR时长"""
+    print("\n3. 测试Xing标签VBR MP3...")
+    print("-" * 60)
+
+    content = make_xing_mp3(frames=1250, stream_bytes=90000)
+    result = parse_in_chunks(content, 'audio/mpeg', 10)
+    # MPEG2 Layer III 每帧 576 个采样：1250 * 576 / 24000 = 30 秒
+    passed = all([
+        check("时长 30 秒", result['duration'] == 30.0),
+        check("平均码率 24kbps", result['bitrate'] == 24000),
+        check("单声道 24kHz", (result['sample_rate'], result['channels']) == (24000, 1)),
+    ])
+    assert passed
+
+
+def test_unrecognized_input():
+    """测试无法识别的数据返回空结果"""
+    print("\n4. 测试无效数据...")
+    print("-" * 60)
+
+    passed = all([
+        check("非WAV数据", parse_in_chunks(b'JUNK' * 100, 'audio/wav', 16) == {}),
+        check("无音频帧的MP3", parse_in_chunks(b'\x00' * 100000, 'audio/mpeg', 4096) == {}),
+    ])
+    assert passed
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("音频元数据提取测试")
+    print("=" * 60)
+
+    try:
+        test_wav_metadata()
+        test_cbr_mp3_with_id3()
+        test_xing_mp3()
+        test_unrecognized_input()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+音频 Range 解析测试脚本
+验证后缀范围、开放范围、越界范围和语法无效范围的处理，
+并通过实际的请求验证被忽略的 Range 头返回完整内容，而不是 400 或多段 206
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.testclient import TestClient
+    from backend.app.core.range_response import parse_range, range_response, request_range
+    MISSING = None
+except ImportError as e:
+    # Range 响应依赖 fastapi 和 aiofiles，测试客户端依赖 httpx
+    parse_range = None
+    MISSING = e.name
+
+
+FILE_SIZE = 1000
+CONTENT = bytes(range(256)) * 4
+ETAG = '"audio"'
+
+
+def status_of(range_header):
+    """返回解析结果，416时返回状态码和 Content-Range"""
+    try:
+        return parse_range(range_header, FILE_SIZE)
+    except HTTPException as e:
+        return e.status_code, e.headers.get("Content-Range")
+
+
+def test_parse_range():
+    """测试 Range 头解析"""
+    print("\n1. 测试 Range 解析")
+    print("-" * 60)
+    if parse_range is None:
+        print(f"   [WARN] 未安装 {MISSING}，跳过")
+        return
+
+    not_satisfiable = (416, f"bytes */{FILE_SIZE}")
+    checks = [
+        ("闭区间", status_of("bytes=0-99") == (0, 99)),
+        ("后缀范围", status_of("bytes=-100") == (900, 999)),
+        ("后缀超过文件大小时取整个文件", status_of("bytes=-5000") == (0, 999)),
+        ("后缀长度为0", status_of("bytes=-0") == not_satisfiable),
+        ("开放范围", status_of("bytes=500-") == (500, 999)),
+        ("终点越界时截到文件末尾", status_of("bytes=900-5000") == (900, 999)),
+        ("起点越界", status_of("bytes=1000-") == not_satisfiable),
+        ("起点越界且终点更大", status_of("bytes=1000-2000") == not_satisfiable),
+        ("起点大于终点时忽略", status_of("bytes=500-100") is None),
+        ("起点越界且大于终点时忽略", status_of("bytes=2000-1500") is None),
+        ("多段范围忽略", status_of("bytes=0-1,5-9") is None),
+        ("非字节单位忽略", status_of("items=0-1") is None),
+        ("空范围忽略", status_of("bytes=-") is None),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def create_app(path):
+    """与音频路由相同的发送方式：文件从磁盘流式发送，热点缓存从内存发送"""
+    app = FastAPI()
+
+    @app.get("/file")
+    async def serve_file(request: Request):
+        size = os.path.getsize(path)
+        return range_response(path, None, size, request_range(request, size, ETAG), "audio/mpeg", {"ETag": ETAG})
+
+    @app.get("/memory")
+    async def serve_memory(request: Request):
+        size = len(CONTENT)
+        return range_response(None, CONTENT, size, request_range(request, size, ETAG), "audio/mpeg", {"ETag": ETAG})
+
+    return app
+
+
+def test_range_requests():
+    """测试实际请求的 Range 响应"""
+    print("\n2. 测试 Range 请求")
+    print("-" * 60)
+    if parse_range is None:
+        print(f"   [WARN] 未安装 {MISSING}，跳过")
+        return
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "audio.mp3")
+        with open(path, 'wb') as f:
+            f.write(CONTENT[:FILE_SIZE])
+        client = TestClient(create_app(path))
+
+        def fetch(url, **headers):
+            response = client.get(url, headers=headers)
+            return response.status_code, response.content, response.headers
+
+        checks = []
+        for source, content in (("/file", CONTENT[:FILE_SIZE]), ("/memory", CONTENT)):
+            size = len(content)
+            for header in ("bytes=500-100", "bytes=abc", "bytes=0-1,5-6"):
+                status_code, body, headers = fetch(source, range=header)
+                checks.append((
+                    f"{source} 忽略 {header}，返回完整内容",
+                    status_code == 200 and body == content and "content-range" not in headers
+                ))
+            status_code, body, headers = fetch(source, range="bytes=10-19")
+            checks.append((
+                f"{source} 单段范围",
+                status_code == 206 and body == content[10:20] and headers["content-range"] == f"bytes 10-19/{size}"
+            ))
+            status_code, body, headers = fetch(source, range="bytes=10-19", **{"if-range": '"stale"'})
+            checks.append((f"{source} If-Range 不符时返回完整内容", status_code == 200 and body == content))
+            status_code, _, headers = fetch(source, range=f"bytes={size}-")
+            checks.append((
+                f"{source} 无法满足的范围",
+                status_code == 416 and headers["content-range"] == f"bytes */{size}"
+            ))
+
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("音频 Range 解析测试")
+    print("=" * 60)
+
+    try:
+        test_parse_range()
+        test_range_requests()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
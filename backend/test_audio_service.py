@@ -55,6 +55,21 @@ class AudioValidator:
         """计算文件SHA256哈希"""
         return hashlib.sha256(content).hexdigest()
 
+    @staticmethod
+    def stream_and_hash(content: bytes, content_type: str, chunk_size: int = 4) -> tuple[bool, str]:
+        """单次分块读取：校验文件头、累计大小并计算哈希"""
+        hash_sha256 = hashlib.sha256()
+        size = 0
+        for offset in range(0, len(content), chunk_size):
+            chunk = content[offset:offset + chunk_size]
+            if size == 0 and not AudioValidator.validate_file_header(chunk, content_type)[0]:
+                return False, "无效的文件头"
+            size += len(chunk)
+            if size > AudioValidator.MAX_FILE_SIZE:
+                return False, f"读取到 {size} 字节时超出大小限制"
+            hash_sha256.update(chunk)
+        return True, hash_sha256.hexdigest()
+
     @staticmethod
     def generate_storage_path(file_hash: str, extension: str) -> str:
         """生成存储路径"""
@@ -169,9 +184,30 @@ def test_storage_path_generation():
 
     print("   [OK] 存储路径生成测试完成")
 
+def test_streaming_upload():
+    """测试单次流式读取"""
+    print("\n6. 测试单次流式读取...")
+    print("-" * 60)
+
+    content = b"ID3\x04\x00\x00\x00\x00\x00\x00streaming audio payload"
+    is_valid, file_hash = AudioValidator.stream_and_hash(content, 'audio/mpeg', chunk_size=8)
+    status = "[PASS]" if (is_valid and file_hash == AudioValidator.calculate_hash(content)) else "[FAIL]"
+    print(f"   {status} 分块哈希与整体哈希一致")
+
+    oversized = b"ID3" + b"\x00" * AudioValidator.MAX_FILE_SIZE
+    is_valid, message = AudioValidator.stream_and_hash(oversized, 'audio/mpeg', chunk_size=64 * 1024)
+    status = "[PASS]" if not is_valid else "[FAIL]"
+    print(f"   {status} 超大文件在读取过程中被拒绝 - {message}")
+
+    is_valid, message = AudioValidator.stream_and_hash(b"JUNK" * 8, 'audio/mpeg')
+    status = "[PASS]" if not is_valid else "[FAIL]"
+    print(f"   {status} 首个分块文件头无效即终止 - {message}")
+
+    print("   [OK] 单次流式读取测试完成")
+
 def test_full_workflow():
     """测试完整工作流"""
-    print("\n6. 测试完整上传工作流...")
+    print("\n7. 测试完整上传工作流...")
     print("-" * 60)
 
     content = b"ID3\x04\x00\x00\x00\x00\x00\x00This is a test MP3 file content"
@@ -221,6 +257,7 @@ def main():
         test_file_size_validation()
         test_hash_calculation()
         test_storage_path_generation()
+        test_streaming_upload()
         test_full_workflow()
 
         print("\n" + "=" * 60)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+音频转码测试脚本
+验证 ffmpeg 命令参数，并用模拟的转码函数测试 compact 版本写入音频索引、写入后回调重建试卷快照，
+以及转码期间条目被更新或删除时的处理
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.audio_manifest import AudioManifest
+from backend.app.services.audio_transcoder import COMPACT_RENDITION, AudioTranscoder, build_ffmpeg_command
+
+
+FILE_ID = "a" * 64
+
+
+class FakeAudioService:
+    """本地存储模式下 AudioService 的替身：原文件和转码结果都放在 storage_dir"""
+
+    def __init__(self, storage_dir):
+        self.manifest = AudioManifest()
+        self.storage_dir = storage_dir
+
+    async def fetch_to_local(self, entry, work_dir):
+        return entry['storage_path']
+
+    async def store_rendition(self, entry, rendition, local_path):
+        storage_path = os.path.join(self.storage_dir, f"{entry['file_id']}.{rendition}.mp3")
+        shutil.move(local_path, storage_path)
+        return storage_path
+
+    async def delete_stored_files(self, storage_paths):
+        for path in storage_paths:
+            os.remove(path)
+        return storage_paths
+
+
+def fake_transcode(output_size):
+    calls = []
+
+    def transcode(source_path, target_path, bitrate, sample_rate):
+        calls.append((source_path, bitrate, sample_rate))
+        with open(target_path, 'wb') as f:
+            f.write(b'\x00' * output_size)
+        return output_size
+
+    return transcode, calls
+
+
+async def add_entry(service, size=1000):
+    source_path = os.path.join(service.storage_dir, f"{FILE_ID}.mp3")
+    with open(source_path, 'wb') as f:
+        f.write(b'\x00' * size)
+    await service.manifest.put(FILE_ID, {
+        'file_id': FILE_ID, 'storage_path': source_path, 'extension': '.mp3', 'size': size
+    })
+
+
+def test_build_ffmpeg_command():
+    """测试转码命令"""
+    print("\n1. 测试 ffmpeg 命令")
+    print("-" * 60)
+    command = build_ffmpeg_command("in.wav", "out.mp3", "48k", 22050)
+
+    def option(name):
+        return command[command.index(name) + 1]
+
+    checks = [
+        ("不读标准输入并覆盖输出", command[:2] == ['ffmpeg', '-nostdin'] and '-y' in command),
+        ("输入与输出文件", option('-i') == "in.wav" and command[-1] == "out.mp3"),
+        ("单声道与采样率", option('-ac') == '1' and option('-ar') == '22050'),
+        ("去除视频流", '-vn' in command),
+        ("响度归一化", option('-af').startswith('loudnorm=')),
+        ("MP3编码与码率", option('-codec:a') == 'libmp3lame' and option('-b:a') == '48k'),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_transcode_updates_manifest():
+    """测试转码结果写入索引"""
+    print("\n2. 测试转码写入索引")
+    print("-" * 60)
+
+    async def scenario(storage_dir):
+        service = FakeAudioService(storage_dir)
+        await add_entry(service, size=1000)
+        transcode, calls = fake_transcode(300)
+        notified = []
+
+        async def on_rendition(file_id):
+            # 回调时索引中已有 compact 版本
+            notified.append((file_id, 'compact' in (await service.manifest.get(file_id)).get('renditions', {})))
+
+        transcoder = AudioTranscoder(
+            service, max_workers=0, bitrate='32k', sample_rate=16000, transcode_func=transcode, on_rendition=on_rendition
+        )
+
+        task = transcoder.schedule(FILE_ID)
+        tracked = task in transcoder._tasks
+        await transcoder.wait()
+        entry = await service.manifest.get(FILE_ID)
+
+        # 已有 compact 版本时不再转码
+        again = await transcoder.transcode(FILE_ID)
+        transcoder.shutdown()
+        return tracked, entry, calls, again, transcoder, notified
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        tracked, entry, calls, again, transcoder, notified = asyncio.run(scenario(storage_dir))
+        rendition = entry.get('renditions', {}).get(COMPACT_RENDITION, {})
+        stored = os.path.exists(rendition.get('storage_path', ''))
+
+    checks = [
+        ("后台任务被持有", tracked),
+        ("按配置调用转码", calls == [(os.path.join(storage_dir, f"{FILE_ID}.mp3"), '32k', 16000)]),
+        ("compact 版本写入索引", rendition.get('size') == 300 and rendition.get('channels') == 1),
+        ("记录 compact 版本的哈希", rendition.get('sha256') == hashlib.sha256(b'\x00' * 300).hexdigest()),
+        ("转码结果存放到存储目录", stored),
+        ("原文件条目保留", entry['size'] == 1000 and entry['extension'] == '.mp3'),
+        ("已转码的文件不重复转码", again is None and len(calls) == 1),
+        ("写入索引后回调一次", notified == [(FILE_ID, True)]),
+        ("任务完成后释放引用", not transcoder._tasks),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_transcode_skips():
+    """测试不写入索引的情况"""
+    print("\n3. 测试转码未采用")
+    print("-" * 60)
+
+    async def scenario(storage_dir):
+        service = FakeAudioService(storage_dir)
+        await add_entry(service, size=1000)
+        larger, _ = fake_transcode(2000)
+        notified = []
+
+        async def on_rendition(file_id):
+            notified.append(file_id)
+
+        def transcoder(transcode_func):
+            return AudioTranscoder(service, max_workers=0, transcode_func=transcode_func, on_rendition=on_rendition)
+
+        not_smaller = await transcoder(larger).transcode(FILE_ID)
+
+        def broken(source_path, target_path, bitrate, sample_rate):
+            raise RuntimeError("ffmpeg exited with status 1")
+
+        failed = await transcoder(broken).transcode(FILE_ID)
+        missing = await transcoder(larger).transcode("b" * 64)
+        return not_smaller, failed, missing, await service.manifest.get(FILE_ID), os.listdir(storage_dir), notified
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        not_smaller, failed, missing, entry, files, notified = asyncio.run(scenario(storage_dir))
+
+    checks = [
+        ("转码后未变小时保留原文件", not_smaller is None),
+        ("转码失败不抛出异常", failed is None),
+        ("索引中不存在的文件跳过", missing is None),
+        ("索引条目未改动", 'renditions' not in entry),
+        ("未写入索引时不回调", notified == []),
+        ("不残留转码文件", files == [f"{FILE_ID}.mp3"]),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_concurrent_changes():
+    """测试转码期间条目被更新或删除"""
+    print("\n4. 测试转码期间的并发修改")
+    print("-" * 60)
+
+    async def scenario(storage_dir, change):
+        service = FakeAudioService(storage_dir)
+        await add_entry(service)
+        transcode, _ = fake_transcode(300)
+        notified = []
+
+        async def on_rendition(file_id):
+            notified.append(file_id)
+
+        def transcode_with_change(source_path, target_path, bitrate, sample_rate):
+            # 在转码进行中修改索引，模拟并发的 touch 或回收
+            asyncio.run(change(service))
+            return transcode(source_path, target_path, bitrate, sample_rate)
+
+        transcoder = AudioTranscoder(service, max_workers=0, transcode_func=transcode_with_change, on_rendition=on_rendition)
+        result = await transcoder.transcode(FILE_ID)
+        transcoder.shutdown()
+        return result, await service.manifest.get(FILE_ID), sorted(os.listdir(storage_dir)), notified
+
+    async def touch(service):
+        await service.manifest.update(FILE_ID, last_used_at="2026-10-19T08:00:00")
+
+    async def collect(service):
+        await service.manifest.delete(FILE_ID)
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        touched, touched_entry, _, touched_notified = asyncio.run(scenario(storage_dir, touch))
+    with tempfile.TemporaryDirectory() as storage_dir:
+        collected, collected_entry, files, collected_notified = asyncio.run(scenario(storage_dir, collect))
+
+    checks = [
+        ("并发 touch 与转码结果都保留",
+         touched is not None and touched_entry.get('last_used_at') == "2026-10-19T08:00:00"
+         and 'compact' in touched_entry.get('renditions', {})),
+        ("条目已删除时不重建", collected is None and collected_entry is None),
+        ("条目已删除时清理转码文件", files == [f"{FILE_ID}.mp3"]),
+        ("条目已删除时不回调", touched_notified == [FILE_ID] and collected_notified == []),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("音频转码测试")
+    print("=" * 60)
+
+    try:
+        test_build_ffmpeg_command()
+        test_transcode_updates_manifest()
+        test_transcode_skips()
+        test_concurrent_changes()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+自动保存写缓冲测试脚本
+验证多次保存合并为一次批量写回、写回失败后重试、交卷时同步写回、增量保存的序号校验，
+以及后台定时写回、停止时的最后一次写回、写回期间被清除的缓冲不被重建和载入数据库中的作答
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.autosave_buffer import AutosaveBuffer
+
+
+class FakeDatabase:
+    """记录每次批量写回的行，可模拟一次写回失败"""
+
+    def __init__(self):
+        self.batches = []
+        self.fail_next = False
+
+    def write_batch(self, rows):
+        if self.fail_next:
+            self.fail_next = False
+            raise ConnectionError("database unavailable")
+        self.batches.append(rows)
+        return len(rows)
+
+
+def test_coalesce():
+    """测试合并写回"""
+    print("\n1. 测试合并写回")
+    print("-" * 60)
+
+    database = FakeDatabase()
+    buffer = AutosaveBuffer(database.write_batch)
+
+    async def scenario():
+        for i in range(3):
+            await buffer.save("token-a", {"q1": "A", f"q{i + 2}": "B"}, current_question=i)
+        await buffer.save("token-b", {"q1": "C"})
+        buffered = await buffer.get_buffered("token-a")
+        flushed = await buffer.flush_once()
+        idle = await buffer.flush_once()
+        return buffered, flushed, idle
+
+    buffered, flushed, idle = asyncio.run(scenario())
+    rows = {row['exam_token']: row for row in database.batches[0]}
+
+    checks = [
+        ("保存后立即可读", buffered['answers'] == {"q1": "A", "q2": "B", "q3": "B", "q4": "B"}),
+        ("记录当前题号", buffered['current_question'] == 2),
+        ("两名学生一批写回", len(database.batches) == 1 and flushed == 2),
+        ("多次保存合并为一行", rows["token-a"]['saves'] == 3 and rows["token-b"]['saves'] == 1),
+        ("无新保存时不写库", idle == 0 and len(database.batches) == 1),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_retry_and_submit():
+    """测试失败重试与交卷写回"""
+    print("\n2. 测试失败重试与交卷写回")
+    print("-" * 60)
+
+    database = FakeDatabase()
+    buffer = AutosaveBuffer(database.write_batch)
+
+    async def scenario():
+        await buffer.save("token-a", {"q1": "A"})
+        database.fail_next = True
+        try:
+            await buffer.flush_once()
+        except ConnectionError:
+            pass
+        await buffer.save("token-a", {"q2": "D"})
+        await buffer.flush_once()
+        first_saves = database.batches[0][0]['saves']
+
+        await buffer.save("token-a", {"q3": "B"})
+        final = await buffer.flush_exam("token-a")
+        return first_saves, final, await buffer.get_buffered("token-a")
+
+    first_saves, final, remaining = asyncio.run(scenario())
+
+    checks = [
+        ("写回失败后保留并重试", first_saves == 2),
+        ("交卷时同步写回全部作答", database.batches[-1][0]['answers'] == {"q1": "A", "q2": "D", "q3": "B"}),
+        ("只计入未写回的保存次数", database.batches[-1][0]['saves'] == 1),
+        ("交卷后清除缓冲", final is not None and remaining is None),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_delta_sequence():
+    """测试增量保存的序号校验"""
+    print("\n3. 测试增量保存序号")
+    print("-" * 60)
+
+    database = FakeDatabase()
+    buffer = AutosaveBuffer(database.write_batch)
+
+    async def scenario():
+        results = [
+            await buffer.save("token-a", {"q1": "A"}, seq=1),
+            await buffer.save("token-a", {"q2": "free text"}, seq=3),
+            await buffer.save("token-a", {"q1": "B"}, seq=2),
+        ]
+        return results, await buffer.get_buffered("token-a")
+
+    results, buffered = asyncio.run(scenario())
+
+    checks = [
+        ("按序到达的增量被接受", results[0] == (True, 1) and results[1] == (True, 3)),
+        ("乱序到达的旧增量被拒绝", results[2] == (False, 3)),
+        ("增量合并为完整作答", buffered['answers'] == {"q1": "A", "q2": "free text"}),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_background_flush():
+    """测试后台定时写回"""
+    print("\n4. 测试后台写回")
+    print("-" * 60)
+
+    database = FakeDatabase()
+    buffer = AutosaveBuffer(database.write_batch)
+
+    def submit_during_write(rows):
+        # 写回期间该学生交卷，缓冲被清除
+        buffer._local.pop("token-b", None)
+        return database.write_batch(rows)
+
+    async def scenario():
+        buffer.start(0.01)
+        await buffer.save("token-a", {"q1": "A"})
+        await asyncio.sleep(0.05)
+        periodic = len(database.batches)
+
+        buffer.write_batch = submit_during_write
+        await buffer.save("token-b", {"q1": "C"})
+        await buffer.stop()
+        return periodic, await buffer.get_buffered("token-b")
+
+    periodic, resurrected = asyncio.run(scenario())
+
+    checks = [
+        ("按间隔在后台写回", periodic == 1 and database.batches[0][0]['exam_token'] == "token-a"),
+        ("停止时写回剩余缓冲", database.batches[-1][0]['exam_token'] == "token-b"),
+        ("写回期间被清除的缓冲不被重建", resurrected is None),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_load_saved():
+    """测试载入数据库中的作答"""
+    print("\n5. 测试载入已写回的作答")
+    print("-" * 60)
+
+    database = FakeDatabase()
+    buffer = AutosaveBuffer(database.write_batch)
+
+    async def scenario():
+        await buffer.save("token-a", {"q2": "C"}, current_question=2, seq=1)
+        before = await buffer.get_buffered("token-a")
+        loaded = await buffer.load_saved("token-a", {"q1": "A", "q2": "B"})
+        # 从未保存过的学生：载入后缓冲存在，但不需要写回
+        empty = await buffer.load_saved("token-b", {})
+        flushed = await buffer.flush_once()
+        return before, loaded, empty, flushed, await buffer.get_buffered("token-a")
+
+    before, loaded, empty, flushed, after = asyncio.run(scenario())
+
+    checks = [
+        ("保存的缓冲尚未载入", before['loaded'] is False),
+        ("并入数据库中的作答，缓冲中的较新作答优先",
+         loaded['answers'] == {"q1": "A", "q2": "C"} and loaded['current_question'] == 2 and loaded['loaded']),
+        ("没有作答时也标记为已载入", empty['answers'] == {} and empty['loaded']),
+        ("载入不产生写回", flushed == 1 and [row['exam_token'] for row in database.batches[0]] == ["token-a"]),
+        ("写回后缓冲保留已载入标记", after['loaded'] and after['answers'] == {"q1": "A", "q2": "C"}),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("自动保存写缓冲测试")
+    print("=" * 60)
+
+    try:
+        test_coalesce()
+        test_retry_and_submit()
+        test_delta_sequence()
+        test_background_flush()
+        test_load_saved()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+批量判分测试脚本
+验证向量化判分与逐题循环结果一致、作答规范化、待判分答卷的批量写回
+"""
+
+from datetime import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from backend.app.services.batch_grader import BatchGrader, grade_exam, grade_submissions
+except ImportError:
+    # 判分依赖 numpy
+    BatchGrader = None
+
+
+ANSWER_KEY = [
+    {'id': 'q1', 'correct_answer': 'A', 'score': 5},
+    {'id': 'q2', 'correct_answer': 'C', 'score': 5},
+    {'id': 'q3', 'correct_answer': 'B', 'score': 10},
+    {'id': 'q4', 'correct_answer': 'D', 'score': 20},
+]
+
+
+def grade_by_loop(answer_key, answers):
+    """规格中的逐题判分，作为对照"""
+    total = sum(q['score'] for q in answer_key)
+    earned = sum(
+        q['score'] for q in answer_key
+        if str(answers.get(q['id'], '')).strip().upper() == q['correct_answer']
+    )
+    return round(earned / total * 100, 2)
+
+
+class FakeRepository:
+    def __init__(self, submissions):
+        self.submissions = submissions
+        self.updates = []
+
+    def get_ungraded_submissions(self, exam_id, now):
+        return self.submissions
+
+    def get_answer_key(self, paper_id):
+        return ANSWER_KEY
+
+    def bulk_update_scores(self, rows, graded_at):
+        self.updates.append(rows)
+        return [row['id'] for row in rows]
+
+    def get_submission_contexts(self, exam_tokens):
+        return [row for row in self.submissions if row['exam_token'] in exam_tokens]
+
+    def bulk_submit(self, rows, graded_at):
+        self.updates.append(rows)
+        return [row['exam_token'] for row in rows]
+
+
+def skip_without_numpy():
+    if BatchGrader is None:
+        print("   [WARN] 未安装 numpy，跳过")
+        return True
+    return False
+
+
+def test_grade_matches_loop():
+    """测试与逐题判分一致"""
+    print("\n1. 测试判分结果")
+    print("-" * 60)
+    if skip_without_numpy():
+        return
+
+    grader = BatchGrader(ANSWER_KEY)
+    submissions = [
+        {'q1': 'A', 'q2': 'C', 'q3': 'B', 'q4': 'D'},
+        {'q1': ' a ', 'q2': 'B'},
+        {},
+        {'q1': 'A', 'q4': 'D', 'unknown': 'A'},
+        {'q3': 'not an option'},
+    ]
+    result = grader.grade(submissions)
+
+    checks = [
+        ("得分与逐题判分一致", list(result.scores) == [grade_by_loop(ANSWER_KEY, s) for s in submissions]),
+        ("答对题数", list(result.correct_counts) == [4, 1, 0, 2, 0]),
+        ("每题答对人数", list(result.question_correct_counts()) == [3, 1, 1, 2]),
+        ("逐题对错矩阵", result.correctness.shape == (5, 4) and bool(result.correctness[3, 3])),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_grade_exam():
+    """测试待判分答卷的批量写回"""
+    print("\n2. 测试批量写回")
+    print("-" * 60)
+    if skip_without_numpy():
+        return
+
+    repository = FakeRepository([
+        {'id': 'se-1', 'exam_token': 't1', 'status': 'submitted', 'answers': {'q1': 'A', 'q4': 'D'}, 'class_id': 'c1'},
+        {'id': 'se-2', 'exam_token': 't2', 'status': 'in_progress', 'answers': {'q2': 'C', 'q3': 'a'}, 'class_id': 'c1'},
+        {'id': 'se-3', 'exam_token': 't3', 'status': 'pending', 'answers': None, 'class_id': 'c1'},
+    ])
+    summary = grade_exam(repository, 'exam-1', 'paper-1', datetime.now())
+
+    checks = [
+        ("只执行一次批量更新", len(repository.updates) == 1),
+        ("未交卷的答卷标记为已过期",
+         [row['status'] for row in repository.updates[0]] == ['submitted', 'overdue', 'overdue']),
+        ("得分", [row['score'] for row in repository.updates[0]] == [62.5, 12.5, 0.0]),
+        ("汇总", summary['graded'] == 3 and summary['average_score'] == 25.0
+         and summary['overdue_tokens'] == ['t2', 't3']),
+        ("逐题统计增量", len(summary['analytics']) == 1
+         and summary['analytics'][0].graded == 3
+         and summary['analytics'][0].correct_counts == {'q1': 1, 'q2': 1, 'q3': 0, 'q4': 1}
+         and summary['analytics'][0].wrong_answers == {'q3': {'A': 1}}
+         and summary['analytics'][0].score_buckets == [1, 1, 0, 0, 0, 0, 1, 0, 0, 0]),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_grade_submissions():
+    """测试交卷批量判分"""
+    print("\n3. 测试交卷判分")
+    print("-" * 60)
+    if skip_without_numpy():
+        return
+
+    repository = FakeRepository([
+        {'id': 'se-1', 'exam_token': 't1', 'status': 'in_progress', 'answers': {'q1': 'A', 'q4': 'B'},
+         'score': None, 'paper_id': 'p1', 'class_id': 'c1'},
+        {'id': 'se-2', 'exam_token': 't2', 'status': 'submitted', 'answers': {}, 'score': 80,
+         'paper_id': 'p1', 'class_id': 'c1'},
+        {'id': 'se-3', 'exam_token': 't3', 'status': 'overdue', 'answers': {}, 'score': 0,
+         'paper_id': 'p1', 'class_id': 'c1'},
+    ])
+    results, deltas = grade_submissions(repository, [
+        {'exam_token': 't1', 'answers': {'q4': 'D'}, 'submitted_at': '2026-01-01T10:00:00', 'time_spent': 600},
+        {'exam_token': 't2', 'answers': {'q1': 'A'}, 'submitted_at': '2026-01-01T10:00:00', 'time_spent': None},
+        {'exam_token': 't3', 'answers': {}, 'submitted_at': '2026-01-01T10:00:00', 'time_spent': None},
+        {'exam_token': 'unknown', 'answers': {}, 'submitted_at': '2026-01-01T10:00:00', 'time_spent': None},
+    ], datetime.now())
+
+    checks = [
+        ("交卷作答覆盖已保存作答", repository.updates[0][0]['answers'] == {'q1': 'A', 'q4': 'D'}),
+        ("判分结果", results['t1'] == {'status': 'graded', 'score': 62.5, 'correct_count': 2, 'total_count': 4}),
+        ("已判分的答卷返回已有得分", results['t2'] == {'status': 'graded', 'score': 80.0}),
+        ("已过期和无效 token 被拒绝",
+         results['t3'] == {'status': 'rejected'} and results['unknown'] == {'status': 'rejected'}),
+        ("本次交卷计入统计", deltas[0].graded == 1 and deltas[0].class_id == 'c1' and deltas[0].exam_tokens == ['t1']),
+        ("已判分的答卷补发统计增量", len(deltas) == 2 and deltas[1].exam_tokens == ['t2']),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_performance():
+    """测试整班判分耗时"""
+    print("\n4. 测试判分性能")
+    print("-" * 60)
+    if skip_without_numpy():
+        return
+
+    rng = random.Random(42)
+    answer_key = [
+        {'id': f'q{i}', 'correct_answer': rng.choice('ABCD'), 'score': rng.choice((2, 5, 10))}
+        for i in range(50)
+    ]
+    submissions = [
+        {q['id']: rng.choice('ABCD') for q in answer_key if rng.random() < 0.95}
+        for _ in range(500)
+    ]
+
+    start = time.perf_counter()
+    expected = [grade_by_loop(answer_key, s) for s in submissions]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = BatchGrader(answer_key).grade(submissions)
+    batch_time = time.perf_counter() - start
+
+    print(f"   逐题循环: {loop_time * 1000:.2f}ms，批量判分: {batch_time * 1000:.2f}ms（500份 × 50题）")
+    passed = all(abs(a - b) < 0.011 for a, b in zip(result.scores, expected))
+    print(f"   {'[PASS]' if passed else '[FAIL]'} 结果一致")
+    assert passed
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("批量判分测试")
+    print("=" * 60)
+
+    try:
+        test_grade_matches_loop()
+        test_grade_exam()
+        test_grade_submissions()
+        test_performance()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+截止判分测试脚本
+验证判分前写回自动保存缓冲、未交卷答卷按已保存作答判分并标记为已过期、
+逐题统计累加、过期 token 的缓存上下文失效，以及期间已由交卷队列判分的答卷不重复计入
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.autosave_buffer import AutosaveBuffer
+from backend.app.services.deadline_grader import DeadlineGrader
+from backend.app.services.exam_analytics import ExamAnalytics
+from backend.app.services.exam_token_cache import ExamTokenCache
+
+try:
+    from backend.app.services.batch_grader import grade_exam
+except ImportError:
+    # 判分依赖 numpy
+    grade_exam = None
+
+
+ANSWER_KEY = [
+    {'id': 'q1', 'correct_answer': 'A', 'score': 50},
+    {'id': 'q2', 'correct_answer': 'B', 'score': 50},
+]
+DEADLINE = datetime.now() - timedelta(minutes=10)
+
+
+class FakeRepository:
+    """student_exams 的内存替身，实现截止判分用到的查询"""
+
+    def __init__(self, rows):
+        self.rows = {row['exam_token']: row for row in rows}
+        self.before_update = None
+
+    def get_due_exams(self, cutoff):
+        due = {
+            (row['exam_id'], row['paper_id']) for row in self.rows.values()
+            if row['deadline'] <= cutoff and row['score'] is None
+        }
+        return [{'exam_id': exam_id, 'paper_id': paper_id} for exam_id, paper_id in sorted(due)]
+
+    def get_unsubmitted_tokens(self, exam_id):
+        return [
+            row['exam_token'] for row in self.rows.values()
+            if row['exam_id'] == exam_id and row['status'] in ('pending', 'in_progress')
+        ]
+
+    def get_ungraded_submissions(self, exam_id, now):
+        return [
+            dict(row) for row in self.rows.values()
+            if row['exam_id'] == exam_id and row['score'] is None and row['deadline'] <= now
+        ]
+
+    def get_answer_key(self, paper_id):
+        return ANSWER_KEY
+
+    def bulk_update_scores(self, rows, graded_at):
+        if self.before_update is not None:
+            self.before_update()
+        updated = []
+        for row in rows:
+            stored = next(r for r in self.rows.values() if r['id'] == row['id'])
+            if stored['score'] is None:
+                stored.update(score=row['score'], status=row['status'])
+                updated.append(row['id'])
+        return updated
+
+    def bulk_update_progress(self, rows, saved_at):
+        for row in rows:
+            stored = self.rows[row['exam_token']]
+            if stored['status'] in ('pending', 'in_progress'):
+                stored['answers'] = {**(stored['answers'] or {}), **row['answers']}
+                stored['status'] = 'in_progress'
+        return len(rows)
+
+
+def make_row(token, status, answers, exam_id='exam-1', deadline=DEADLINE):
+    return {
+        'id': f"se-{token}", 'exam_token': token, 'exam_id': exam_id, 'paper_id': 'paper-1',
+        'class_id': 'class-1', 'status': status, 'answers': answers, 'score': None, 'deadline': deadline
+    }
+
+
+def make_context(token):
+    return {
+        'student_exam_id': f"se-{token}", 'exam_id': 'exam-1', 'student_id': f"s-{token}",
+        'paper_id': 'paper-1', 'class_id': 'class-1', 'deadline': DEADLINE, 'status': 'in_progress'
+    }
+
+
+def test_deadline_grading():
+    """测试截止判分"""
+    print("\n1. 测试截止判分")
+    print("-" * 60)
+    if grade_exam is None:
+        print("   [WARN] 未安装 numpy，跳过")
+        return
+
+    repository = FakeRepository([
+        make_row('t1', 'submitted', {'q1': 'A', 'q2': 'B'}),
+        make_row('t2', 'in_progress', {'q1': 'A'}),
+        make_row('t3', 'pending', None),
+        make_row('t4', 'in_progress', {'q1': 'A'}),
+        make_row('t5', 'in_progress', {'q1': 'B'}, exam_id='exam-2', deadline=datetime.now() + timedelta(hours=1)),
+    ])
+
+    def find_due(cutoff):
+        exams = repository.get_due_exams(cutoff)
+        for exam in exams:
+            exam['exam_tokens'] = repository.get_unsubmitted_tokens(exam['exam_id'])
+        return exams
+
+    def grade(exam_id, paper_id, now):
+        return grade_exam(repository, exam_id, paper_id, now)
+
+    # t4 在读取待判分答卷之后、写库之前经交卷队列判分
+    repository.before_update = lambda: repository.rows['t4'].update(score=50.0, status='submitted')
+
+    autosave = AutosaveBuffer(lambda rows: repository.bulk_update_progress(rows, datetime.now()))
+    token_cache = ExamTokenCache()
+    analytics = ExamAnalytics()
+    grader = DeadlineGrader(
+        find_due, grade, autosave_buffer=autosave, token_cache=token_cache, analytics=analytics, delay=60
+    )
+
+    async def scenario():
+        await token_cache.put_many({token: make_context(token) for token in ('t1', 't2', 't3', 't5')})
+        await analytics.initialize('paper-1', ['class-1'], ['q1', 'q2'])
+        # 截止前最后一次自动保存还在缓冲中
+        await autosave.save('t2', {'q2': 'B'})
+
+        graded = await grader.run_once()
+        again = await grader.run_once()
+
+        reloaded = []
+
+        def loader(token):
+            reloaded.append(token)
+            return {**make_context(token), 'status': repository.rows[token]['status']}
+
+        contexts = {token: await token_cache.get(token, lambda t=token: loader(t)) for token in ('t1', 't2', 't3', 't5')}
+        return graded, again, contexts, reloaded, await analytics.get_summary('paper-1', 'class-1'), await autosave.get_buffered('t2')
+
+    graded, again, contexts, reloaded, summary, buffered = asyncio.run(scenario())
+    rows = repository.rows
+
+    checks = [
+        ("判分前写回缓冲中的作答", rows['t2']['answers'] == {'q1': 'A', 'q2': 'B'} and buffered is None),
+        ("按已保存的作答判分", rows['t2']['score'] == 100.0 and rows['t3']['score'] == 0.0),
+        ("未交卷的答卷标记为已过期", rows['t2']['status'] == 'overdue' and rows['t3']['status'] == 'overdue'),
+        ("已交卷的答卷保持已交卷", rows['t1']['status'] == 'submitted' and rows['t1']['score'] == 100.0),
+        ("期间已判分的答卷不被覆盖", rows['t4']['score'] == 50.0 and rows['t4']['status'] == 'submitted'),
+        ("未到截止时间的考试不判分", rows['t5']['score'] is None),
+        ("判分数与统计一致", graded == 3 and summary['graded_count'] == 3),
+        ("再次运行没有待判分答卷", again == 0),
+        ("过期 token 的缓存失效", sorted(reloaded) == ['t2', 't3'] and contexts['t2']['status'] == 'overdue'),
+        ("其他 token 的缓存保留", contexts['t1']['status'] == 'in_progress' and contexts['t5']['status'] == 'in_progress'),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("截止判分测试")
+    print("=" * 60)
+
+    try:
+        test_deadline_grading()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
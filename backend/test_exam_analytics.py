@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+逐题统计测试脚本
+验证增量累加与整体重算结果一致、未初始化的统计不累加、同一答卷的增量只累加一次、
+重建替换现有统计且不被并发累加覆盖
+"""
+
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.exam_analytics import ExamAnalytics
+
+try:
+    from backend.app.services.batch_grader import BatchGrader
+except ImportError:
+    # 判分依赖 numpy
+    BatchGrader = None
+
+
+ANSWER_KEY = [
+    {'id': f'q{i}', 'correct_answer': 'ABCD'[i % 4], 'score': 10}
+    for i in range(10)
+]
+QUESTION_IDS = [q['id'] for q in ANSWER_KEY]
+
+
+def make_submissions(count, seed):
+    rng = random.Random(seed)
+    return [
+        {q['id']: rng.choice('ABCD') for q in ANSWER_KEY if rng.random() < 0.9}
+        for _ in range(count)
+    ]
+
+
+def test_incremental_matches_full():
+    """测试增量累加与整体重算一致"""
+    print("\n1. 测试增量累加")
+    print("-" * 60)
+    if BatchGrader is None:
+        print("   [WARN] 未安装 numpy，跳过")
+        return
+
+    grader = BatchGrader(ANSWER_KEY)
+    submissions = make_submissions(120, seed=7)
+    incremental = ExamAnalytics()
+    full = ExamAnalytics()
+
+    async def scenario():
+        await incremental.initialize("paper-1", ["class-1"], QUESTION_IDS)
+        for start in range(0, len(submissions), 25):
+            batch = submissions[start:start + 25]
+            await incremental.apply(
+                grader.analytics_deltas("paper-1", ["class-1"] * len(batch), batch, grader.grade(batch))
+            )
+        deltas = grader.analytics_deltas("paper-1", ["class-1"] * len(submissions), submissions, grader.grade(submissions))
+        await full.replace("paper-1", "class-1", QUESTION_IDS, deltas[0], "")
+        return await incremental.get_summary("paper-1", "class-1"), await full.get_summary("paper-1", "class-1")
+
+    summary, expected = asyncio.run(scenario())
+    scores = grader.grade(submissions).scores
+    first = summary['questions'][0]
+
+    checks = [
+        ("分批累加与整体重算一致", summary == expected),
+        ("已判分人数与平均分", summary['graded_count'] == 120 and summary['average_score'] == round(float(scores.mean()), 2)),
+        ("最高分与最低分", summary['max_score'] == float(scores.max()) and summary['min_score'] == float(scores.min())),
+        ("分数段人数合计", sum(item['count'] for item in summary['score_distribution']) == 120),
+        ("题目保持试卷顺序", [q['question_id'] for q in summary['questions']] == QUESTION_IDS),
+        ("答对、答错、未答人数合计",
+         first['correct_count'] + first['wrong_count'] == 120
+         and first['unanswered_count'] == first['wrong_count'] - sum(a['count'] for a in first['common_wrong_answers'])),
+        ("常见错误答案不含正确答案", all(a['answer'] != 'A' for a in first['common_wrong_answers'])),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_uninitialized():
+    """测试未初始化的统计"""
+    print("\n2. 测试未初始化的统计")
+    print("-" * 60)
+    if BatchGrader is None:
+        print("   [WARN] 未安装 numpy，跳过")
+        return
+
+    grader = BatchGrader(ANSWER_KEY)
+    submissions = make_submissions(5, seed=1)
+    analytics = ExamAnalytics()
+
+    async def scenario():
+        await analytics.apply(grader.analytics_deltas("paper-1", ["class-2"] * 5, submissions, grader.grade(submissions)))
+        missing = await analytics.get_summary("paper-1", "class-2")
+        await analytics.initialize("paper-1", ["class-2"], QUESTION_IDS)
+        return missing, await analytics.get_summary("paper-1", "class-2")
+
+    missing, empty = asyncio.run(scenario())
+
+    checks = [
+        ("未初始化时不累加，交给重建", missing is None),
+        ("初始化后为空统计", empty['graded_count'] == 0 and empty['average_score'] is None),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_idempotent_apply():
+    """测试重复累加"""
+    print("\n3. 测试重复累加")
+    print("-" * 60)
+    if BatchGrader is None:
+        print("   [WARN] 未安装 numpy，跳过")
+        return
+
+    grader = BatchGrader(ANSWER_KEY)
+    submissions = make_submissions(4, seed=3)
+    tokens = [f"t{i}" for i in range(4)]
+    analytics = ExamAnalytics()
+
+    def deltas(rows):
+        batch = [submissions[i] for i in rows]
+        return grader.analytics_deltas(
+            "paper-1", ["class-1"] * len(batch), batch, grader.grade(batch), exam_tokens=[tokens[i] for i in rows]
+        )
+
+    async def scenario():
+        await analytics.initialize("paper-1", ["class-1"], QUESTION_IDS)
+        await analytics.apply(deltas([0, 1]))
+        # 写库后累加失败的重试：同一批答卷再次累加
+        await analytics.apply(deltas([0, 1]))
+        await analytics.apply(deltas([2]))
+        await analytics.apply(deltas([2]))
+        return await analytics.get_summary("paper-1", "class-1")
+
+    summary = asyncio.run(scenario())
+
+    checks = [
+        ("重复的增量被跳过", summary['graded_count'] == 3),
+        ("增量记录答卷 token", deltas([0, 1])[0].exam_tokens == ["t0", "t1"]),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_rebuild_versioning():
+    """测试重建与并发累加"""
+    print("\n4. 测试重建与并发累加")
+    print("-" * 60)
+    if BatchGrader is None:
+        print("   [WARN] 未安装 numpy，跳过")
+        return
+
+    grader = BatchGrader(ANSWER_KEY)
+    submissions = make_submissions(3, seed=5)
+    tokens = ["t0", "t1", "t2"]
+    analytics = ExamAnalytics()
+
+    def deltas(rows):
+        batch = [submissions[i] for i in rows]
+        return grader.analytics_deltas(
+            "paper-1", ["class-1"] * len(batch), batch, grader.grade(batch), exam_tokens=[tokens[i] for i in rows]
+        )
+
+    async def scenario():
+        await analytics.initialize("paper-1", ["class-1"], QUESTION_IDS)
+        await analytics.apply(deltas([0]))
+
+        # 重建读取版本号和数据库之后、替换之前，t1 的增量被累加
+        stale = await analytics.get_version("paper-1", "class-1")
+        await analytics.apply(deltas([1]))
+        conflicted = await analytics.replace("paper-1", "class-1", QUESTION_IDS, deltas([0])[0], stale)
+        after_conflict = await analytics.get_summary("paper-1", "class-1")
+
+        # 重新读取后 t0..t2 均已提交，替换成功
+        version = await analytics.get_version("paper-1", "class-1")
+        replaced = await analytics.replace("paper-1", "class-1", QUESTION_IDS, deltas([0, 1, 2])[0], version)
+        # 已包含在重建中的 t2 的增量迟到
+        await analytics.apply(deltas([2]))
+        return conflicted, after_conflict, replaced, await analytics.get_summary("paper-1", "class-1")
+
+    conflicted, after_conflict, replaced, summary = asyncio.run(scenario())
+
+    checks = [
+        ("期间有累加时不替换", conflicted is False and after_conflict['graded_count'] == 2),
+        ("版本未变时替换", replaced is True),
+        ("重建已包含的答卷的迟到增量被跳过", summary['graded_count'] == 3),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("逐题统计测试")
+    print("=" * 60)
+
+    try:
+        test_incremental_matches_full()
+        test_uninitialized()
+        test_idempotent_apply()
+        test_rebuild_versioning()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+批量发布测试脚本
+验证多个班级一次写入、token 唯一、带时区的截止时间转为本地时间、二维码按批并行渲染且保持顺序
+"""
+
+from datetime import datetime, timedelta, timezone
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.exam_publisher import QrCodeRenderer, create_exams
+from backend.app.services.exam_token_cache import TOKEN_INDEX_GRACE, ExamTokenCache
+
+
+def fake_render_batch(urls):
+    """代替二维码渲染，可在子进程中执行"""
+    return [f"qr:{url}:{os.getpid()}" for url in urls]
+
+
+class FakeRepository:
+    """记录写入语句的次数"""
+
+    def __init__(self, students):
+        self.students = students
+        self.inserts = []
+        self.deadlines = []
+
+    def get_students_by_classes(self, class_ids):
+        return [s for s in self.students if s['class_id'] in class_ids]
+
+    def create_exams(self, paper_id, class_ids, name, deadline, duration, created_by):
+        self.inserts.append(('exams', len(class_ids)))
+        self.deadlines.append(deadline)
+        return {class_id: f"exam-{class_id}" for class_id in class_ids}
+
+    def bulk_create_student_exams(self, rows):
+        self.inserts.append(('student_exams', len(rows)))
+        return {row['exam_token']: f"se-{i}" for i, row in enumerate(rows)}
+
+    def mark_paper_published(self, paper_id):
+        self.inserts.append(('papers', 1))
+
+
+def test_create_exams():
+    """测试多班级批量写入"""
+    print("\n1. 测试批量写入")
+    print("-" * 60)
+
+    students = [
+        {'id': f"s{i}", 'name': f"学生{i}", 'class_id': f"c{i % 3}"}
+        for i in range(90)
+    ]
+    repository = FakeRepository(students)
+    published = create_exams(
+        repository, {'id': 'paper-1', 'name': '期中测试'}, ['c0', 'c1', 'c2'],
+        deadline=datetime(2026, 6, 1, 10, 0), duration=2400, name=None,
+        created_by='teacher-1', exam_base_url='http://exam.local'
+    )
+    tokens = list(published.token_contexts)
+
+    checks = [
+        ("每张表只写入一次", repository.inserts == [('exams', 3), ('student_exams', 90), ('papers', 1)]),
+        ("每个学生一个链接", len(published.links) == 90),
+        ("token 唯一", len(set(tokens)) == 90),
+        ("链接指向所在班级的考试", all(link['exam_id'] == f"exam-{link['class_id']}" for link in published.links)),
+        ("token 上下文可直接写入缓存",
+         published.token_contexts[tokens[0]]['student_exam_id'] == 'se-0'
+         and published.token_contexts[tokens[0]]['status'] == 'pending'),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+class FakeRedis:
+    """记录 token 上下文写入 Redis 时的过期时间"""
+
+    def __init__(self):
+        self.expire_at = {}
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def set(self, key, value, exat=None):
+        self.expire_at[key] = exat
+
+    async def execute(self):
+        return []
+
+    async def get(self, key):
+        return None
+
+
+def test_aware_deadline():
+    """测试带时区的截止时间"""
+    print("\n2. 测试带时区的截止时间")
+    print("-" * 60)
+
+    # 客户端提交 ISO 字符串带 Z，pydantic 解析为带时区的 datetime
+    aware = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(hours=1)
+    local = aware.astimezone().replace(tzinfo=None)
+    repository = FakeRepository([{'id': 's0', 'name': '学生0', 'class_id': 'c0'}])
+    published = create_exams(
+        repository, {'id': 'paper-1', 'name': '期中测试'}, ['c0'],
+        deadline=aware, duration=None, name=None,
+        created_by='teacher-1', exam_base_url='http://exam.local'
+    )
+    token = next(iter(published.token_contexts))
+    redis = FakeRedis()
+    cache = ExamTokenCache(redis_client=redis)
+
+    async def scenario():
+        await cache.put_many(published.token_contexts)
+        return await cache.get(token, lambda: None)
+
+    context = asyncio.run(scenario())
+    try:
+        # 交卷时与 datetime.now() 比较
+        comparable = datetime.now() < context['deadline']
+    except TypeError:
+        comparable = False
+
+    checks = [
+        ("写入数据库的是本地时间", repository.deadlines == [local]),
+        ("缓存上下文可与当前时间比较", comparable and context['deadline'] == local),
+        ("缓存在截止后按时过期",
+         redis.expire_at[f"exam_token:{token}"] == int((aware + TOKEN_INDEX_GRACE).timestamp())),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_qr_rendering():
+    """测试二维码分批渲染"""
+    print("\n3. 测试二维码渲染")
+    print("-" * 60)
+
+    urls = [f"http://exam.local/exam/{i}" for i in range(100)]
+
+    async def scenario(renderer):
+        chunks = [chunk async for chunk in renderer.render_chunks(urls)]
+        return chunks, await renderer.render(urls[:5])
+
+    in_thread = QrCodeRenderer(max_workers=0, chunk_size=32, render_batch=fake_render_batch)
+    chunks, small = asyncio.run(scenario(in_thread))
+
+    in_processes = QrCodeRenderer(max_workers=2, chunk_size=10, render_batch=fake_render_batch)
+    try:
+        process_chunks, _ = asyncio.run(scenario(in_processes))
+    finally:
+        in_processes.shutdown()
+    rendered = [qr for chunk in process_chunks for qr in chunk]
+
+    checks = [
+        ("按批产出", [len(chunk) for chunk in chunks] == [32, 32, 32, 4]),
+        ("小批量直接返回列表", len(small) == 5),
+        ("进程池结果保持顺序", [qr[len("qr:"):].rsplit(':', 1)[0] for qr in rendered] == urls),
+        ("在子进程中渲染", all(not qr.endswith(f":{os.getpid()}") for qr in rendered)),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("批量发布测试")
+    print("=" * 60)
+
+    try:
+        test_create_exams()
+        test_aware_deadline()
+        test_qr_rendering()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+答题 token 上下文缓存测试脚本
+验证发布时写入后不再查库、状态变化后失效、容量上限
+"""
+
+from datetime import datetime
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.exam_token_cache import ExamTokenCache
+
+
+def make_context(status="pending"):
+    return {
+        "student_exam_id": "se-1",
+        "exam_id": "exam-1",
+        "student_id": "student-1",
+        "student_name": "张三",
+        "paper_id": "paper-1",
+        "class_id": "class-1",
+        "deadline": datetime(2026, 6, 1, 10, 0),
+        "duration": 2400,
+        "status": status,
+        "answers": {"q1": "A"},
+    }
+
+
+class FakeRepository:
+    """记录查库次数"""
+
+    def __init__(self):
+        self.queries = 0
+        self.status = "pending"
+
+    def loader(self, exam_token):
+        def load():
+            self.queries += 1
+            return make_context(self.status) if exam_token.startswith("token") else None
+        return load
+
+
+def test_publish_and_invalidate():
+    """测试发布写入与状态失效"""
+    print("\n1. 测试发布写入与失效")
+    print("-" * 60)
+
+    repository = FakeRepository()
+    cache = ExamTokenCache()
+
+    async def scenario():
+        await cache.put_many({"token-a": make_context()})
+        first = await cache.get("token-a", repository.loader("token-a"))
+        queries_after_publish = repository.queries
+
+        repository.status = "submitted"
+        await cache.invalidate(["token-a"])
+        reloaded = await cache.get("token-a", repository.loader("token-a"))
+        cached = await cache.get("token-a", repository.loader("token-a"))
+
+        invalid = await cache.get("bad", repository.loader("bad"))
+        return first, queries_after_publish, reloaded, cached, invalid
+
+    first, queries_after_publish, reloaded, cached, invalid = asyncio.run(scenario())
+
+    checks = [
+        ("发布后直接命中缓存", queries_after_publish == 0 and first["paper_id"] == "paper-1"),
+        ("只缓存不变字段和状态", "answers" not in first and first["deadline"] == datetime(2026, 6, 1, 10, 0)),
+        ("失效后重新查库", reloaded["status"] == "submitted"),
+        ("查库结果回填缓存", cached is reloaded and repository.queries == 2),
+        ("无效 token 返回 None", invalid is None),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_capacity():
+    """测试容量上限"""
+    print("\n2. 测试容量上限")
+    print("-" * 60)
+
+    repository = FakeRepository()
+    cache = ExamTokenCache(memory_items=2)
+
+    async def scenario():
+        await cache.put_many({f"token-{i}": make_context() for i in range(3)})
+        await cache.get("token-2", repository.loader("token-2"))
+        await cache.get("token-0", repository.loader("token-0"))
+
+    asyncio.run(scenario())
+
+    passed = repository.queries == 1
+    print(f"   {'[PASS]' if passed else '[FAIL]'} 超出容量时淘汰最久未用的条目")
+    assert passed
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("答题 token 上下文缓存测试")
+    print("=" * 60)
+
+    try:
+        test_publish_and_invalidate()
+        test_capacity()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+JSON编码测试脚本
+验证快速编码与默认路径（jsonable_encoder + json）输出一致，已安装的各编码后端输出逐字节相同
+"""
+
+import json
+import os
+import sys
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.core.json_codec import JSON_BACKEND, _convert_decimals, _default, dumps
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class Difficulty(str, Enum):
+    EASY = "easy"
+
+
+def test_types():
+    """测试常见类型的编码"""
+    print(f"\n1. 测试类型编码（{JSON_BACKEND}）")
+    print("-" * 60)
+
+    question_id = uuid.UUID("12345678-1234-5678-1234-567812345678")
+    content = {
+        "id": question_id,
+        "created_at": datetime(2026, 3, 1, 8, 30, 15),
+        "difficulty": Difficulty.EASY,
+        "accuracy": Decimal("87.50"),
+        "score": Decimal("2"),
+        "content": "汤姆有一只小狗",
+        "options": ("A", "B"),
+    }
+    decoded = json.loads(dumps(content))
+
+    checks = [
+        ("UUID 转为字符串", decoded["id"] == str(question_id)),
+        ("datetime 转为 ISO 格式", decoded["created_at"] == "2026-03-01T08:30:15"),
+        ("枚举取值", decoded["difficulty"] == "easy"),
+        ("Decimal 转为数字", decoded["accuracy"] == 87.5 and decoded["score"] == 2),
+        ("中文不转义", "汤姆".encode("utf-8") in dumps(content)),
+        ("元组转为列表", decoded["options"] == ["A", "B"]),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def backend_encoders():
+    """已安装的各编码后端，与 json_codec 中的配置相同"""
+    yield "json", lambda content: json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+    if orjson is not None:
+        yield "orjson", lambda content: orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    if msgspec is not None:
+        encoder = msgspec.json.Encoder(enc_hook=_default)
+        yield "msgspec", lambda content: encoder.encode(_convert_decimals(content))
+
+
+def test_decimals():
+    """测试 Decimal 的编码"""
+    print("\n2. 测试 Decimal 编码")
+    print("-" * 60)
+
+    content = {
+        "score": Decimal("80.00"),
+        "total": Decimal("100"),
+        "rate": Decimal("87.50"),
+        "scaled": Decimal("8E+1"),
+        "nested": [{"score": Decimal("0.5")}, (Decimal("3"),)],
+    }
+    outputs = {name: encode(content) for name, encode in backend_encoders()}
+    expected = b'{"score":80.0,"total":100,"rate":87.5,"scaled":80,"nested":[{"score":0.5},[3]]}'
+
+    checks = [
+        ("与 jsonable_encoder 相同：有小数位时输出浮点数", outputs["json"] == expected),
+        (f"各后端输出相同（{', '.join(outputs)}）", all(output == expected for output in outputs.values())),
+        ("当前后端输出相同", dumps(content) == expected),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("JSON编码测试")
+    print("=" * 60)
+
+    try:
+        test_types()
+        test_decimals()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
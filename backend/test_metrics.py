@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+监控指标测试脚本
+验证 Prometheus 文本输出、直方图分桶，请求中间件按路由模板记录延迟和SQL开销，以及多 worker 时汇总各进程写入共享目录的指标
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.core.metrics import (
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    current_request_stats,
+)
+from backend.app.core.metrics_middleware import MetricsMiddleware
+from backend.app.core.metrics_multiprocess import MultiprocessMetrics
+
+
+def test_render():
+    """测试文本格式输出"""
+    print("\n1. 测试指标文本输出")
+    print("-" * 60)
+
+    registry = MetricsRegistry()
+    counter = Counter("demo_total", "示例计数", ("kind",), registry=registry)
+    histogram = Histogram("demo_seconds", "示例耗时", buckets=(0.1, 1.0), registry=registry)
+    counter.labels("a").inc()
+    counter.labels("a").inc(2)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    text = registry.render()
+    checks = [
+        ("计数器带标签输出", 'demo_total{kind="a"} 3' in text),
+        ("分桶上界包含等于边界的值", 'demo_seconds_bucket{le="0.1"} 2' in text),
+        ("分桶累计", 'demo_seconds_bucket{le="1"} 3' in text),
+        ("+Inf 桶等于总数", 'demo_seconds_bucket{le="+Inf"} 4' in text and "demo_seconds_count 4" in text),
+        ("包含 TYPE 声明", "# TYPE demo_seconds histogram" in text),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+class FakeRoute:
+    path = "/exam/{exam_token}"
+
+
+async def fake_app(scope, receive, send):
+    """模拟路由命中后执行两条SQL的接口"""
+    scope["route"] = FakeRoute()
+    stats = current_request_stats.get()
+    stats.db_queries += 2
+    stats.db_seconds += 0.004
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def call(app, path):
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+def test_middleware():
+    """测试请求中间件"""
+    print("\n2. 测试请求指标中间件")
+    print("-" * 60)
+
+    app = MetricsMiddleware(fake_app)
+    for token in ("token-a", "token-b", "token-c"):
+        asyncio.run(call(app, f"/exam/{token}"))
+
+    text = REGISTRY.render()
+    checks = [
+        ("按路由模板聚合", 'http_requests_total{method="GET",route="/exam/{exam_token}",status="200"} 3' in text),
+        ("原始路径不进入标签", "token-a" not in text),
+        ("记录请求耗时", 'http_request_duration_seconds_count{method="GET",route="/exam/{exam_token}"} 3' in text),
+        ("记录每请求SQL条数", 'http_request_db_queries_bucket{route="/exam/{exam_token}",le="2"} 3' in text),
+        ("在途请求数归零", "http_requests_in_flight 0" in text),
+        ("请求结束后清理上下文", current_request_stats.get() is None),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def worker_registry():
+    """与各 worker 进程中相同的一组指标"""
+    registry = MetricsRegistry()
+    requests = Counter("demo_requests_total", "示例请求数", ("route",), registry=registry)
+    in_flight = Gauge("demo_in_flight", "示例在途请求数", registry=registry)
+    latency = Histogram("demo_seconds", "示例耗时", buckets=(0.1, 1.0), registry=registry)
+    return registry, requests, in_flight, latency
+
+
+def test_multiprocess():
+    """测试多 worker 指标汇总"""
+    print("\n3. 测试多 worker 汇总")
+    print("-" * 60)
+
+    # 已退出的进程号和一个仍在运行的进程号
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    workers = [(os.getpid(), 3, 1, 0.05), (os.getppid(), 2, 4, 0.5), (exited.pid, 5, 7, 3.0)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        collectors = []
+        for pid, requests_count, in_flight_count, duration in workers:
+            registry, requests, in_flight, latency = worker_registry()
+            requests.labels("/exam/{exam_token}").inc(requests_count)
+            in_flight.set(in_flight_count)
+            latency.observe(duration)
+            collectors.append(MultiprocessMetrics(directory, registry, pid=pid))
+        for collector in collectors[1:]:
+            collector.flush()
+
+        # 当前进程的数据在抓取时取实时值，不需要先写入
+        registry = collectors[0].registry
+        registry._metrics["demo_requests_total"].labels("/exam/{exam_token}").inc()
+        text = collectors[0].render()
+        files = sorted(os.listdir(directory))
+
+    checks = [
+        ("计数器为所有 worker 之和（含已退出的）", 'demo_requests_total{route="/exam/{exam_token}"} 11' in text),
+        ("仪表盘只计运行中的 worker", "demo_in_flight 5" in text),
+        ("直方图分桶相加", 'demo_seconds_bucket{le="0.1"} 1' in text and 'demo_seconds_bucket{le="+Inf"} 3' in text),
+        ("每个 worker 一个文件，不残留临时文件", files == sorted(f"{pid}.json" for pid, *_ in workers[1:])),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("监控指标测试")
+    print("=" * 60)
+
+    try:
+        test_render()
+        test_middleware()
+        test_multiprocess()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
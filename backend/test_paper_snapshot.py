@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+试卷快照测试脚本
+验证快照去除答案、字节稳定、压缩可还原、重复发布不改变快照、修改题目后重建、
+音频转码完成后只重建已发布的试卷，以及无Redis时的磁盘存储
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.paper_snapshot_service import PaperSnapshotService
+
+
+class FakeExamAudioService:
+    """只返回固定音频清单的替身"""
+
+    def __init__(self):
+        self.built = 0
+        self.rendition = "original"
+
+    async def get_manifest(self, paper_id):
+        return None
+
+    async def build_manifest(self, paper_id, questions):
+        self.built += 1
+        files = [{"url": f"/api/audio/a.wav?rendition={self.rendition}"}] if self.rendition == "original" else [
+            {"url": "/api/audio/a.wav"}
+        ]
+        return {"paper_id": str(paper_id), "total_bytes": 0, "files": files}
+
+
+def make_questions(content):
+    return [{
+        "id": "q-1",
+        "type": "single_choice",
+        "content": content,
+        "options": ["A. cat", "B. dog"],
+        "audio_file_id": None,
+        "reading_material": None,
+        "score": 2,
+        "correct_answer": "A",
+    }]
+
+
+def test_snapshot():
+    """测试快照生成与读取"""
+    print("\n1. 测试试卷快照")
+    print("-" * 60)
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        service = PaperSnapshotService(FakeExamAudioService(), snapshot_dir=snapshot_dir)
+
+        async def scenario():
+            first = await service.build_snapshot("paper-1", make_questions("Which is a pet?"))
+            frozen = await service.build_snapshot("paper-1", make_questions("已修改的题目"))
+
+            reloaded = PaperSnapshotService(FakeExamAudioService(), snapshot_dir=snapshot_dir)
+            from_disk = await reloaded.get_snapshot("paper-1")
+            return first, frozen, from_disk
+
+        first, frozen, from_disk = asyncio.run(scenario())
+        payload = json.loads(first.body)
+        rerendered = PaperSnapshotService.render("paper-1", make_questions("Which is a pet?"), payload["audio_manifest"])
+
+        checks = [
+            ("快照不含正确答案", "correct_answer" not in payload["questions"][0] and b'"A"' not in first.body),
+            ("保留题目与音频清单", payload["questions"][0]["options"] == ["A. cat", "B. dog"] and "audio_manifest" in payload),
+            ("gzip 可还原为原始字节", gzip.decompress(first.gzip_body) == first.body),
+            ("相同输入字节完全一致", rerendered == first),
+            ("发布后内容冻结", frozen is first),
+            ("重启后从磁盘读取", from_disk == first),
+            ("压缩与未压缩的 ETag 不同", first.gzip_etag != first.etag and first.gzip_etag.endswith('-gz"')),
+        ]
+        for name, passed in checks:
+            print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+        assert all(passed for _, passed in checks)
+
+
+def test_rebuild():
+    """测试修改题目后重建快照"""
+    print("\n2. 测试快照重建")
+    print("-" * 60)
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        audio = FakeExamAudioService()
+        service = PaperSnapshotService(audio, snapshot_dir=snapshot_dir)
+        other_worker = PaperSnapshotService(FakeExamAudioService(), snapshot_dir=snapshot_dir, memory_ttl=0)
+
+        async def scenario():
+            first = await service.build_snapshot("paper-1", make_questions("Which is a pet?"))
+            stale = await other_worker.get_snapshot("paper-1")
+            rebuilt = await service.rebuild_snapshot("paper-1", make_questions("Which one can fly?"))
+            return first, stale, rebuilt, await service.get_snapshot("paper-1"), await other_worker.get_snapshot("paper-1")
+
+        first, stale, rebuilt, current, seen_by_other = asyncio.run(scenario())
+
+    checks = [
+        ("重建后内容更新", json.loads(rebuilt.body)["questions"][0]["content"] == "Which one can fly?"),
+        ("重建时重新生成音频清单", audio.built == 2),
+        ("ETag 随内容变化", rebuilt.etag != first.etag),
+        ("本进程读到新快照", current == rebuilt),
+        ("缓存过期后其他进程读到新快照", stale == first and seen_by_other == rebuilt),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_rebuild_published():
+    """测试音频转码完成后重建已发布的试卷"""
+    print("\n3. 测试转码完成后重建")
+    print("-" * 60)
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        audio = FakeExamAudioService()
+        service = PaperSnapshotService(audio, snapshot_dir=snapshot_dir)
+        loaded = []
+
+        def load_questions(paper_id):
+            loaded.append(paper_id)
+            return make_questions("Listen and choose.")
+
+        async def scenario():
+            # 发布时音频还没有 compact 版本，清单指向原文件
+            published = await service.build_snapshot("paper-1", make_questions("Listen and choose."))
+            audio.rendition = "compact"
+            rebuilt = await service.rebuild_published(["paper-1", "paper-2"], load_questions)
+            return published, rebuilt, await service.get_snapshot("paper-1"), await service.get_snapshot("paper-2")
+
+        published, rebuilt, current, unpublished = asyncio.run(scenario())
+
+    def urls(snapshot):
+        return [f["url"] for f in json.loads(snapshot.body)["audio_manifest"]["files"]]
+
+    checks = [
+        ("发布时指向原文件", urls(published) == ["/api/audio/a.wav?rendition=original"]),
+        ("只重建已发布的试卷", rebuilt == 1 and loaded == ["paper-1"] and unpublished is None),
+        ("重建后指向 compact 版本", urls(current) == ["/api/audio/a.wav"] and current.etag != published.etag),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("试卷快照测试")
+    print("=" * 60)
+
+    try:
+        test_snapshot()
+        test_rebuild()
+        test_rebuild_published()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
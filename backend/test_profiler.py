@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+采样分析测试脚本
+验证被标记请求的调用栈（运行中与await挂起）被采到、结果按服务端生成的采样ID保存，以及未启用时直接透传
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.core.profiler import AWAIT_MARKER, ProfileStore
+from backend.app.core.profiling_middleware import ProfilingMiddleware
+
+
+def busy_generate_paper(seconds):
+    """模拟组卷的CPU密集部分"""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+async def slow_endpoint(scope, receive, send):
+    busy_generate_paper(0.08)
+    await asyncio.sleep(0.08)  # 模拟等待数据库
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def call(app, headers):
+    scope = {"type": "http", "method": "POST", "path": "/papers/generate",
+             "query_string": b"", "headers": headers}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+def test_profile_by_token():
+    """测试令牌触发的采样"""
+    print("\n1. 测试令牌触发采样")
+    print("-" * 60)
+
+    store = ProfileStore()
+    app = ProfilingMiddleware(slow_endpoint, token="secret", interval=0.002, store=store)
+    headers = [(b"x-profile-token", b"secret"), (b"x-request-id", b"req-42")]
+    messages = asyncio.run(call(app, headers))
+    profile_ids = [value.decode() for name, value in messages[0]["headers"] if name == b"x-profile-id"]
+    profile = asyncio.run(store.get(profile_ids[0])) if profile_ids else None
+    # 客户端传入的请求ID不能成为存储键，否则可以覆盖已有的采样结果
+    forged = asyncio.run(call(app, [(b"x-profile-token", b"secret"), (b"x-request-id", profile_ids[0].encode())]))
+    forged_ids = [value.decode() for name, value in forged[0]["headers"] if name == b"x-profile-id"]
+
+    collapsed = profile["collapsed"] if profile else ""
+    checks = [
+        ("响应头返回服务端生成的采样ID", len(profile_ids) == 1 and len(profile_ids[0]) == 32),
+        ("按采样ID保存", profile is not None and profile["path"] == "/papers/generate"),
+        ("客户端请求ID只作为关联字段", asyncio.run(store.get("req-42")) is None and profile["request_id"] == "req-42"),
+        ("传入已有ID不会覆盖", forged_ids[0] != profile_ids[0] and asyncio.run(store.get(profile_ids[0])) == profile),
+        ("采到CPU密集函数", "busy_generate_paper" in collapsed),
+        ("采到await等待", AWAIT_MARKER in collapsed),
+        ("折叠栈格式", all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.splitlines())),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_not_selected():
+    """测试未触发与未启用"""
+    print("\n2. 测试未触发时透传")
+    print("-" * 60)
+
+    store = ProfileStore()
+    wrong_token = ProfilingMiddleware(slow_endpoint, token="secret", store=store)
+    messages = asyncio.run(call(wrong_token, [(b"x-profile-token", b"guess"), (b"x-request-id", b"req-1")]))
+    disabled = ProfilingMiddleware(slow_endpoint, store=store)
+
+    checks = [
+        ("令牌错误不采样", asyncio.run(store.get("req-1")) is None),
+        ("令牌错误不加响应头", all(name != b"x-profile-id" for name, _ in messages[0]["headers"])),
+        ("未配置时关闭", disabled.enabled is False),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("采样分析测试")
+    print("=" * 60)
+
+    try:
+        test_profile_by_token()
+        test_not_selected()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+限流测试脚本
+验证令牌桶的突发与补充、多桶原子扣减、Redis故障时退化为进程内限流，中间件的429响应和开销，
+以及按验证过的令牌和可信代理识别客户端、按路由模板和 exam_token 计的路由预算
+"""
+
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+from starlette.routing import Route
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.core.rate_limit import LocalRateLimiter, RedisRateLimiter
+from backend.app.core.rate_limit_middleware import RateLimitMiddleware
+
+try:
+    import jwt
+except ImportError:
+    jwt = None
+
+
+def test_token_bucket():
+    """测试令牌桶"""
+    print("\n1. 测试令牌桶")
+    print("-" * 60)
+
+    limiter = LocalRateLimiter()
+    bucket = [("user:a", 2.0, 3.0)]
+    burst = [limiter.acquire_now(bucket, 100.0) for _ in range(4)]
+    refilled = limiter.acquire_now(bucket, 100.5)
+
+    # IP桶已空时，路由桶不应被扣减
+    limiter.acquire_now([("ip:x", 1.0, 1.0)], 100.0)
+    limiter.acquire_now([("ip:x", 1.0, 1.0), ("route:y", 1.0, 1.0)], 100.0)
+    route_untouched = limiter.acquire_now([("route:y", 1.0, 1.0)], 100.0) == 0
+
+    checks = [
+        ("桶容量内全部放行", burst[:3] == [0, 0, 0]),
+        ("超出容量给出重试时间", abs(burst[3] - 0.5) < 1e-9),
+        ("按速率补充", refilled == 0),
+        ("多桶全有余量才扣减", route_untouched),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+class BrokenRedis:
+    """注册脚本成功、执行即失败的 Redis 替身"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def register_script(self, script):
+        async def run(keys, args):
+            self.calls += 1
+            raise ConnectionError("redis down")
+        return run
+
+
+def test_redis_fallback():
+    """测试Redis故障退化"""
+    print("\n2. 测试Redis不可用时退化")
+    print("-" * 60)
+
+    redis_client = BrokenRedis()
+    limiter = RedisRateLimiter(redis_client, retry_interval=60)
+    results = [asyncio.run(limiter.acquire([("ip:z", 1.0, 2.0)])) for _ in range(3)]
+
+    checks = [
+        ("退化为进程内限流", results[:2] == [0, 0] and results[2] > 0),
+        ("熔断期内不再访问Redis", redis_client.calls == 1),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+async def ok_endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+# 限流中间件从 scope["app"] 的路由表中取得路由模板和路径参数
+ROUTER_APP = SimpleNamespace(router=SimpleNamespace(routes=[
+    Route("/api/exam/{exam_token}", ok_endpoint),
+    Route("/api/exam/{exam_token}/save-progress", ok_endpoint, methods=["POST"]),
+    Route("/api/questions/{question_id}", ok_endpoint),
+]))
+
+
+async def call(app, path, headers=(), client="10.0.0.8", method="GET"):
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"",
+             "headers": list(headers), "client": (client, 5000), "app": ROUTER_APP}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+def test_middleware():
+    """测试限流中间件"""
+    print("\n3. 测试限流中间件")
+    print("-" * 60)
+
+    app = RateLimitMiddleware(
+        ok_endpoint,
+        routes={"/api/exam": [0.5, 2]},
+        ip_rate=1000, ip_burst=1000,
+        limiter=LocalRateLimiter()
+    )
+
+    async def scenario():
+        polling = [(await call(app, "/api/exam/token-a"))[0] for _ in range(3)]
+        classmate = (await call(app, "/api/exam/token-b"))[0]
+        return polling, classmate
+
+    polling, classmate = asyncio.run(scenario())
+    retry_after = dict(polling[2]["headers"]).get(b"retry-after")
+
+    async def timed(iterations):
+        fast = RateLimitMiddleware(
+            ok_endpoint, routes={"/api/questions": [1e9, 1e9]},
+            ip_rate=1e9, ip_burst=1e9, limiter=LocalRateLimiter()
+        )
+        headers = [(b"authorization", b"Bearer abc.def.ghi"), (b"x-real-ip", b"10.1.2.3")]
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await call(fast, "/api/questions/", headers)
+        with_limit = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await call(ok_endpoint, "/api/questions/", headers)
+        return (with_limit - (time.perf_counter() - start)) / iterations * 1e6
+
+    overhead_us = asyncio.run(timed(5000))
+
+    checks = [
+        ("容量内放行", [m["status"] for m in polling[:2]] == [200, 200]),
+        ("持续轮询返回429", polling[2]["status"] == 429 and retry_after == b"2"),
+        ("同一IP下的其他学生不受影响", classmate["status"] == 200),
+        (f"单请求额外开销 {overhead_us:.1f}µs < 100µs", overhead_us < 100),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_client_identity():
+    """测试客户端识别"""
+    print("\n4. 测试客户端识别")
+    print("-" * 60)
+
+    def ip_limited(**kwargs):
+        return RateLimitMiddleware(ok_endpoint, ip_rate=0.001, ip_burst=1, limiter=LocalRateLimiter(), **kwargs)
+
+    def route_limited():
+        return RateLimitMiddleware(
+            ok_endpoint, routes={"/api/questions": [0.001, 1]}, ip_rate=1000, ip_burst=1000,
+            secret_key="test-secret", limiter=LocalRateLimiter()
+        )
+
+    async def statuses(app, requests):
+        return [(await call(app, "/api/questions/", headers, client))[0]["status"] for headers, client in requests]
+
+    def real_ip(ip):
+        return [(b"x-real-ip", ip.encode())]
+
+    def bearer(token):
+        return [(b"authorization", b"Bearer " + token.encode())]
+
+    async def scenario():
+        # 直连客户端伪造 X-Real-IP 不能换出新的IP桶
+        forged = await statuses(ip_limited(), [(real_ip("1.1.1.1"), "10.0.0.8"), (real_ip("2.2.2.2"), "10.0.0.8")])
+        proxied = await statuses(
+            ip_limited(trusted_proxies=["172.18.0.0/16"]),
+            [(real_ip("1.1.1.1"), "172.18.0.5"), (real_ip("2.2.2.2"), "172.18.0.5"), (real_ip("1.1.1.1"), "172.18.0.5")]
+        )
+        # 验证失败的令牌按 IP + 路径计
+        unverified = await statuses(route_limited(), [(bearer("a.b.c"), "10.0.0.8"), (bearer("d.e.f"), "10.0.0.8")])
+        verified = None
+        if jwt is not None:
+            def token(sub, nonce):
+                return jwt.encode({"sub": sub, "n": nonce}, "test-secret", algorithm="HS256")
+            verified = await statuses(route_limited(), [
+                (bearer(token("teacher-1", 1)), "10.0.0.8"),
+                (bearer(token("teacher-2", 1)), "10.0.0.8"),
+                (bearer(token("teacher-1", 2)), "10.0.0.8"),
+            ])
+        return forged, proxied, unverified, verified
+
+    forged, proxied, unverified, verified = asyncio.run(scenario())
+    checks = [
+        ("忽略直连客户端的 X-Real-IP", forged == [200, 429]),
+        ("采用可信代理转发的 X-Real-IP", proxied == [200, 200, 429]),
+        ("未验证的令牌不单独计", unverified == [200, 429]),
+    ]
+    if verified is None:
+        print("   [WARN] 未安装 PyJWT，跳过按用户计的检查")
+    else:
+        checks.append(("按令牌中的用户计", verified == [200, 200, 429]))
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_route_keys():
+    """测试路由预算的计数键与按IP预算的豁免"""
+    print("\n5. 测试路由模板与豁免")
+    print("-" * 60)
+
+    app = RateLimitMiddleware(
+        ok_endpoint,
+        routes={"/api/questions": [0.001, 1], "/api/exam": [0.001, 1]},
+        ip_rate=0.001, ip_burst=3, ip_exempt=["/api/audio"],
+        limiter=LocalRateLimiter()
+    )
+
+    async def statuses(requests):
+        return [(await call(app, path, method=method))[0]["status"] for path, method in requests]
+
+    async def scenario():
+        # 匿名请求换一个路径参数不能拿到新的路由桶
+        questions = await statuses([("/api/questions/q-1", "GET"), ("/api/questions/q-2", "GET")])
+        # 同一学生的不同答题接口共用按 exam_token 计的桶，同一IP下的其他学生另计
+        exam = await statuses([
+            ("/api/exam/token-a/save-progress", "POST"), ("/api/exam/token-a", "GET"), ("/api/exam/token-b", "GET")
+        ])
+        # 按IP的预算此时已用完，音频不计入
+        audio = await statuses([("/api/audio/" + "a" * 64 + ".mp3", "GET") for _ in range(20)])
+        exhausted = await statuses([("/api/exam/token-c", "GET")])
+        return questions, exam, audio, exhausted
+
+    questions, exam, audio, exhausted = asyncio.run(scenario())
+    checks = [
+        ("匿名请求按路由模板计", questions == [200, 429]),
+        ("答题接口按 exam_token 计", exam == [200, 429, 200]),
+        ("音频不计入按IP的预算", set(audio) == {200}),
+        ("其他路由仍受按IP的预算限制", exhausted == [429]),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("限流测试")
+    print("=" * 60)
+
+    try:
+        test_token_bucket()
+        test_redis_fallback()
+        test_middleware()
+        test_client_identity()
+        test_route_keys()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+成绩报表导出测试脚本
+验证流式写出的报表内容、存储布局的文件名、同一秒内的多次导出互不覆盖、
+后台任务的进度和失败状态，以及过期报表的清理
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from openpyxl import load_workbook
+    from backend.app.services.report_export import (
+        STATUS_DONE, STATUS_FAILED, ReportExportService, report_filename, write_report
+    )
+except ImportError:
+    # 报表依赖 openpyxl，判对错依赖 numpy
+    load_workbook = None
+
+
+ANSWER_KEY = [
+    {'id': 'q1', 'correct_answer': 'A', 'score': 50},
+    {'id': 'q2', 'correct_answer': 'apple', 'score': 50}
+]
+
+
+def make_results(count):
+    for i in range(count):
+        yield {
+            'student_number': f"S{i:04d}",
+            'name': f"学生{i}",
+            'status': 'submitted' if i % 3 else 'pending',
+            'score': 50.0 if i % 3 else None,
+            'time_spent': 600 if i % 3 else None,
+            'submitted_at': datetime(2026, 6, 1, 9, 30) if i % 3 else None,
+            'answers': {'q1': 'A', 'q2': ' Apple '} if i % 2 else {'q1': 'B'}
+        }
+
+
+def test_write_report():
+    """测试报表内容"""
+    print("\n1. 测试报表写出")
+    print("-" * 60)
+    if load_workbook is None:
+        print("   [WARN] 未安装 openpyxl 或 numpy，跳过")
+        return
+
+    analysis = {'questions': [
+        {'question_id': 'q1', 'correct_count': 5, 'wrong_count': 5, 'unanswered_count': 0,
+         'correct_rate': 50.0, 'common_wrong_answers': [{'answer': 'B', 'count': 5}]}
+    ]}
+    progress = []
+    with tempfile.TemporaryDirectory() as export_dir:
+        path = os.path.join(export_dir, "report.xlsx")
+        written = write_report(path, ANSWER_KEY, make_results(10), analysis, progress.append, progress_every=4)
+        workbook = load_workbook(path)
+        results = list(workbook["成绩"].values)
+        details = list(workbook["答题明细"].values)
+        questions = list(workbook["逐题分析"].values)
+        leftovers = os.listdir(export_dir)
+        workbook.close()
+
+    checks = [
+        ("写出学生数", written == 10 and len(results) == 11),
+        ("成绩行", results[2] == ("S0001", "学生1", "已交卷", 50, 600, datetime(2026, 6, 1, 9, 30))),
+        ("未交卷学生没有得分", results[1][2] == "未开始" and results[1][3] is None),
+        ("答案按规范化后判对错", details[3][2:] == ("A ✓", " Apple  ✓", 2)),
+        ("错误与未作答", details[2][2:] == ("B ✗", None, 0)),
+        ("逐题分析", questions[1] == (1, 5, 5, 0, 50, "B（5人）")),
+        ("按间隔上报进度", progress == [4, 8]),
+        ("不残留临时文件", leftovers == ["report.xlsx"]),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_export_jobs():
+    """测试后台导出任务"""
+    print("\n2. 测试导出任务")
+    print("-" * 60)
+    if load_workbook is None:
+        print("   [WARN] 未安装 openpyxl 或 numpy，跳过")
+        return
+
+    def build_report(path, paper_id, class_id, analysis, progress):
+        if paper_id == "broken":
+            raise RuntimeError("database unavailable")
+        return write_report(path, ANSWER_KEY, make_results(30), analysis, progress, progress_every=10)
+
+    with tempfile.TemporaryDirectory() as root:
+        export_dir = os.path.join(root, "reports")
+        service = ReportExportService(export_dir, build_report, max_workers=1)
+
+        async def scenario():
+            job = await service.start("paper-1", "class-1", total=30)
+            started = dict(job)
+            # 同一秒内再次导出同一班级试卷
+            again = await service.start("paper-1", "class-1", total=30)
+            await service.wait(job['job_id'])
+            await service.wait(again['job_id'])
+            done = await service.get_job(job['job_id'])
+            failed = await service.start("broken", "class-1", total=30)
+            await service.wait(failed['job_id'])
+            return started, done, await service.get_job(again['job_id']), await service.get_job(failed['job_id'])
+
+        started, done, again, failed = asyncio.run(scenario())
+        path = service.report_path(done['filename'])
+        exists = os.path.exists(path) and os.path.exists(service.report_path(again['filename']))
+        files = sorted(os.listdir(export_dir))
+
+    expected_name = report_filename("class-1", "paper-1", datetime(2026, 6, 1, 9, 30, 5), "0123456789abcdef")
+    checks = [
+        ("文件名符合存储布局", expected_name == "class-1_paper-1_20260601093005_01234567.xlsx"
+         and done['filename'].startswith("class-1_paper-1_") and done['filename'].endswith(".xlsx")),
+        ("同一秒内的导出不共用文件", done['filename'] != again['filename'] and again['status'] == STATUS_DONE),
+        ("不残留临时文件", files == sorted([done['filename'], again['filename']])),
+        ("创建后立即返回", started['status'] in ("pending", "running") and started['progress'] == 0),
+        ("完成后进度为100", done['status'] == STATUS_DONE and done['written'] == 30 and done['progress'] == 100),
+        ("报表写入导出目录", exists),
+        ("失败状态与错误信息", failed['status'] == STATUS_FAILED and failed['error'] == "导出失败，请重试"),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_cleanup():
+    """测试过期报表清理"""
+    print("\n3. 测试过期报表清理")
+    print("-" * 60)
+    if load_workbook is None:
+        print("   [WARN] 未安装 openpyxl 或 numpy，跳过")
+        return
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        service = ReportExportService(export_dir, lambda *args: 0, max_workers=1, job_ttl=3600)
+        expired = time.time() - 3600 - 60
+        for name, mtime in [
+            ("old.xlsx", expired), ("crashed.xlsx.part", expired), ("fresh.xlsx", None), ("notes.txt", expired)
+        ]:
+            path = os.path.join(export_dir, name)
+            with open(path, 'wb') as f:
+                f.write(b'\x00')
+            if mtime is not None:
+                os.utime(path, (mtime, mtime))
+
+        async def scenario():
+            removed = await service.cleanup()
+            task = service.start_cleanup(3600)
+            await asyncio.sleep(0)
+            await service.stop()
+            return removed, task
+
+        removed, task = asyncio.run(scenario())
+        files = sorted(os.listdir(export_dir))
+    missing = asyncio.run(ReportExportService(os.path.join(export_dir, "missing"), lambda *args: 0).cleanup())
+
+    checks = [
+        ("删除过期报表和残留临时文件", removed == 2 and files == ["fresh.xlsx", "notes.txt"]),
+        ("停止后台清理", task.done() and service._cleanup_task is None),
+        ("目录不存在时不报错", missing == 0),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("成绩报表导出测试")
+    print("=" * 60)
+
+    try:
+        test_write_report()
+        test_export_jobs()
+        test_cleanup()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+安全中间件测试脚本
+直接以ASGI方式调用中间件，验证安全头追加、流式透传和恶意输入拦截
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.core.security_middleware import InputValidationMiddleware, SecurityHeadersMiddleware
+
+
+async def streaming_endpoint(scope, receive, send):
+    """分块输出的应用，模拟音频/导出的流式响应"""
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"audio/mpeg"), (b"X-Frame-Options", b"SAMEORIGIN")],
+    })
+    for chunk in (b"part1", b"part2"):
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+async def call(app, path="/", query_string=b""):
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": query_string, "headers": []}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+def test_security_headers():
+    """测试安全头追加与流式透传"""
+    print("\n1. 测试安全头中间件")
+    print("-" * 60)
+
+    messages = asyncio.run(call(SecurityHeadersMiddleware(streaming_endpoint)))
+    headers = messages[0]["headers"]
+    names = [name.lower() for name, _ in headers]
+    checks = [
+        ("六个安全头全部存在", all(n in names for n, _ in SecurityHeadersMiddleware.SECURITY_HEADERS)),
+        ("同名头部以安全头为准", (b"x-frame-options", b"DENY") in headers and names.count(b"x-frame-options") == 1),
+        ("原有头部保留", (b"content-type", b"audio/mpeg") in headers),
+        ("响应体逐块透传", [m.get("body") for m in messages[1:]] == [b"part1", b"part2", b""]),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_input_validation():
+    """测试恶意路径与查询参数拦截"""
+    print("\n2. 测试输入验证中间件")
+    print("-" * 60)
+
+    app = InputValidationMiddleware(streaming_endpoint)
+    cases = [
+        ("正常请求放行", "/api/questions/", b"grade=3&keyword=%E5%8A%A8%E7%89%A9", 200),
+        ("路径中的脚本被拦截", "/api/<script>alert(1)</script>", b"", 400),
+        ("查询参数明文命中被拦截", "/api/questions/", b"q=javascript:alert(1)", 400),
+        ("编码后的查询参数被拦截", "/api/questions/", b"q=%3Ciframe%20src%3Dx%3E", 400),
+        ("编码的普通字符放行", "/api/questions/", b"q=a%3Db%28c", 200),
+    ]
+    for name, path, query, expected in cases:
+        messages = asyncio.run(call(app, path, query))
+        status = messages[0]["status"]
+        passed = status == expected
+        if expected == 400:
+            passed = passed and "detail" in json.loads(messages[1]["body"])
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}（状态码 {status}）")
+        assert passed
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("安全中间件测试")
+    print("=" * 60)
+
+    try:
+        test_security_headers()
+        test_input_validation()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
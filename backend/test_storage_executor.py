@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+存储线程池测试脚本
+使用进程内的模拟Bucket测试非阻塞调用、超时、重试、线程池占满时的处理和 /metrics 中的指标
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.core.metrics import (
+    STORAGE_CALLS_TOTAL,
+    STORAGE_REJECTED_TOTAL,
+    STORAGE_RETRIES_TOTAL,
+    STORAGE_THREADS_BUSY,
+    STORAGE_TIMEOUTS_TOTAL,
+)
+from backend.app.services.storage_executor import StorageExecutor
+
+
+def counts(metric, *label_sets):
+    """指标为进程内共享的注册表，按调用前后的差值检查"""
+    return [metric.labels(*labels).value for labels in label_sets]
+
+
+class FakeOssError(Exception):
+    """模拟 oss2 异常，带有 HTTP 状态码"""
+    def __init__(self, status: int):
+        self.status = status
+        super().__init__(f"status={status}")
+
+
+class FakeBucket:
+    """进程内的 oss2.Bucket 替身：同步阻塞调用、可注入延迟与失败"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.objects = {}
+        self.failures = []  # 依次抛出的异常
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.latency)
+            if self.failures:
+                raise self.failures.pop(0)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def object_exists(self, key: str) -> bool:
+        self._call()
+        return key in self.objects
+
+    def put_object(self, key: str, data: bytes):
+        self._call()
+        self.objects[key] = data
+
+    def delete_object(self, key: str):
+        self._call()
+        self.objects.pop(key, None)
+
+
+def test_event_loop_not_blocked():
+    """测试阻塞调用期间事件循环仍可调度"""
+    print("\n1. 测试事件循环不被阻塞...")
+    print("-" * 60)
+
+    async def scenario():
+        bucket = FakeBucket(latency=0.2)
+        executor = StorageExecutor(max_workers=4)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await executor.run('put_object', bucket.put_object, 'a.mp3', b'data')
+        task.cancel()
+        executor.shutdown()
+        return ticks, bucket
+
+    ticks, bucket = asyncio.run(scenario())
+    status = "[PASS]" if ticks >= 10 and 'a.mp3' in bucket.objects else "[FAIL]"
+    print(f"   {status} OSS调用 0.2s 期间事件循环调度了 {ticks} 次")
+    assert ticks >= 10
+
+
+def test_bounded_concurrency():
+    """测试线程池大小限制并发"""
+    print("\n2. 测试并发上限...")
+    print("-" * 60)
+
+    async def scenario():
+        bucket = FakeBucket(latency=0.05)
+        executor = StorageExecutor(max_workers=3)
+        await asyncio.gather(*[
+            executor.run('object_exists', bucket.object_exists, f'{i}.mp3') for i in range(12)
+        ])
+        executor.shutdown()
+        return bucket.max_active
+
+    max_active = asyncio.run(scenario())
+    status = "[PASS]" if max_active <= 3 else "[FAIL]"
+    print(f"   {status} 12个并发请求，最大同时执行 {max_active} 个（上限3）")
+    assert max_active <= 3
+
+
+def test_retry_and_metrics():
+    """测试重试策略与指标"""
+    print("\n3. 测试重试与指标...")
+    print("-" * 60)
+
+    labels = [('put_object', 'ok'), ('put_object', 'error'), ('delete_object', 'error'), ('object_exists', 'error')]
+    calls_before = counts(STORAGE_CALLS_TOTAL, *labels)
+    retries_before = counts(STORAGE_RETRIES_TOTAL, ('put_object',), ('delete_object',), ('object_exists',))
+
+    async def scenario():
+        bucket = FakeBucket()
+        executor = StorageExecutor(retries=2, backoff=0.001)
+
+        bucket.failures = [FakeOssError(503), FakeOssError(-2)]
+        await executor.run('put_object', bucket.put_object, 'b.mp3', b'data')
+
+        bucket.failures = [FakeOssError(404)]
+        not_retried = False
+        try:
+            await executor.run('delete_object', bucket.delete_object, 'missing.mp3')
+        except FakeOssError:
+            not_retried = True
+
+        bucket.failures = [FakeOssError(500)] * 3
+        exhausted = False
+        try:
+            await executor.run('object_exists', bucket.object_exists, 'c.mp3')
+        except FakeOssError:
+            exhausted = True
+
+        await asyncio.sleep(0.01)
+        executor.shutdown()
+        return executor.in_flight, not_retried, exhausted
+
+    in_flight, not_retried, exhausted = asyncio.run(scenario())
+    calls = [after - before for after, before in zip(counts(STORAGE_CALLS_TOTAL, *labels), calls_before)]
+    retries = [
+        after - before for after, before in
+        zip(counts(STORAGE_RETRIES_TOTAL, ('put_object',), ('delete_object',), ('object_exists',)), retries_before)
+    ]
+
+    checks = [
+        ("5xx与网络错误重试后成功", retries[0] == 2 and calls[:2] == [1, 0]),
+        ("404不重试直接抛出", not_retried and retries[1] == 0 and calls[2] == 1),
+        ("超过重试次数后抛出", exhausted and retries[2] == 2 and calls[3] == 1),
+        ("调用结束后无在途请求", in_flight == 0),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_timeout():
+    """测试单次调用超时"""
+    print("\n4. 测试超时...")
+    print("-" * 60)
+
+    timeouts_before = STORAGE_TIMEOUTS_TOTAL.labels('get_object').value
+
+    async def scenario():
+        bucket = FakeBucket(latency=0.3)
+        executor = StorageExecutor(timeout=0.05, retries=0)
+        try:
+            await executor.run('get_object', bucket.object_exists, 'slow.mp3')
+            timed_out = False
+        except asyncio.TimeoutError:
+            timed_out = True
+        executor.shutdown()
+        return timed_out
+
+    timed_out = asyncio.run(scenario())
+    passed = timed_out and STORAGE_TIMEOUTS_TOTAL.labels('get_object').value - timeouts_before == 1
+    print(f"   {'[PASS]' if passed else '[FAIL]'} 超过 0.05s 的调用被中断并计入超时")
+    assert passed
+
+
+def test_saturated_pool():
+    """测试超时的调用占满线程池"""
+    print("\n5. 测试线程池占满...")
+    print("-" * 60)
+
+    rejected_before = STORAGE_REJECTED_TOTAL.labels('head_object').value
+    busy_before = STORAGE_THREADS_BUSY.labels().value
+
+    async def scenario():
+        bucket = FakeBucket(latency=0.3)
+        executor = StorageExecutor(max_workers=2, timeout=0.05, retries=2, backoff=0.001)
+
+        async def call():
+            try:
+                await executor.run('head_object', bucket.object_exists, 'slow.mp3')
+                return 'ok'
+            except asyncio.TimeoutError:
+                return 'timeout'
+
+        # 两个调用超时后线程仍阻塞，重试和后来的调用都不再进入线程池
+        results = await asyncio.gather(*[call() for _ in range(4)])
+        stuck, busy = executor.in_flight, STORAGE_THREADS_BUSY.labels().value - busy_before
+        # 线程返回后名额释放，调用恢复
+        await asyncio.sleep(0.35)
+        bucket.latency = 0
+        recovered = await call()
+        executor.shutdown()
+        return results, stuck, busy, recovered, executor.in_flight, bucket
+
+    results, stuck, busy, recovered, in_flight, bucket = asyncio.run(scenario())
+    checks = [
+        ("全部超时返回", results == ['timeout'] * 4),
+        ("超时后仍占用名额", stuck == 2 and busy == 2),
+        ("不向占满的线程池重试或排队", bucket.max_active == 2 and bucket.calls == 3),
+        ("拒绝计入指标", STORAGE_REJECTED_TOTAL.labels('head_object').value - rejected_before == 4),
+        ("线程返回后恢复", recovered == 'ok' and in_flight == 0),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("存储线程池测试")
+    print("=" * 60)
+
+    try:
+        test_event_loop_not_blocked()
+        test_bounded_concurrency()
+        test_retry_and_metrics()
+        test_timeout()
+        test_saturated_pool()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
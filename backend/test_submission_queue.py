@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+交卷队列测试脚本
+验证重复交卷只入队一次、成批判分、合并自动保存缓冲、判分失败后重试、
+后台 worker 从入队到判分完成，以及反复失败的答卷不拖住同批答卷并移入死信
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.autosave_buffer import AutosaveBuffer
+from backend.app.services.submission_queue import SubmissionQueue
+
+
+class FakeGrader:
+    """记录每批答卷，按作答数给分，可模拟一次判分失败"""
+
+    def __init__(self, poison=()):
+        self.batches = []
+        self.fail_next = False
+        self.poison = set(poison)
+
+    def grade_batch(self, submissions):
+        if self.fail_next:
+            self.fail_next = False
+            raise ConnectionError("database unavailable")
+        if any(s['exam_token'] in self.poison for s in submissions):
+            raise ValueError("invalid answer payload")
+        self.batches.append(submissions)
+        results = {
+            s['exam_token']: {'status': 'graded', 'score': float(len(s['answers'])), 'correct_count': 0, 'total_count': 4}
+            for s in submissions
+        }
+        return results, []
+
+
+def test_idempotent_enqueue():
+    """测试重复交卷"""
+    print("\n1. 测试重复交卷")
+    print("-" * 60)
+
+    grader = FakeGrader()
+    queue = SubmissionQueue(grader.grade_batch)
+
+    async def scenario():
+        first = await queue.enqueue("token-a", {"q1": "A"}, time_spent=300)
+        second = await queue.enqueue("token-a", {"q1": "B"}, time_spent=310)
+        await queue.enqueue("token-b", {"q1": "C", "q2": "D"})
+        drained = await queue.drain_once(block_ms=10)
+        idle = await queue.drain_once(block_ms=10)
+        return first, second, drained, idle, await queue.get_status("token-a")
+
+    first, second, drained, idle, status = asyncio.run(scenario())
+
+    checks = [
+        ("首次交卷入队", first[0] and first[1]['status'] == 'queued'),
+        ("重复交卷返回同一回执", not second[0] and second[1]['submitted_at'] == first[1]['submitted_at']),
+        ("两份答卷一批处理", drained == 2 and len(grader.batches) == 1 and idle == 0),
+        ("保留第一次交卷的作答", grader.batches[0][0]['answers'] == {"q1": "A"}),
+        ("状态更新为已判分", status['status'] == 'graded' and status['score'] == 1.0 and status['total_count'] == 4),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_merge_autosave_and_retry():
+    """测试合并自动保存缓冲与失败重试"""
+    print("\n2. 测试合并缓冲与重试")
+    print("-" * 60)
+
+    grader = FakeGrader()
+    written = []
+    buffer = AutosaveBuffer(lambda rows: written.append(rows) or len(rows))
+    queue = SubmissionQueue(grader.grade_batch, autosave_buffer=buffer)
+
+    async def scenario():
+        await buffer.save("token-a", {"q1": "A", "q2": "B"}, seq=1)
+        await queue.enqueue("token-a", {"q2": "C"})
+        grader.fail_next = True
+        try:
+            await queue.drain_once(block_ms=10)
+            failed = False
+        except ConnectionError:
+            failed = True
+        queued = await queue.get_status("token-a")
+        await queue.drain_once(block_ms=10)
+        return failed, queued, await buffer.get_buffered("token-a"), await queue.get_status("token-a")
+
+    failed, queued, buffered, status = asyncio.run(scenario())
+
+    checks = [
+        ("判分失败抛出异常", failed),
+        ("失败后仍在排队", queued['status'] == 'queued'),
+        ("交卷作答覆盖缓冲作答", grader.batches[0][0]['answers'] == {"q1": "A", "q2": "C"}),
+        ("判分后清除缓冲", buffered is None and not written),
+        ("重试后已判分", status['status'] == 'graded'),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_started_workers():
+    """测试后台 worker"""
+    print("\n3. 测试后台 worker")
+    print("-" * 60)
+
+    grader = FakeGrader()
+    queue = SubmissionQueue(grader.grade_batch)
+
+    async def scenario():
+        workers = queue.start(2)
+        receipt = (await queue.enqueue("token-a", {"q1": "A", "q2": "B"}))[1]
+        status = receipt
+        for _ in range(100):
+            status = await queue.get_status("token-a")
+            if status['status'] != 'queued':
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return receipt, status, len(workers), all(task.done() for task in workers)
+
+    receipt, status, started, stopped = asyncio.run(scenario())
+
+    checks = [
+        ("启动指定数量的 worker", started == 2),
+        ("入队后返回排队回执", receipt['status'] == 'queued'),
+        ("worker 判分后状态为已判分", status['status'] == 'graded' and status['score'] == 2.0),
+        ("停止后 worker 退出", stopped and not queue._tasks),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def test_dead_letter():
+    """测试反复失败的答卷"""
+    print("\n4. 测试死信")
+    print("-" * 60)
+
+    grader = FakeGrader(poison={"token-bad"})
+    queue = SubmissionQueue(grader.grade_batch, max_deliveries=3)
+
+    async def scenario():
+        for token in ("token-a", "token-bad", "token-b"):
+            await queue.enqueue(token, {"q1": "A"})
+        first = await queue.drain_once(block_ms=10)
+        good = [await queue.get_status(token) for token in ("token-a", "token-b")]
+        retries = 0
+        while (await queue.get_status("token-bad"))['status'] == 'queued' and retries < 10:
+            retries += 1
+            try:
+                await queue.drain_once(block_ms=10)
+            except ValueError:
+                pass
+        return first, good, retries, await queue.get_status("token-bad"), await queue.get_dead_letters()
+
+    first, good, retries, bad, dead = asyncio.run(scenario())
+
+    checks = [
+        ("同批其他答卷正常判分", first == 2 and all(status['status'] == 'graded' for status in good)),
+        ("达到投递上限后不再重试", retries == 2 and queue._queue().empty()),
+        ("状态置为处理失败", bad['status'] == 'failed'),
+        ("死信记录答卷和投递次数", len(dead) == 1 and dead[0]['exam_token'] == "token-bad"
+         and dead[0]['answers'] == {"q1": "A"} and dead[0]['deliveries'] == 3),
+    ]
+    for name, passed in checks:
+        print(f"   {'[PASS]' if passed else '[FAIL]'} {name}")
+    assert all(passed for _, passed in checks)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("交卷队列测试")
+    print("=" * 60)
+
+    try:
+        test_idempotent_enqueue()
+        test_merge_autosave_and_retry()
+        test_started_workers()
+        test_dead_letter()
+
+        print("\n" + "=" * 60)
+        print("[OK] 所有测试通过！")
+        print("=" * 60)
+        return True
+
+    except Exception as e:
+        print(f"\n[FAIL] 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -1,10 +1,10 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Card, Radio, Button, Progress, Space, message, Spin } from 'antd';
 import { LeftOutlined, RightOutlined, CheckCircleOutlined, CloseCircleOutlined } from '@ant-design/icons';
 import { useNavigate } from 'react-router-dom';
 import DOMPurify from 'dompurify'; // 引入DOMPurify库进行更严格的HTML清理
 import AudioPlayer from '../../components/AudioPlayer';
-import { submitExam, saveProgress } from '../../services/exam';
+import { submitExam, saveProgress, getSubmissionStatus } from '../../services/exam';
 import './ExamView.css';
 
 interface Question {
@@ -18,6 +18,21 @@ interface Question {
   score: number;
 }
 
+interface AudioManifestItem {
+  file_id: string;
+  question_id: string;
+  url: string;
+  size: number;
+  sha256: string;
+  duration?: number;
+}
+
+interface AudioManifest {
+  paper_id: string;
+  total_bytes: number;
+  files: AudioManifestItem[];
+}
+
 interface ExamViewProps {
   paperId: string;
   examToken: string;
@@ -62,6 +77,17 @@ const removeLocalStorageItem = (key: string): void => {
   }
 };
 
+// 按题目顺序依次预取听力音频，写入浏览器缓存；串行执行以免与首屏请求争抢带宽
+const prefetchAudio = async (manifest: AudioManifest): Promise<void> => {
+  for (const item of manifest.files) {
+    try {
+      await fetch(item.url, { credentials: 'same-origin' });
+    } catch (error) {
+      console.warn('预取音频失败:', item.url, error);
+    }
+  }
+};
+
 const ExamView: React.FC<ExamViewProps> = ({
   paperId,
   examToken,
@@ -77,6 +103,11 @@ const ExamView: React.FC<ExamViewProps> = ({
   const [timeRemaining, setTimeRemaining] = useState(duration);
   const [submitted, setSubmitted] = useState(false);
   const [result, setResult] = useState<any>(null);
+  const [audioUrls, setAudioUrls] = useState<Record<string, string>>({});
+  // 增量保存：只发送上次保存后变化的作答，seq 以当前时间起步，刷新页面后仍保持递增
+  const pendingChanges = useRef<Record<string, string>>({});
+  const savingRef = useRef(false);
+  const saveSeq = useRef(Date.now());
 
   const navigate = useNavigate();
 
@@ -120,6 +151,15 @@ const ExamView: React.FC<ExamViewProps> = ({
       setQuestions(data.questions);
       setTimeRemaining(duration);
 
+      if (data.audio_manifest && Array.isArray(data.audio_manifest.files)) {
+        const urls: Record<string, string> = {};
+        data.audio_manifest.files.forEach((item: AudioManifestItem) => {
+          urls[item.file_id] = item.url;
+        });
+        setAudioUrls(urls);
+        prefetchAudio(data.audio_manifest);
+      }
+
       const savedAnswers = getLocalStorageItem(`exam_${examToken}_answers`);
       if (savedAnswers) {
         setAnswers(JSON.parse(savedAnswers));
@@ -143,10 +183,48 @@ const ExamView: React.FC<ExamViewProps> = ({
 
     setLocalStorageItem(`exam_${examToken}_answers`, JSON.stringify(newAnswers));
 
+    pendingChanges.current = { ...pendingChanges.current, [questionId]: answer };
+    flushProgress();
+  };
+
+  // 同一时间只有一个保存请求在途，期间的变化合并到下一次保存
+  const flushProgress = () => {
+    if (savingRef.current || Object.keys(pendingChanges.current).length === 0) {
+      return;
+    }
+
+    const changes = pendingChanges.current;
+    pendingChanges.current = {};
+    savingRef.current = true;
+    saveSeq.current += 1;
+
     saveProgress(examToken, {
-      answers: newAnswers,
-      current_question: currentIndex
-    }).catch((err) => console.error('保存进度失败:', err));
+      answers: changes,
+      current_question: currentIndex,
+      seq: saveSeq.current
+    })
+      .then(() => {
+        savingRef.current = false;
+        flushProgress();
+      })
+      .catch((err) => {
+        // 失败或被判定为乱序时，把这批变化放回待发送，随新的序号重发
+        pendingChanges.current = { ...changes, ...pendingChanges.current };
+        savingRef.current = false;
+        const detail = err?.response?.data?.detail;
+        if (err?.response?.status === 409 && typeof detail?.seq === 'number') {
+          // 服务端已接受的序号更大（如另一个标签页在保存），从该序号之后继续，立即重发
+          saveSeq.current = Math.max(saveSeq.current, detail.seq);
+          flushProgress();
+          return;
+        }
+        if (detail?.error_code === 'EXAM_CLOSED' || detail?.error_code === 'EXAM_OVERDUE') {
+          // 已交卷或已截止，服务端不再接受保存，不再重试
+          return;
+        }
+        console.error('保存进度失败:', err);
+        setTimeout(flushProgress, 5000);
+      });
   };
 
   const handlePrevious = () => {
@@ -181,12 +259,25 @@ const ExamView: React.FC<ExamViewProps> = ({
       setSubmitting(true);
       const timeSpent = duration - timeRemaining;
 
-      const response = await submitExam(examToken, {
+      // 交卷只返回回执，判分在后台完成，轮询直到出结果
+      let receipt = await submitExam(examToken, {
         answers,
         time_spent: timeSpent
       });
+      while (receipt.status === 'queued') {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        receipt = await getSubmissionStatus(examToken);
+      }
+      if (receipt.status === 'failed') {
+        message.error('交卷处理失败，作答已保存，请联系老师');
+        return;
+      }
+      if (receipt.status !== 'graded') {
+        message.error('该试卷已提交或已截止');
+        return;
+      }
 
-      setResult(response);
+      setResult(receipt);
       setSubmitted(true);
 
       removeLocalStorageItem(`exam_${examToken}_answers`);
@@ -305,7 +396,10 @@ const ExamView: React.FC<ExamViewProps> = ({
           {currentQuestion.audio_file_id && (
             <div className="question-audio">
               <AudioPlayer
-                audioUrl={`/api/audio/${currentQuestion.audio_file_id}.mp3`}
+                audioUrl={
+                  audioUrls[currentQuestion.audio_file_id] ??
+                  `/api/audio/${currentQuestion.audio_file_id}.mp3`
+                }
                 autoPlay={false}
               />
             </div>